@@ -1,16 +1,51 @@
 # -*- coding: utf-8 -*-
 import cv2
 import numpy as np
+import os
 import time
+import json
 import threading
-import sqlite3
-import RPi.GPIO as GPIO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from flask import Flask, render_template, Response, jsonify, request
-from gpiozero import AngularServo
-from hx711 import HX711 
-from openvino.inference_engine import IECore
+import clock
+from weight_sampler import HX711Sampler
+from weight_filter import WeightEstimator, SettleDetector
+from flow_model import FlowRateModel, FeedStats
+from feed_log import FeedLog, CurveRecorder
+from pet_registry import PetRegistry
+from status_events import StatusHub
+from motion_gate import MotionGate
+from inference_roi import InferenceROI
+from detection_voter import DetectionVoter
+from breed_head import DogHead, DOG_HEAD_CLASSES, DOG_CLASS_MIN, DOG_CLASS_MAX, OTHER_CLASS, is_dog
+from frame_broadcaster import FrameBroadcaster
+from frame_pool import FramePool
+import feed_scheduler
+from feed_scheduler import FeedScheduler
+from async_infer import AsyncInferenceEngine
+from photo_analyzer import PhotoAnalyzer, ArchiveTooLarge, read_zip
+from metrics import Registry, PHASE_BUCKETS
+from hardware import model_files, expand_devices
 
 # ================= 參數設定區 =================
+DB_FILE = 'feeder.db'
+
+# ★ 硬體後端：pi = 樹莓派實機；sim = 模擬硬體 (一般電腦也能跑，可倍速)
+HARDWARE_BACKEND = os.environ.get("FEEDER_BACKEND", "pi")
+SIM_SPEED = float(os.environ.get("FEEDER_SIM_SPEED", "1"))
+SIM_VIDEO = os.environ.get("FEEDER_SIM_VIDEO")       # 模擬攝影機重播的影片檔；None = 合成畫面
+SIM_STICKS = int(os.environ.get("FEEDER_SIM_STICKS", "1"))   # 模擬插著幾支 NCS2 (0 = 只有 CPU)
+# ★ 模型：<MODEL_DIR>/<MODEL_PRECISION>/<MODEL_NAME>.xml/.bin
+#   FP16 = NCS2 (MYRIAD) 用；FP32 / INT8 給只有 CPU 的電腦 (INT8 由 quantize_model.py 產生，NCS2 不支援)
+#   MODEL_NAME 改成 "mobilenet-v2-dog" = prepare_dog_head.py 產生的縮減模型 (只輸出狗品種 + 其他)
+MODEL_DIR = "models/public/mobilenet-v2"
+MODEL_NAME = os.environ.get("FEEDER_MODEL_NAME", "mobilenet-v2")
+MODEL_PRECISION = os.environ.get("FEEDER_MODEL_PRECISION", "FP16")
+MODEL_XML, MODEL_BIN = model_files(MODEL_DIR, MODEL_PRECISION, MODEL_NAME)
+LABELS_FILE = "models/imagenet_classes.txt"
+# ★ 推論後處理：dog = 只看狗品種 (151~268) + 「其他」，投票與 top-k 只處理 119 個數字；
+#   full = 完整 1000 類 (分析照片時會顯示貓、椅子等非狗類別)。縮減模型只能用 dog
+BREED_HEAD = "dog"
 DT_PIN = 23
 SCK_PIN = 24
 
@@ -22,20 +57,125 @@ BOX_WEIGHT = 0.01
 REFERENCE_UNIT = 1         
 SERVO_PIN = 18
 FEED_RATIO = 0.02          # 體重 * 0.02
-COOLDOWN_TIME = 60        
-FLOW_RATE = 0.05           # ★ 流速：0.05 kg/秒
+COOLDOWN_TIME = 60         # 同一隻寵物餵完後多久內不再餵 (秒)
+FEED_MAX_PER_HOUR = 4      # 同一隻寵物每小時最多餵幾次
+FEED_QUEUE_SIZE = 2        # 排隊中的餵食工作上限
+FLOW_RATE = 0.05           # ★ 流速初始值：0.05 kg/秒 (之後由 FlowRateModel 線上學習)
+FLOW_ADAPTIVE = True       # False = 固定公式 (缺量 / FLOW_RATE)，用來對照
+FLOW_MODEL_FILE = "flow_model.json"
+FEED_STATS_FILE = "feed_stats.jsonl"
+FEED_CURVE_DT = 0.2        # 餵食歷史的重量曲線取樣間隔 (秒)
 OFFSET_WEIGHT = 0.02       
 SERVO_OPEN = 90
 SERVO_CLOSE = 0
 
-# ★ 補料循環間隔 (秒)
+# ★ 補料循環間隔 (秒)：秤穩定就立刻繼續，這個值只當最長等待時間
 FEED_INTERVAL_WAIT = 5.0  
+SERVO_TRAVEL_TIME = 0.5    # 馬達轉到定位後才斷電 (背景計時，不卡餵食流程)
+
+# ★ 穩定判斷：最近 SETTLE_WINDOW 秒的斜率與雜訊都低於門檻
+SETTLE_WINDOW = 1.0        # 秒
+SETTLE_MAX_SLOPE = 0.002   # kg/秒
+SETTLE_MAX_STD = 0.0015    # kg
+
+# ★ HX711 背景取樣緩衝區大小 (80 SPS 約可存 12 秒)
+SAMPLE_BUFFER_SIZE = 1024
+HX711_EVENT_MODE = True    # 用 DOUT 下降緣中斷讀取，取代忙碌輪詢
+
+# ★ 重量濾波 (median / trimmed / kalman)
+WEIGHT_FILTER = "median"
+WEIGHT_WINDOW = 15         # 滑動視窗樣本數
+
+# ★ 畫面緩衝池：擷取迴圈輪流使用的 buffer 數 (第 N 張之後才會覆寫，須大於推論佇列 + 1)
+FRAME_POOL_SIZE = 4
+
+# ★ 影像串流設定 (可用 /video_feed?q=70&fps=10 個別調整)
+STREAM_JPEG_QUALITY = 80
+STREAM_MAX_FPS = 25
+
+# ★ 狀態推播 (/events)：每 0.1 秒比對一次，重量最快每 0.5 秒推一次
+STATUS_PUSH_INTERVAL = 0.1
+WEIGHT_PUSH_INTERVAL = 0.5
+
+# ★ 伺服器並行上限 (serve.py 依此決定 worker 執行緒數)
+MAX_VIDEO_STREAMS = 4      # 同時觀看 /video_feed 的上限
+MAX_EVENT_STREAMS = 8      # 同時連線 /events 的上限
+ANALYZE_WORKERS = 1        # /analyze_photo 專用執行緒池
+ANALYZE_MAX_PENDING = 4    # 含執行中，排隊中的上傳分析上限
+ANALYZE_TIMEOUT = 10.0     # 秒
+REQUEST_TIMEOUT = 30       # 連線閒置逾時 (秒)
+
+# ★ 多張照片分析 (/analyze_photos)：可一次上傳多個檔案或一個 zip
+BATCH_MAX_IMAGES = 32
+BATCH_MAX_FILE_BYTES = 10 * 1024 * 1024
+BATCH_MAX_ZIP_BYTES = 64 * 1024 * 1024   # zip 取出的圖片解壓後合計上限，超過回 413
+BATCH_MAX_ZIP_ENTRIES = 1000             # zip 內項目數上限 (含非圖片)，超過回 413
+BATCH_TIMEOUT = 60.0       # 秒
+BATCH_TOP_K = 3            # 預設回傳前幾名 (最多 10)
+DECODE_WORKERS = 2         # 圖片解碼執行緒
+PHOTO_CACHE_SIZE = 256     # 依內容雜湊快取的分析結果筆數
+
+# ★ 動態閘門：畫面有變動才送去推論
+MOTION_GATE = True
+MOTION_ROI = None          # (x, y, w, h) 0~1 比例，例如碗附近 (0.25, 0.4, 0.5, 0.6)；None = 全畫面
+MOTION_THRESHOLD = 25      # 灰階差異門檻 (0~255)
+MOTION_MIN_AREA = 0.02     # ROI 內變動像素比例超過此值才算有動態
+MOTION_HOLD = 3.0          # 偵測到動態後持續推論的秒數
+
+# ★ 推論 ROI：只把碗附近 / 有動靜的區域送去分類 (裁切是 view，不複製；前處理耗時不變，狗佔模型輸入的比例變大)
+INFER_ROI_MODE = "motion"  # full = 整張畫面；fixed = 固定 INFER_ROI；motion = 動態外框 (沒有動態時用 INFER_ROI)
+INFER_ROI = None           # (x, y, w, h) 0~1 比例，碗附近；None = 全畫面
+INFER_ROI_MARGIN = 0.25    # 動態外框每邊向外擴大的比例 (保留整隻狗)
+INFER_ROI_MIN_SIZE = 0.35  # 動態裁切邊長至少是畫面短邊的幾倍 (太小的框反而認不出來)
+INFER_LETTERBOX = True     # 保持長寬比縮放再補邊 (False = 直接壓成模型輸入大小)
+STREAM_SHOW_ROI = False    # /video_feed 預設是否畫出推論 ROI (也可用 /video_feed?roi=1)
+
+# ★ 多張畫面投票：同一品種連續 VOTE_MIN_FRAMES 張才算偵測到
+VOTE_WINDOW = 8
+VOTE_DECAY = 0.7
+VOTE_MIN_FRAMES = 3
+VOTE_MIN_SCORE = 0.7
+
+# ★ NCS2 非同步推論設定
+INFER_DEVICE = os.environ.get("FEEDER_INFER_DEVICE", "MYRIAD")  # 逗號分隔，依優先順序，例如 "MYRIAD,CPU"；MYRIAD = 所有插著的 NCS2
+INFER_FALLBACK_DEVICE = "CPU"   # 上面的裝置都載入失敗時改用 (None = 不退回)；之後每 MODEL_RETRY_MAX 秒檢查能否切回
+INFER_REQUESTS = 2         # 每個裝置同時在跑的 infer request 數量
+CPU_INFER_REQUESTS = 1     # CPU 的 infer request 數量 (樹莓派上 CPU 還要負責擷取與網頁)
+INFER_QUEUE_SIZE = 1       # 待推論畫面上限，滿了就丟最舊的
+
+# ★ 分段啟動：網頁伺服器立刻啟動，模型與硬體在背景並行載入 (進度見 /status 的 ready)
+MODEL_CACHE_DIR = "model_cache"   # 編譯好的模型快取 (MYRIAD 匯出 blob)；None = 每次重新編譯
+MODEL_RETRY_MIN = 1.0      # NCS2 載入失敗的重試間隔 (秒)，每次加倍
+MODEL_RETRY_MAX = 60.0     # 重試間隔上限 (秒)
+MODEL_UPGRADE_RETRY_MAX = 900.0  # 用備援 / 缺裝置時，列舉到新裝置卻載入失敗的重試間隔上限 (秒)，每次加倍
+INFER_MAX_ERRORS = 5       # 推論連續失敗幾次視為 NCS2 斷線，自動重新連線
+TARE_SETTLE_TIMEOUT = 3.0  # 開機歸零前等秤穩定的最長時間 (秒)
+
+# ★ 量測 (/metrics)：超過門檻的單次耗時記進慢事件緩衝區 (/metrics/slow)
+METRICS_SLOW_EVENTS = 200
+
+# ================= 量測 =================
+metrics = Registry(slow_events=METRICS_SLOW_EVENTS)
+M_CAPTURE = metrics.histogram("feeder_capture_read_seconds", "cap.read() 耗時", slow=0.2)
+M_FLIP = metrics.histogram("feeder_frame_flip_seconds", "畫面翻轉耗時", slow=0.02)
+M_MOTION = metrics.histogram("feeder_motion_gate_seconds", "動態閘門判斷耗時", slow=0.02)
+M_INFER = metrics.histogram("feeder_infer_latency_seconds", "非同步推論送出到完成", slow=0.5)
+M_PREDICT = metrics.histogram("feeder_predict_seconds", "predict_image (同步推論) 耗時", slow=1.0)
+M_PET_LOOKUP = metrics.histogram("feeder_pet_lookup_seconds", "寵物資料查詢耗時", slow=0.01)
+M_WEIGHT_READ = metrics.histogram("feeder_weight_read_seconds", "read_hx711_value 耗時", slow=0.01)
+M_HX711 = metrics.histogram("feeder_hx711_read_seconds", "HX711 單筆讀取 (含等待資料) 耗時", slow=0.1)
+M_JPEG = metrics.histogram("feeder_jpeg_encode_seconds", "串流 JPEG 編碼耗時", slow=0.1)
+M_FEED_DISPENSE = metrics.histogram("feeder_feed_dispense_seconds", "單次出料 (開門到關門)", PHASE_BUCKETS)
+M_FEED_SETTLE = metrics.histogram("feeder_feed_settle_seconds", "出料後等待穩定", PHASE_BUCKETS, slow=5.0)
+M_FEED_JOB = metrics.histogram("feeder_feed_job_seconds", "整個餵食工作", PHASE_BUCKETS, slow=60.0)
 
 # ================= 全域變數 =================
 app = Flask(__name__)
-GPIO.setwarnings(False)
 
-global_frame = None
+frame_pool = FramePool(FRAME_POOL_SIZE)
+infer_roi = InferenceROI(INFER_ROI_MODE, roi=INFER_ROI, margin=INFER_ROI_MARGIN, min_size=INFER_ROI_MIN_SIZE)
+broadcaster = FrameBroadcaster(default_quality=STREAM_JPEG_QUALITY, observe=M_JPEG.observe,
+                               valid=frame_pool.valid, overlay=infer_roi.draw)
 current_weight = 0.0
 system_running = False
 is_feeding = False       
@@ -47,49 +187,69 @@ detected_pet_weight = "---"
 detected_pet_target = 0.0
 detected_breed_info = "---"
 lock = threading.Lock()
+# 機率向量位置 → ImageNet 類別 ID (None = 位置即 ID)
+breed_classes = DOG_HEAD_CLASSES if BREED_HEAD == "dog" else None
+motion_gate = MotionGate(roi=MOTION_ROI, threshold=MOTION_THRESHOLD,
+                         min_area=MOTION_MIN_AREA, hold=MOTION_HOLD)
+voter = DetectionVoter(window=VOTE_WINDOW, decay=VOTE_DECAY,
+                       min_frames=VOTE_MIN_FRAMES, min_score=VOTE_MIN_SCORE, classes=breed_classes)
+flow_model = FlowRateModel(rate=FLOW_RATE, path=FLOW_MODEL_FILE)
+pets = PetRegistry(DB_FILE)
+feed_log = FeedLog(DB_FILE)
+curve_recorder = CurveRecorder(dt=FEED_CURVE_DT)
+
+# ================= 啟動狀態 =================
+PENDING, LOADING, READY, FAILED, RECONNECTING = "pending", "loading", "ready", "failed", "reconnecting"
+FALLBACK = "fallback"      # 模型在備援裝置 (CPU) 上執行
+readiness = {'model': PENDING, 'scale': PENDING, 'camera': PENDING}
 
 # ================= 模型載入 =================
 labels = {}
 try:
-    with open("models/imagenet_classes.txt", "r") as f:
+    with open(LABELS_FILE, "r") as f:
         for idx, line in enumerate(f):
-            labels[idx] = line.strip()
+            # dog 模式只需要狗品種的名稱
+            if breed_classes is None or DOG_CLASS_MIN <= idx <= DOG_CLASS_MAX: labels[idx] = line.strip()
 except: 
-    print("⚠️ 警告：找不到 models/imagenet_classes.txt")
-
-print(">>> 初始化 NCS2 模型...")
-ie = IECore()
-net = ie.read_network(model="models/public/mobilenet-v2/FP16/mobilenet-v2.xml", 
-                      weights="models/public/mobilenet-v2/FP16/mobilenet-v2.bin")
-input_blob = next(iter(net.input_info))
-out_blob = next(iter(net.outputs))
-
-exec_net = None
-try:
-    exec_net = ie.load_network(network=net, device_name="MYRIAD")
-    print("✅ NCS2 載入成功")
-except Exception as e:
-    print(f"❌ NCS2 載入失敗: {e}")
+    print(f"⚠️ 警告：找不到 {LABELS_FILE}")
+labels[OTHER_CLASS] = "其他 (不是狗)"
+
+# ================= 硬體後端 =================
+def create_backend(name):
+    if name == "sim":
+        from sim_hardware import SimBackend
+        print(f">>> 使用模擬硬體 (倍速 x{SIM_SPEED:g})")
+        return SimBackend(ZERO_OFFSET, FINAL_REFERENCE_FACTOR, speed=SIM_SPEED,
+                          video=SIM_VIDEO, sticks=SIM_STICKS, flow_rate=FLOW_RATE, tare_kg=BOX_WEIGHT)
+    from hardware import PiBackend
+    return PiBackend(DT_PIN, SCK_PIN, SERVO_PIN, servo_open=SERVO_OPEN, servo_close=SERVO_CLOSE,
+                     servo_travel=SERVO_TRAVEL_TIME, event_mode=HX711_EVENT_MODE)
+
+hw = create_backend(HARDWARE_BACKEND)
+
+# 模型在背景由 model_supervisor 載入，就緒前 infer_engine 為 None
+classifier = None
+infer_engine = None
 
 # ================= HX711 讀取與硬體設定 =================
-hx = None
-servo = None
+scale = None
+gate = None
+sampler = None
+settle = None
+estimator = WeightEstimator(window=WEIGHT_WINDOW, mode=WEIGHT_FILTER)
 
 # --- HX711 讀取輔助函式 ---
-def read_hx711_value(times=1, use_tare=True):
-    if hx is None: return 0.0
-    raw_val = 0
-    try:
-        try:
-            raw_val = hx.get_value(times) 
-        except AttributeError:
-            raw_val = hx.get_raw_value(times)
-    except Exception:
-        return 0.0
-    
-    abs_weight = 0.0
-    if FINAL_REFERENCE_FACTOR > 1:
-        abs_weight = (raw_val - ZERO_OFFSET) / FINAL_REFERENCE_FACTOR
+def raw_to_kg(raw_val):
+    # 原始讀數 → 絕對重量 (未扣開機偏差與紙盒)
+    if FINAL_REFERENCE_FACTOR <= 1: return 0.0
+    return (raw_val - scale.get_offset() - ZERO_OFFSET) / FINAL_REFERENCE_FACTOR
+
+# 讀取重量估計器的穩定重量 (由背景取樣持續更新)，不會卡在 GPIO 上
+def read_hx711_value(use_tare=True):
+    t0 = time.perf_counter()
+    abs_weight, _ = estimator.estimate()
+    M_WEIGHT_READ.since(t0)
+    if abs_weight is None: return 0.0
     
     if use_tare:
         final_w = abs_weight - STARTUP_TARE - BOX_WEIGHT
@@ -97,79 +257,208 @@ def read_hx711_value(times=1, use_tare=True):
     
     return abs_weight
 
+# 取樣執行緒每筆樣本呼叫：更新重量估計，餵食中順便錄曲線
+def on_sample(t, raw):
+    kg = raw_to_kg(raw)
+    estimator.add(t, kg)
+    curve_recorder.add(t, kg - STARTUP_TARE - BOX_WEIGHT)
+
 # --- 硬體設定 ---
 def setup_hardware():
-    global hx, servo, STARTUP_TARE
+    global scale, gate, sampler, settle, STARTUP_TARE
+    readiness['scale'] = LOADING
     try:
-        GPIO.setmode(GPIO.BCM)
-        hx = HX711(DT_PIN, SCK_PIN)
-        hx.set_reading_format("MSB", "MSB")
-        hx.reset()
+        scale = hw.scale()
+        sampler = HX711Sampler(scale, capacity=SAMPLE_BUFFER_SIZE, observe=M_HX711.observe)
+        sampler.add_listener(on_sample)
+        sampler.start()
+        if FINAL_REFERENCE_FACTOR > 1:
+            settle = SettleDetector(sampler, FINAL_REFERENCE_FACTOR, window_s=SETTLE_WINDOW,
+                                    max_slope=SETTLE_MAX_SLOPE, max_std=SETTLE_MAX_STD)
         
-        servo = AngularServo(SERVO_PIN, min_angle=0, max_angle=180, 
-                             min_pulse_width=0.0005, max_pulse_width=0.0025)
-        servo.value = None
+        gate = hw.gate()
         
-        print(">>> 硬體初始化... 等待 Load Cell 穩定 (2秒)...")
-        time.sleep(2) 
+        print(">>> 硬體初始化... 等待 Load Cell 穩定...")
         
         if FINAL_REFERENCE_FACTOR > 1:
-            current_bias = read_hx711_value(times=30, use_tare=False)
+            # 秤穩定就歸零，不再固定等 2 秒
+            sampler.wait_samples(30, timeout=10)
+            stable, waited = settle.wait(TARE_SETTLE_TIMEOUT)
+            if not stable: print(f"⚠️ Load Cell {waited:.1f} 秒內未穩定，仍以目前讀數歸零")
+            current_bias = raw_to_kg(sampler.median(30))
             STARTUP_TARE = current_bias
             print(f"✅ 自動歸零完成 (開機偏差: {STARTUP_TARE:.4f} kg)")
             print(f"✅ 已啟用額外紙盒扣重: {BOX_WEIGHT} kg")
         else:
             print("⚠️ 警告: 校正因子未設定。")
+        readiness['scale'] = READY
             
     except Exception as e: 
         print(f"❌ 硬體初始化錯誤: {e}")
-        GPIO.cleanup()
+        readiness['scale'] = FAILED
+        hw.cleanup()
 
 # ================= AI 預測 =================
 def predict_image(image):
-    if exec_net is None: return -1, 0, "NCS2未就緒"
+    if infer_engine is None: return -1, 0, "NCS2未就緒"
     try:
-        input_key = next(iter(net.input_info))
-        n, c, h, w_in = net.input_info[input_key].input_data.shape
-        if image.shape[2] == 4: image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
-        img_resized = cv2.resize(image, (w_in, h))
-        img_input = img_resized.transpose((2, 0, 1)).reshape((n, c, h, w_in))
-        res = exec_net.infer(inputs={input_key: img_input})
-        probs = res[next(iter(net.outputs))][0]
-        cid = np.argmax(probs)
-        return cid, probs[cid], "OK"
+        with M_PREDICT.span():
+            idx, conf = infer_engine.infer_sync(image)
+        cid = idx if breed_classes is None else int(breed_classes[idx])
+        return cid, conf, "OK"
     except Exception as e: return -1, 0, str(e)
 
-# ================= 餵食邏輯 (完全使用時間公式計算) =================
-def smart_feed_thread(target_kg, pet_name):
-    global is_feeding, status_msg, current_weight, system_running
-    
-    if is_feeding: return
+def start_inference_engine():
+    global infer_engine
+    if classifier is None: return
+    postprocess = None
+    if breed_classes is not None:
+        postprocess = DogHead(classifier.num_outputs)
+    elif classifier.num_outputs != 1000:
+        raise ValueError(f"模型輸出 {classifier.num_outputs} 類，BREED_HEAD = full 需要完整 1000 類的模型")
+    pre = classifier.preprocessor
+    pre.letterbox = INFER_LETTERBOX
+    infer_roi.aspect = pre.w / pre.h
+    infer_engine = AsyncInferenceEngine(classifier.exec_net, classifier.input_blob, classifier.out_blob,
+                                        preprocess=classifier.preprocessor,
+                                        on_result=on_inference_result,
+                                        num_requests=len(classifier.exec_net.requests),
+                                        queue_size=INFER_QUEUE_SIZE,
+                                        observe=M_INFER.observe,
+                                        valid=frame_pool.valid,
+                                        postprocess=postprocess)
+    print(f"✅ 非同步推論啟動 ({classifier.device}，共 {len(classifier.exec_net.requests)} 個 infer request)")
+
+def load_classifier(fallback):
+    return hw.classifier(MODEL_XML, MODEL_BIN, device=INFER_DEVICE, num_requests=INFER_REQUESTS,
+                         cache_dir=MODEL_CACHE_DIR, fallback=fallback, cpu_requests=CPU_INFER_REQUESTS)
+
+def new_devices():
+    # 有指定、列舉得到、但目前沒在用的裝置 (列舉很快，不必載入模型)
+    available = hw.available_devices()
+    in_use = {d.name for d in classifier.exec_net.devices}
+    return [d for d in expand_devices(INFER_DEVICE, available) if d in available and d not in in_use]
+
+def model_supervisor():
+    # 背景載入模型 (MYRIAD 編譯可能要十幾秒，有快取時只要匯入)；
+    # 載入失敗以指數退避重試，推論連續失敗視為 NCS2 被拔掉，關掉舊引擎重新連線
+    global classifier, infer_engine
+    delay = MODEL_RETRY_MIN
+    degraded_since = 0.0
+    upgrade_delay = MODEL_RETRY_MAX
+    while True:
+        if infer_engine is None:
+            if readiness['model'] != RECONNECTING: readiness['model'] = LOADING
+            print(f">>> 初始化模型 ({INFER_DEVICE})...")
+            try:
+                t0 = time.perf_counter()
+                classifier = load_classifier(INFER_FALLBACK_DEVICE)
+                start_inference_engine()
+            except Exception as e:
+                print(f"❌ 模型載入失敗: {e} ({delay:.0f} 秒後重試)")
+                if readiness['model'] != RECONNECTING: readiness['model'] = FAILED
+                clock.sleep(delay)
+                delay = min(delay * 2, MODEL_RETRY_MAX)
+                continue
+            cached = " (快取)" if getattr(classifier, 'cached', False) else ""
+            print(f"✅ 模型載入成功 ({classifier.device}{cached}, {time.perf_counter() - t0:.1f} 秒)")
+            delay = MODEL_RETRY_MIN
+            degraded_since = clock.monotonic()
+            upgrade_delay = MODEL_RETRY_MAX
+            readiness['model'] = FALLBACK if classifier.fallback else READY
+        elif infer_engine.consecutive_errors >= INFER_MAX_ERRORS or \
+                classifier.exec_net.unhealthy(INFER_MAX_ERRORS):
+            # 任一裝置連續失敗 (例如兩支 NCS2 拔掉一支) 就整個重新載入，重新列舉裝置
+            bad = classifier.exec_net.unhealthy(INFER_MAX_ERRORS) or classifier.device
+            print(f"⚠️ {bad} 推論連續失敗，重新連線...")
+            readiness['model'] = RECONNECTING
+            engine, infer_engine, classifier = infer_engine, None, None
+            engine.close()
+            continue
+        elif (classifier.fallback or classifier.exec_net.missing) and \
+                clock.monotonic() - degraded_since >= upgrade_delay:
+            # 正在用備援裝置 (CPU) 或有指定的裝置沒載入：定期列舉裝置 (不載入模型)，
+            # 有新的裝置才重新載入並換過去；載入還是失敗就加倍等待時間
+            degraded_since = clock.monotonic()
+            added = new_devices()
+            if added:
+                try:
+                    c = load_classifier(None)
+                except Exception:
+                    c = None
+                if c is not None and (classifier.fallback or len(c.exec_net.devices) > len(classifier.exec_net.devices)):
+                    print(f"✅ {c.device} 已可使用，從 {classifier.device} 切換過去")
+                    old = infer_engine
+                    classifier = c
+                    start_inference_engine()
+                    old.close()
+                    upgrade_delay = MODEL_RETRY_MAX
+                    readiness['model'] = READY
+                else:
+                    upgrade_delay = min(upgrade_delay * 2, MODEL_UPGRADE_RETRY_MAX)
+                    print(f"⚠️ {', '.join(added)} 無法載入，{upgrade_delay:.0f} 秒後再試")
+        clock.sleep(1.0)
+
+# ================= 餵食邏輯 (閉迴路：每次出料後學習流速) =================
+def plan_feed_duration(missing_kg):
+    if FLOW_ADAPTIVE: return flow_model.duration_for(missing_kg)
+    return min(max(missing_kg / FLOW_RATE, 0.1), 10.0)
+
+def close_gate():
+    # 關門後不等馬達轉完 (斷電計時由閘門自己處理)
+    if gate: gate.close()
+
+def wait_for_settle(timeout, since=None, abortable=True, abort=None):
+    # 秤穩定就回傳；沒有秤 (硬體未就緒) 時退回固定等待
+    if settle is None:
+        clock.sleep(timeout)
+        return False, timeout
+    if abort is None and abortable: abort = lambda: not system_running
+    return settle.wait(timeout, since=since, abort=abort if abortable else None)
+
+def run_feed_job(job):
+    # 由 FeedScheduler 的唯一工作執行緒呼叫，同一時間只會有一個工作在出料
+    global is_feeding, status_msg, current_weight
+
+    target_kg, pet_name = job.target_kg, job.pet_name
     is_feeding = True
-    
+    job_t0 = time.perf_counter()
+    stats = FeedStats(pet_name, target_kg, read_hx711_value(),
+                      "adaptive" if FLOW_ADAPTIVE else "fixed")
+    curve_recorder.start()
+
+    def log_feed(record):
+        # 只丟進佇列，由 FeedLog 背景批次寫入資料庫
+        feed_log.record(job.started, pet_name, job.breed_id, record['result'], target_kg,
+                        stats.start_weight, record['final_weight'], record['cycles'],
+                        record['total_time'], curve=curve_recorder.stop(), curve_dt=FEED_CURVE_DT)
+
+    def stopped():
+        return job.cancelled or not system_running
+
     def emergency_stop(reason):
-        global is_feeding, status_msg, current_weight
-        if servo: 
-            servo.angle = SERVO_CLOSE
-            time.sleep(0.5)
-            servo.value = None
-        current_weight = read_hx711_value(times=5)
-        print(f">>> [餵食終止] {reason}, 最終重量: {current_weight:.3f} kg")
-        status_msg = f"餵食終止 ({reason})"
-        is_feeding = False
-        time.sleep(COOLDOWN_TIME)
-        status_msg = "監控中..."
+        global status_msg, current_weight
+        job.state = feed_scheduler.SETTLING
+        close_gate()
+        wait_for_settle(SETTLE_WINDOW * 2, abortable=False)
+        current_weight = read_hx711_value()
+        job.final_weight = current_weight
+        job.reason = job.reason or reason
+        job.state = feed_scheduler.ABORTED
+        log_feed(stats.finish(current_weight, f"aborted: {job.reason}", FEED_STATS_FILE))
+        print(f">>> [餵食終止] {job.reason}, 最終重量: {current_weight:.3f} kg")
+        status_msg = f"餵食終止 ({job.reason})"
 
     try:
         status_msg = f"啟動餵食程序: {pet_name}"
         
         while True: 
-            if not system_running:
+            if stopped():
                 emergency_stop("手動停止")
                 return
 
             # 1. 讀取重量
-            current_weight_local = read_hx711_value(times=3)
+            current_weight_local = read_hx711_value()
             missing_kg = target_kg - current_weight_local
             
             # 2. 判斷是否達標 (誤差 5g 內就停止)
@@ -177,114 +466,184 @@ def smart_feed_thread(target_kg, pet_name):
                 print(f">>> [達標] 剩餘缺量 {missing_kg:.3f}kg 極小，結束餵食。")
                 break 
             
-            # 3. ★★★ 公式計算區 ★★★
-            # 第一次進入時，current_weight_local 接近 0，所以 missing_kg ≈ 目標重量 (體重*0.02)
-            # 公式： 時間 = (目標 - 目前) / 流速
-            feed_duration = missing_kg / FLOW_RATE
-            
+            # 3. ★★★ 出料時間 ★★★
+            # 學習模型： 時間 = (缺量 - 空中落料量) / 學到的流速
             # 安全限制：最短 0.1 秒，最長 10 秒 (避免數值錯誤開太久)
-            if feed_duration < 0.1: feed_duration = 0.1
-            if feed_duration > 10.0: feed_duration = 10.0
+            feed_duration = plan_feed_duration(missing_kg)
+            predicted_kg = flow_model.predict(feed_duration) if FLOW_ADAPTIVE else feed_duration * FLOW_RATE
             
-            print(f">>> [公式計算] 缺 {missing_kg:.3f}kg / 流速 {FLOW_RATE} = 開啟 {feed_duration:.2f} 秒")
+            print(f">>> [出料計算] 缺 {missing_kg:.3f}kg, 流速 {flow_model.rate:.4f}kg/s, "
+                  f"落料 {flow_model.lag_kg*1000:.1f}g, 開門延遲 {flow_model.open_delay:.2f}s = 開啟 {feed_duration:.2f} 秒")
             status_msg = f"出料中 ({feed_duration:.1f}s)..."
             
             # 4. 執行出料 (時間控制)
-            if servo: servo.angle = SERVO_OPEN
+            job.state = feed_scheduler.DISPENSING
+            if gate: gate.open()
+            phase_t0 = time.perf_counter()
             
             # 等待計算出的時間
-            start_t = time.time()
-            while time.time() - start_t < feed_duration:
-                if not system_running: 
+            start_t = clock.monotonic()
+            while clock.monotonic() - start_t < feed_duration:
+                if stopped(): 
                     emergency_stop("手動停止")
                     return
-                time.sleep(0.05) # 小睡一下
+                clock.sleep(0.05) # 小睡一下
             
             # 5. 時間到，立刻關門
-            if servo: 
-                servo.angle = SERVO_CLOSE
-                time.sleep(0.5)
-                servo.value = None
+            close_gate()
+            closed_t = clock.monotonic()
+            M_FEED_DISPENSE.since(phase_t0, pet_name)
             
-            # 6. 等待 5 秒讓重量穩定 (使用者需求)
-            print(f">>> [暫停] 等待 {FEED_INTERVAL_WAIT} 秒讓重量穩定...")
-            status_msg = f"等待穩定 ({FEED_INTERVAL_WAIT}s)..."
-            time.sleep(FEED_INTERVAL_WAIT)
+            # 6. 等待重量穩定 (最多 FEED_INTERVAL_WAIT 秒)
+            job.state = feed_scheduler.SETTLING
+            status_msg = "等待穩定..."
+            phase_t0 = time.perf_counter()
+            stable, waited = wait_for_settle(FEED_INTERVAL_WAIT, since=closed_t, abort=stopped)
+            M_FEED_SETTLE.since(phase_t0, pet_name)
+            if stopped():
+                emergency_stop("手動停止")
+                return
+            print(f">>> [穩定] {'已穩定' if stable else '逾時'}，等待 {waited:.1f} 秒")
             
-            # 更新重量，迴圈回到開頭
+            # 更新重量，用這次實際落下的量修正流速模型，迴圈回到開頭
             # 如果還不夠 (missing_kg > 0.005)，會再算一次新的秒數補料
-            current_weight = read_hx711_value(times=5) 
-            print(f">>> [循環檢查] 目前重量: {current_weight:.3f} kg")
-
+            current_weight = read_hx711_value() 
+            delivered_kg = current_weight - current_weight_local
+            stats.add_pulse(feed_duration, delivered_kg, predicted_kg)
+            if FLOW_ADAPTIVE and not flow_model.update(feed_duration, delivered_kg):
+                print(f"⚠️ 出料量異常 (預測 {predicted_kg:.3f}kg, 實際 {delivered_kg:.3f}kg)，本次不更新流速")
+            print(f">>> [循環檢查] 目前重量: {current_weight:.3f} kg (本次落料 {delivered_kg:.3f} kg)")
+
+        record = stats.finish(current_weight, "done", FEED_STATS_FILE)
+        log_feed(record)
+        if FLOW_ADAPTIVE: flow_model.save()
+        job.final_weight = current_weight
+        job.state = feed_scheduler.DONE
         status_msg = f"餵食完成 (實餵: {current_weight:.3f}kg)"
-        print(f">>> [餵食成功] 最終重量: {current_weight:.3f} kg")
-        time.sleep(COOLDOWN_TIME)
-        status_msg = "監控中..."
+        print(f">>> [餵食成功] 最終重量: {current_weight:.3f} kg, "
+              f"{record['cycles']} 次出料, 共 {record['total_time']} 秒")
         
     except Exception as e:
         print(f"餵食執行緒錯誤: {e}")
         emergency_stop("程式錯誤")
     finally:
+        # 冷卻由排程器在工作結束後以計時器處理
+        curve_recorder.stop()
+        M_FEED_JOB.since(job_t0, f"{pet_name} ({job.state})")
+        voter.reset()
         is_feeding = False
+
+def on_cooldown_end(breed_id):
+    print(f">>> [冷卻結束] {labels.get(breed_id, breed_id)}")
+
+feeder = FeedScheduler(run_feed_job, cooldown=COOLDOWN_TIME, max_per_hour=FEED_MAX_PER_HOUR,
+                       max_queue=FEED_QUEUE_SIZE, on_cooldown_end=on_cooldown_end)
         
-# ================= 主迴圈 (保持不變) =================
-def main_loop():
-    global global_frame, current_weight, status_msg
+def classify_batch(images):
+    if infer_engine is None: raise RuntimeError("NCS2未就緒")
+    with M_PREDICT.span(f"batch x{len(images)}"):
+        return infer_engine.infer_batch(images)
+
+photo_analyzer = PhotoAnalyzer(classify_batch, labels, decode_workers=DECODE_WORKERS,
+                               cache_size=PHOTO_CACHE_SIZE, classes=breed_classes)
+
+# ================= 推論結果處理 (由非同步引擎回呼) =================
+def on_inference_result(probs, meta=None):
+    global status_msg
     global detected_pet_name, detected_breed_info, detected_pet_weight, detected_pet_target
+
+    # 結果回來時系統可能已停止或開始餵食，舊結果直接忽略
+    if not system_running or is_feeding: return
+
+    # 多張畫面投票，結果穩定了才往下處理
+    event = voter.update(probs)
+    if event is False: return
+    cid, conf = event
+
+    if cid is not None:
+        t0 = time.perf_counter()
+        row = pets.get(cid)
+        M_PET_LOOKUP.since(t0)
+
+        if row:
+            p_name, p_weight, p_target = row[:3]
+            detected_pet_name = p_name
+            detected_pet_weight = f"{p_weight} kg"
+            detected_pet_target = p_target
+            detected_breed_info = f"{labels.get(cid, '未知')} ({int(conf*100)}%)"
+
+            if readiness['scale'] != READY:
+                status_msg = f"{p_name} 靠近 (秤尚未就緒)"
+            elif current_weight < p_target:
+                # 排程器負責去重、冷卻與頻率上限，被拒絕時顯示原因
+                job, reason = feeder.submit(p_name, cid, p_target)
+                if job: status_msg = f"排入餵食: {p_name} (#{job.id})"
+                else: status_msg = f"{p_name} {reason}"
+            else:
+                status_msg = f"{p_name} 靠近 (已飽)"
+        else:
+            detected_pet_name = "未註冊"; status_msg = "發現新狗狗"
+    else:
+        detected_pet_name = "---"
+        status_msg = "監控中..."
+
+# ================= 主迴圈 =================
+def main_loop():
+    global current_weight, status_msg
     
-    setup_hardware()
-    cap = cv2.VideoCapture(0)
-    cap.set(3, 640); cap.set(4, 480); cap.set(cv2.CAP_PROP_FPS, 30)
+    # 秤在另一個執行緒初始化 (等穩定、歸零)，不擋住攝影機畫面
+    threading.Thread(target=setup_hardware, daemon=True).start()
+    readiness['camera'] = LOADING
+    try:
+        cap = hw.camera()
+    except Exception as e:
+        print(f"❌ 攝影機初始化錯誤: {e}")
+        readiness['camera'] = FAILED
+        return
+    readiness['camera'] = READY
 
     print(">>> 系統啟動 (多執行緒模式)")
     frame_count = 0
+    raw = None     # 攝影機原始畫面的暫存區，每張都讀進同一塊
 
     while True:
         try:
-            if frame_count % 3 == 0: 
-                current_weight = read_hx711_value(times=1)
+            current_weight = read_hx711_value()
 
-            ret, frame = cap.read()
-            if not ret:
-                cap.release(); time.sleep(1); cap = cv2.VideoCapture(0); continue
+            t0 = time.perf_counter()
+            ret, raw = cap.read(raw)
+            M_CAPTURE.since(t0)
+            if not ret: raw = None; continue
 
-            frame = cv2.flip(frame, -1)
-            with lock: global_frame = frame.copy()
+            # 翻轉直接寫進緩衝池的 buffer；之後大家拿的都是同一塊的唯讀 view，不再複製
+            t0 = time.perf_counter()
+            seq, buf = frame_pool.acquire(raw.shape, raw.dtype)
+            cv2.flip(raw, -1, dst=buf)
+            frame = frame_pool.view(seq)
+            M_FLIP.since(t0)
+            broadcaster.publish(frame, seq)
 
             if system_running and not is_feeding:
+                # 沒有動態就不推論 (縮圖灰階比對，成本遠低於推論)
+                if MOTION_GATE:
+                    t0 = time.perf_counter()
+                    moving = motion_gate.update(frame)
+                    M_MOTION.since(t0)
+                    if not moving: time.sleep(0.005); continue
+
                 frame_count += 1
                 if frame_count % 5 != 0: time.sleep(0.005); continue
 
-                cid, conf, err = predict_image(frame)
-                
-                if cid != -1 and 151 <= cid <= 268 and conf > 0.7:
-                    conn = sqlite3.connect('feeder.db')
-                    c = conn.cursor()
-                    c.execute('SELECT name, weight, target_feed FROM pets WHERE breed_id=?', (int(cid),))
-                    row = c.fetchone()
-                    conn.close()
-
-                    if row:
-                        p_name, p_weight, p_target = row
-                        detected_pet_name = p_name
-                        detected_pet_weight = f"{p_weight} kg"
-                        detected_pet_target = p_target
-                        detected_breed_info = f"{labels.get(cid, '未知')} ({int(conf*100)}%)"
-
-                        if current_weight < p_target:
-                            t = threading.Thread(target=smart_feed_thread, args=(p_target, p_name))
-                            t.start()
-                            status_msg = f"啟動餵食程序: {p_name}"
-                        else:
-                            status_msg = f"{p_name} 靠近 (已飽)"
-                    else:
-                        detected_pet_name = "未註冊"; status_msg = "發現新狗狗"
-                else:
-                    detected_pet_name = "---"
-                    status_msg = "監控中..."
+                # 只送出畫面，不等結果；結果由 on_inference_result 回呼處理
+                # 送出的是 ROI 的 view，前處理只縮放這一塊
+                if infer_engine is not None:
+                    infer_engine.submit(infer_roi.crop(frame, motion_gate.last_box if MOTION_GATE else None), seq)
+                    motion_gate.inferences += 1
 
             elif not system_running:
                 status_msg = "系統已暫停"; frame_count = 0
+                motion_gate.reset()
+                voter.reset()
 
         except Exception as e:
             print(f"Loop Error: {e}")
@@ -295,44 +654,222 @@ def main_loop():
 @app.route('/')
 def index(): return render_template('index.html')
 
-@app.route('/status')
-def status():
+def status_snapshot():
+    weight = read_hx711_value()
+    _, weight_var = estimator.estimate()
     missing = 0.0
     sec = 0.0
     if system_running and detected_pet_target > 0:
-        d = detected_pet_target - current_weight
+        d = detected_pet_target - weight
         if d > 0: 
             missing = d
-            sec = d / FLOW_RATE
+            sec = plan_feed_duration(d)
             
-    return jsonify({
+    return {
         'running': system_running,
+        'feeding': is_feeding,
         'msg': status_msg,
-        'weight': f"{current_weight:.3f}",
+        'weight': f"{weight:.3f}",
+        'weight_std': f"{(weight_var or 0.0) ** 0.5:.4f}",
         'pet_name': detected_pet_name,
         'pet_weight': detected_pet_weight,
         'breed_info': detected_breed_info,
         'target_feed': f"{detected_pet_target:.3f}",
         'missing_weight': f"{missing:.3f}",
-        'supplement_seconds': f"{sec:.1f}"
-    })
+        'supplement_seconds': f"{sec:.1f}",
+        'flow_rate': f"{flow_model.rate:.3f}",
+        'inference': infer_engine.stats() if infer_engine else None,
+        'motion': motion_gate.stats(),
+        'roi': infer_roi.stats(),
+        'ready': dict(readiness),
+        'feed_job': feeder.current.to_dict() if feeder.current else None
+    }
+
+status_hub = StatusHub(status_snapshot, interval=STATUS_PUSH_INTERVAL,
+                       throttle={'weight': WEIGHT_PUSH_INTERVAL,
+                                 'weight_std': WEIGHT_PUSH_INTERVAL,
+                                 'inference': 5.0,
+                                 'motion': 5.0,
+                                 'roi': 5.0})
+
+@app.route('/status')
+def status():
+    return jsonify(status_snapshot())
+
+# --- 量測 ---
+metrics.gauge("feeder_frames_total", "攝影機畫面數", lambda: motion_gate.frames_seen, "counter")
+metrics.gauge("feeder_frames_gated_total", "被動態閘門擋下的畫面數", lambda: motion_gate.frames_gated, "counter")
+metrics.gauge("feeder_infer_submitted_total", "送出推論的畫面數",
+              lambda: infer_engine.submitted if infer_engine else None, "counter")
+metrics.gauge("feeder_infer_dropped_total", "推論佇列擠掉的畫面數",
+              lambda: infer_engine.dropped if infer_engine else None, "counter")
+metrics.gauge("feeder_infer_roi_area_ratio", "推論 ROI 平均佔畫面的面積比例",
+              lambda: infer_roi.stats()['avg_area_ratio'])
+def device_stat(key, scale=1.0):
+    # 各推論裝置的統計，給帶 device 標籤的 gauge 用
+    if classifier is None: return None
+    return {d['device']: d[key] * scale for d in classifier.exec_net.stats()}
+
+metrics.gauge("feeder_infer_device_completed_total", "各裝置完成的推論數",
+              lambda: device_stat('completed'), "counter", label="device")
+metrics.gauge("feeder_infer_device_errors_total", "各裝置推論錯誤數",
+              lambda: device_stat('errors'), "counter", label="device")
+metrics.gauge("feeder_infer_device_latency_seconds", "各裝置推論延遲 (指數平均)",
+              lambda: device_stat('latency_ms', 0.001), label="device")
+metrics.gauge("feeder_infer_device_fps", "各裝置最近 10 秒的推論吞吐量",
+              lambda: device_stat('fps'), label="device")
+metrics.gauge("feeder_infer_device_busy", "各裝置執行中的 infer request 數",
+              lambda: device_stat('busy'), label="device")
+metrics.gauge("feeder_jpeg_encodes_total", "JPEG 編碼次數", lambda: broadcaster.encode_count, "counter")
+metrics.gauge("feeder_hx711_samples_total", "HX711 樣本數", lambda: sampler.count if sampler else None, "counter")
+metrics.gauge("feeder_hx711_errors_total", "HX711 讀取錯誤數", lambda: sampler.errors if sampler else None, "counter")
+metrics.gauge("feeder_feed_log_written_total", "已寫入的餵食紀錄", lambda: feed_log.written, "counter")
+metrics.gauge("feeder_bowl_weight_kg", "碗內目前重量", lambda: current_weight)
+metrics.gauge("feeder_flow_rate_kg_per_second", "學到的出料流速", lambda: flow_model.rate)
+metrics.gauge("feeder_feeding", "是否正在餵食", lambda: int(is_feeding))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/metrics/slow')
+def metrics_slow():
+    return jsonify(metrics.slow_events(request.args.get('n', type=int)))
+
+# --- 並行上限 ---
+video_slots = threading.BoundedSemaphore(MAX_VIDEO_STREAMS)
+event_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+analyze_slots = threading.BoundedSemaphore(ANALYZE_MAX_PENDING)
+analyze_pool = ThreadPoolExecutor(max_workers=ANALYZE_WORKERS)
+
+def limited_response(gen, slots, **kwargs):
+    # 呼叫前已取得名額；回應關閉時歸還 (串流結束、客戶端斷線、HEAD、還沒開始迭代就關閉都會呼叫 close)。
+    # 不能靠產生器的 finally：從沒開始迭代的產生器關閉時不會執行 finally
+    once = threading.Lock()
+    def release():
+        if once.acquire(blocking=False): slots.release()
+    try:
+        resp = Response(gen, **kwargs)
+        resp.call_on_close(release)
+    except Exception:
+        release()
+        raise
+    return resp
+
+def busy_response(msg):
+    return jsonify({'success': False, 'msg': msg}), 503
+
+@app.route('/events')
+def events():
+    # Server-Sent Events：第一筆送完整狀態，之後只送有變動的欄位
+    def stream():
+        version = 0
+        yield "retry: 3000\n\n"
+        while True:
+            version, changed = status_hub.wait_changes(version, timeout=15.0)
+            if changed: yield f"data: {json.dumps(changed, ensure_ascii=False)}\n\n"
+            else: yield ": keepalive\n\n"
+    if not event_slots.acquire(blocking=False): return busy_response("連線數已滿")
+    return limited_response(stream(), event_slots, mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/set_system', methods=['POST'])
 def set_system():
     global system_running
-    system_running = (request.form.get('action') == 'start')
+    action = request.form.get('action')
+    if action == 'cancel_feed':
+        # 只取消目前/排隊中的餵食，不停止監控
+        n = feeder.cancel_all("手動取消")
+        return jsonify({'status':'ok', 'running':system_running, 'cancelled':n})
+    system_running = (action == 'start')
+    if not system_running: feeder.cancel_all("手動停止")
     return jsonify({'status':'ok', 'running':system_running})
 
+@app.route('/feed_jobs')
+def feed_jobs():
+    return jsonify(feeder.jobs())
+
+@app.route('/feed_jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_feed_job(job_id):
+    ok = feeder.cancel(job_id, "手動取消")
+    return jsonify({'success': ok}), (200 if ok else 404)
+
 @app.route('/analyze_photo', methods=['POST'])
 def analyze_photo():
     try:
         f = request.files['photo']
         if not f: return jsonify({'success': False, 'msg': '無檔'})
-        img = cv2.imdecode(np.frombuffer(f.read(), np.uint8), cv2.IMREAD_COLOR)
-        cid, conf, err = predict_image(img)
-        if cid==-1: return jsonify({'success':False, 'msg':err})
-        return jsonify({'success':True, 'breed_id':int(cid), 'breed_name':labels.get(cid,"?"), 'is_dog':bool(151<=cid<=268)})
+        data = f.read()
+    except Exception as e: return jsonify({'success':False, 'msg':str(e)})
+
+    # 解碼 + 推論交給專用執行緒池：只是限制同時分析的數量 (排隊數有上限、逾時回 504)，
+    # 等結果時網頁 worker 仍被佔住 (serve.py 的 worker 數已把 ANALYZE_MAX_PENDING 算進去)
+    if not analyze_slots.acquire(blocking=False): return busy_response("分析佇列已滿，請稍後再試")
+    def work():
+        try:
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if img is None: return -1, 0, "無法解析圖片"
+            return predict_image(img)
+        finally:
+            analyze_slots.release()
+
+    try:
+        cid, conf, err = analyze_pool.submit(work).result(timeout=ANALYZE_TIMEOUT)
+    except FutureTimeout:
+        return jsonify({'success': False, 'msg': '分析逾時'}), 504
+    except Exception as e: return jsonify({'success':False, 'msg':str(e)})
+    if cid==-1: return jsonify({'success':False, 'msg':err})
+    return jsonify({'success':True, 'breed_id':int(cid), 'breed_name':labels.get(cid,"?"), 'is_dog':is_dog(cid)})
+
+# --- 餵食歷史查詢 ---
+@app.route('/history/daily')
+def history_daily():
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+    return jsonify(feed_log.daily_totals(request.args.get('breed_id', type=int), days=days))
+
+@app.route('/history/feeds')
+def history_feeds():
+    n = min(max(request.args.get('n', 20, type=int), 1), 500)
+    return jsonify(feed_log.last_feeds(n, request.args.get('breed_id', type=int)))
+
+@app.route('/history/feeds/<int:feed_id>/curve')
+def history_curve(feed_id):
+    c = feed_log.curve(feed_id)
+    if c is None: return jsonify({'success': False, 'msg': '沒有曲線資料'}), 404
+    dt, data = c
+    return jsonify({'success': True, 'dt': dt, 'weights': [round(float(w), 4) for w in data]})
+
+@app.route('/analyze_photos', methods=['POST'])
+def analyze_photos():
+    # 多個檔案 (欄位 photos) 或 zip (欄位 archive)；回傳每張的前 k 名品種
+    try:
+        items = []
+        for f in request.files.getlist('photos'):
+            data = f.read(BATCH_MAX_FILE_BYTES + 1)
+            if data and len(data) <= BATCH_MAX_FILE_BYTES: items.append((f.filename, data))
+        archive = request.files.get('archive')
+        if archive:
+            items += read_zip(archive.stream, BATCH_MAX_IMAGES - len(items), BATCH_MAX_FILE_BYTES,
+                              max_total=BATCH_MAX_ZIP_BYTES, max_entries=BATCH_MAX_ZIP_ENTRIES)
+        items = items[:BATCH_MAX_IMAGES]
+    except ArchiveTooLarge as e: return jsonify({'success': False, 'msg': str(e)}), 413
+    except Exception as e: return jsonify({'success':False, 'msg':str(e)})
+    if not items: return jsonify({'success': False, 'msg': '無檔'})
+    k = min(max(request.args.get('k', BATCH_TOP_K, type=int), 1), 10)
+
+    if not analyze_slots.acquire(blocking=False): return busy_response("分析佇列已滿，請稍後再試")
+    def work():
+        try:
+            return photo_analyzer.analyze(items, k)
+        finally:
+            analyze_slots.release()
+
+    try:
+        results = analyze_pool.submit(work).result(timeout=BATCH_TIMEOUT)
+    except FutureTimeout:
+        return jsonify({'success': False, 'msg': '分析逾時'}), 504
     except Exception as e: return jsonify({'success':False, 'msg':str(e)})
+    return jsonify({'success': True, 'results': results})
 
 @app.route('/save_pet', methods=['POST'])
 def save_pet():
@@ -342,28 +879,52 @@ def save_pet():
         bid = int(request.form['breed_id'])
         bn = request.form['breed_name']
         t = round(w * FEED_RATIO, 3)
-        with sqlite3.connect('feeder.db') as conn:
-            conn.execute('DELETE FROM pets WHERE breed_id=?',(bid,))
-            conn.execute('INSERT INTO pets VALUES (?,?,?,?,?)',(n,w,t,bid,bn))
+        pets.save(n, w, t, bid, bn)
         return jsonify({'success':True})
     except Exception as e: return jsonify({'success':False, 'msg':str(e)})
 
-def generate():
+def generate(quality, max_fps, overlay=False):
+    # 共用廣播站編好的 JPEG；依各自的 FPS 上限節流，慢的客戶端直接跳到最新畫面
+    min_interval = 1.0 / max_fps
+    last_seq = 0
+    last_sent = 0.0
     while True:
-        with lock:
-            if global_frame is None: continue
-            (flag, enc) = cv2.imencode(".jpg", global_frame)
-        if flag: yield(b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + bytearray(enc) + b'\r\n')
-        time.sleep(0.04)
+        wait = min_interval - (time.monotonic() - last_sent)
+        if wait > 0: time.sleep(wait)
+        last_seq, jpg = broadcaster.wait_next(last_seq, quality, overlay=overlay)
+        if jpg is None: continue
+        last_sent = time.monotonic()
+        yield(b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpg + b'\r\n')
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    quality = min(max(request.args.get('q', STREAM_JPEG_QUALITY, type=int), 10), 95)
+    max_fps = min(max(request.args.get('fps', STREAM_MAX_FPS, type=float), 1.0), STREAM_MAX_FPS)
+    overlay = request.args.get('roi', int(STREAM_SHOW_ROI), type=int) == 1
+    if not video_slots.acquire(blocking=False): return busy_response("觀看人數已滿")
+    return limited_response(generate(quality, max_fps, overlay), video_slots,
+                            mimetype='multipart/x-mixed-replace; boundary=frame')
+
+# ================= 背景執行緒啟動 =================
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background():
+    # 硬體、推論、狀態推播只能啟動一次 (不論用 app.py 或 serve.py 啟動)
+    global _background_started
+    with _background_lock:
+        if _background_started: return
+        _background_started = True
+    print(f"✅ 寵物資料載入完成 ({len(pets.all())} 筆)")
+    feed_log.start()
+    feeder.start()
+    # 攝影機/秤 與 模型 並行載入，網頁不必等它們
+    for target in (main_loop, model_supervisor):
+        t = threading.Thread(target=target)
+        t.daemon = True
+        t.start()
+    status_hub.start()
 
 if __name__ == '__main__':
-    with sqlite3.connect('feeder.db') as conn:
-        conn.execute('''CREATE TABLE IF NOT EXISTS pets (name TEXT, weight REAL, target_feed REAL, breed_id INTEGER, breed_name TEXT)''')
-    t = threading.Thread(target=main_loop)
-    t.daemon = True
-    t.start()
+    start_background()
     app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
\ No newline at end of file
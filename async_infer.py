@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+import collections
+import queue
+import threading
+import time
+import numpy as np
+
+
+_ORPHANED = object()     # infer_batch 已放棄等待、完成後要歸還的 request
+
+
+class AsyncInferenceEngine:
+    """
+    NCS2 非同步推論引擎：同時有多個 infer request 在跑 (start_async)，
+    擷取迴圈只負責 submit()，結果 (softmax 機率向量) 由 on_result(probs, meta) 回呼送回。
+    有 postprocess 時 (例如 DogHead) 結果是 postprocess(機率向量)。
+    待處理佇列滿時丟掉最舊的畫面，推論延遲永遠不會拖慢擷取。
+    """
+
+    def __init__(self, exec_net, input_blob, out_blob, preprocess, on_result,
+                 num_requests=2, queue_size=1, observe=None, valid=None, postprocess=None):
+        self.exec_net = exec_net
+        self.input_blob = input_blob
+        self.out_blob = out_blob
+        self.preprocess = preprocess
+        self.on_result = on_result
+        self.num_requests = num_requests
+        self.observe = observe          # observe(秒數)：送出到完成的延遲 (量測用，可為 None)
+        self.valid = valid              # valid(meta)：畫面來自 FramePool 時，前處理後確認 buffer 沒被覆寫
+        self.postprocess = postprocess  # postprocess(機率向量) → 新陣列；None = 直接複製
+
+        self._pending = collections.deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        # 空閒的 request 依編號取用 (小的先)；多裝置時排在前面的裝置優先
+        self._idle = queue.PriorityQueue()
+        self._inflight = {}
+        self._waiters = {}       # infer_batch 借用中的 request: rid -> 完成通知佇列 (或 _ORPHANED)
+        self._waiters_lock = threading.Lock()
+
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.errors = 0
+        self.consecutive_errors = 0     # 連續失敗次數 (NCS2 被拔掉時會一直累加)
+        self._closed = False
+        self.last_latency = 0.0
+
+        for rid in range(num_requests):
+            self.exec_net.requests[rid].set_completion_callback(
+                py_callback=self._on_complete, py_data=rid)
+            self._idle.put(rid)
+
+        t = threading.Thread(target=self._dispatch_loop)
+        t.daemon = True
+        t.start()
+
+    def submit(self, frame, meta=None):
+        # 不阻塞；佇列已滿時 deque 會自動擠掉最舊的一張
+        if self._closed: return
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append((frame, meta))
+            self.submitted += 1
+            self._cond.notify()
+
+    def infer_sync(self, image):
+        # 給 /analyze_photo 等同步呼叫使用：借一個空閒的 request，不與非同步流程搶同一個
+        rid = self._borrow()
+        try:
+            req = self.exec_net.requests[rid]
+            self.preprocess(image, out=req.input_blobs[self.input_blob].buffer)
+            try:
+                req.infer()
+            except Exception:
+                self._count_error()
+                raise
+            self.consecutive_errors = 0
+            probs = self._result(req)
+            cid = int(np.argmax(probs))
+            return cid, float(probs[cid])
+        finally:
+            self._idle.put(rid)
+
+    def infer_batch(self, images, timeout=10.0):
+        """
+        多張圖片 (/analyze_photos) 同時用多個 infer request 跑 (start_async)，回傳每張的機率向量 (複本)。
+        至少借一個 request，其餘有空閒才借，不會把即時迴圈完全擋住。
+        哪個 request 先做完就先還回去再借下一張，不必等同一輪最慢的裝置。
+        """
+        results = [None] * len(images)
+        pending = collections.deque(enumerate(images))
+        done_q = queue.Queue()
+        active = {}         # rid -> 圖片索引
+        started = set()     # 已 start_async、還沒收到完成回呼的 rid
+        try:
+            while pending or active:
+                while pending:
+                    # 手上沒有 request 時才阻塞等待
+                    try: rid = self._borrow(block=not active)
+                    except queue.Empty: break
+                    i, image = pending.popleft()
+                    active[rid] = i
+                    req = self.exec_net.requests[rid]
+                    self.preprocess(image, out=req.input_blobs[self.input_blob].buffer)
+                    self._waiters[rid] = done_q
+                    try:
+                        self.exec_net.start_async(request_id=rid)
+                    except Exception:
+                        self._count_error()
+                        raise
+                    started.add(rid)
+                try:
+                    rid, status = done_q.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError("推論逾時")
+                i = active.pop(rid)
+                started.discard(rid)
+                try:
+                    if status != 0: raise RuntimeError(f"推論失敗 (status {status})")
+                    results[i] = self._result(self.exec_net.requests[rid])
+                finally:
+                    self._waiters.pop(rid, None)
+                    self._idle.put(rid)
+        finally:
+            self._release_batch(active, started, done_q)
+        return results
+
+    def _release_batch(self, active, started, done_q):
+        # 逾時或出錯離開 infer_batch：沒在跑的 request 直接歸還；還在跑的不能馬上借給別人
+        # (完成時會覆寫輸出)，標成 _ORPHANED 由完成回呼歸還
+        with self._waiters_lock:
+            while True:
+                try: rid, _ = done_q.get_nowait()
+                except queue.Empty: break
+                started.discard(rid)
+            for rid in active:
+                if rid in started:
+                    self._waiters[rid] = _ORPHANED
+                else:
+                    self._waiters.pop(rid, None)
+                    self._idle.put(rid)
+
+    def _dispatch_loop(self):
+        while True:
+            # 有畫面才去借 request (不佔著 request 空等，infer_sync / infer_batch 才借得到)；
+            # 借到後才取畫面，確保送進去的是最新的一張
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) > 0 or self._closed)
+            rid = self._idle.get()
+            with self._cond:
+                if self._closed:
+                    # 拿到的可能是 close() 的哨兵，也可能是真的 request：都放回去
+                    self._idle.put(rid)
+                    return
+                if not self._pending:
+                    self._idle.put(rid)
+                    continue
+                frame, meta = self._pending.popleft()
+            try:
+                # 前處理直接寫進該 request 的輸入 blob，不再另外傳 inputs
+                req = self.exec_net.requests[rid]
+                self.preprocess(frame, out=req.input_blobs[self.input_blob].buffer)
+                if self.valid is not None and not self.valid(meta):
+                    # 排隊太久，畫面已被覆寫：丟掉這張，request 還回去
+                    self.dropped += 1
+                    self._idle.put(rid)
+                    continue
+                self._inflight[rid] = (meta, time.monotonic())
+                self.exec_net.start_async(request_id=rid)
+            except Exception as e:
+                print(f"❌ 非同步推論送出失敗: {e}")
+                self._count_error()
+                self._inflight.pop(rid, None)
+                self._idle.put(rid)
+                time.sleep(0.1)
+
+    def _borrow(self, block=True):
+        rid = self._idle.get(block=block)
+        if rid < 0:
+            # close() 放的哨兵 (-1 排在最前面)：留在佇列裡，之後的借用者也會看到
+            self._idle.put(rid)
+            raise RuntimeError("推論引擎已關閉")
+        return rid
+
+    def _on_complete(self, status, rid):
+        with self._waiters_lock:
+            waiter = self._waiters.get(rid)
+            if waiter is _ORPHANED:
+                # infer_batch 逾時時還在跑的 request：現在才做完，還回空閒佇列
+                del self._waiters[rid]
+                self._idle.put(rid)
+                return
+            if waiter is not None:
+                # infer_batch 借用的 request：通知等待端，request 由它歸還
+                # (在鎖內送出，_release_batch 清空通知佇列時不會漏掉)
+                waiter.put((rid, status))
+                return
+        entry = self._inflight.pop(rid, None)
+        if entry is None: return  # infer_sync 觸發的回呼，不處理
+        meta, t0 = entry
+        result = None
+        try:
+            if status == 0:
+                # 歸還 request 前先取出結果，之後這塊記憶體會被下一次推論覆蓋
+                result = self._result(self.exec_net.requests[rid])
+        except Exception as e:
+            print(f"❌ 推論結果解析失敗: {e}")
+        finally:
+            self._idle.put(rid)
+
+        if result is None: self._count_error()
+        else: self.consecutive_errors = 0
+
+        self.last_latency = time.monotonic() - t0
+        if self.observe is not None: self.observe(self.last_latency)
+        self.completed += 1
+        if result is not None:
+            self.on_result(result, meta)
+
+    def _count_error(self):
+        self.errors += 1
+        self.consecutive_errors += 1
+
+    def close(self):
+        # 停掉派送執行緒 (換新的 exec_net 前呼叫)；之後送進來的畫面直接丟掉，
+        # infer_sync / infer_batch 借到哨兵時丟出 RuntimeError
+        self._closed = True
+        self._idle.put(-1)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _probs(self, req):
+        # 輸出可能是 [1, N] 或 [1, N, 1, 1]，一律攤平成一維 (view，不複製)
+        return req.output_blobs[self.out_blob].buffer[0].reshape(-1)
+
+    def _result(self, req):
+        probs = self._probs(req)
+        return self.postprocess(probs) if self.postprocess is not None else probs.copy()
+
+    def stats(self):
+        return {
+            'requests': self.num_requests,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'completed': self.completed,
+            'errors': self.errors,
+            'last_latency_ms': round(self.last_latency * 1000, 1),
+            'devices': self.exec_net.stats() if hasattr(self.exec_net, 'stats') else None,
+        }
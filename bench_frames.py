@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# 擷取迴圈的記憶體配置比較：舊版 (每張 flip + copy 都配置新陣列) vs FramePool (預先配置、原地翻轉)
+# 用法: python3 bench_frames.py [--frames 3000] [--size 640x480]
+# 兩種模式各在獨立的子行程跑，RSS 才不會互相影響；每張的新配置量以 tracemalloc 實際量測。
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+from frame_pool import FramePool
+
+
+def rss_kb(field="VmRSS"):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"): return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class Consumer(threading.Thread):
+    # 模擬 /video_feed：另一個執行緒每 1/fps 秒拿最新畫面編碼一次
+    def __init__(self, get_latest, fps=15):
+        super().__init__(daemon=True)
+        self.get_latest = get_latest
+        self.period = 1.0 / fps
+        self.stop = threading.Event()
+        self.encoded = 0
+
+    def run(self):
+        while not self.stop.wait(self.period):
+            frame = self.get_latest()
+            if frame is not None:
+                cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+                self.encoded += 1
+
+
+def make_step(mode, src, latest):
+    """一張畫面的擷取處理；回傳 (step, 開機時配置的陣列數)。"""
+    if mode == "legacy":
+        lock = threading.Lock()
+
+        def step():
+            frame = src.copy()                  # cap.read() 每次回傳新陣列
+            frame = cv2.flip(frame, -1)         # 翻轉再配置一次
+            with lock:
+                latest[0] = frame.copy()        # global_frame = frame.copy()
+        return step, 0
+
+    pool = FramePool(4)
+    raw = np.empty_like(src)
+
+    def step():
+        np.copyto(raw, src)                     # cap.read(raw) 讀進同一塊暫存區
+        seq, buf = pool.acquire(raw.shape, raw.dtype)
+        cv2.flip(raw, -1, dst=buf)
+        latest[0] = pool.view(seq)              # 唯讀 view，不複製
+    return step, 1 + pool.size                  # 暫存區 + 緩衝池
+
+
+def traced_bytes(step, frames):
+    """
+    以 tracemalloc 量每張畫面新配置的記憶體 (numpy 陣列的 buffer 都會回報給 tracemalloc)：
+    每張開始時記下目前用量並重設峰值，結束時 峰值 - 開始用量 = 這張期間新配置的位元組
+    (同時存在的配置全部算到；先放掉再配置的只算一次，所以是下限)。
+    沒有編碼執行緒 (它的配置不算擷取迴圈的)。
+    """
+    step()      # 暖機：緩衝池第一次 acquire 才配置
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(frames):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - current
+    finally:
+        tracemalloc.stop()
+    return total / frames
+
+
+def run(mode, frames, w, h):
+    src = np.random.randint(0, 255, (h, w, 3), np.uint8)
+    latest = [None]
+    step, setup = make_step(mode, src, latest)
+    consumer = Consumer(lambda: latest[0])
+    consumer.start()
+
+    rss0 = rss_kb()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        step()
+    elapsed = time.perf_counter() - t0
+    consumer.stop.set()
+    consumer.join()
+    rss_delta = (rss_kb() - rss0) / 1024
+
+    per_frame = traced_bytes(step, min(frames, 500))
+    print(f"{mode:<7} {elapsed / frames * 1e6:7.1f} us/張  "
+          f"每張新配置 {per_frame / 1e6:5.2f} MB (約 {per_frame / src.nbytes:.1f} 張畫面; "
+          f"本機 {per_frame * frames / elapsed / 1e6:6.0f} MB/s, 30 fps = {per_frame * 30 / 1e6:5.1f} MB/s; "
+          f"開機配置 {setup} 個)  "
+          f"RSS +{rss_delta:6.1f} MB  峰值 {rss_kb('VmHWM') / 1024:6.1f} MB  "
+          f"編碼 {consumer.encoded} 張")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="擷取迴圈記憶體配置比較")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--mode", choices=("legacy", "pool"), default=None)
+    args = parser.parse_args()
+    w, h = (int(x) for x in args.size.split("x"))
+
+    if args.mode:
+        run(args.mode, args.frames, w, h)
+        return
+    print(f">>> {args.frames} 張 {w}x{h}，另有一個執行緒以 15 fps 編碼最新畫面")
+    for mode in ("legacy", "pool"):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode,
+                        "--frames", str(args.frames), "--size", args.size], check=True)
+
+
+if __name__ == '__main__':
+    main()
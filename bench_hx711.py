@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# HX711 讀取路徑基準測試 (不需要樹莓派)：用假的 RPi.GPIO 模組比較
+# 舊版 readRawBytes + bytesToLong 與新版 clockOutLong 的每秒取樣數，
+# 並量測 PD_SCK 拉高的最長時間 (超過 60 µs HX711 會進入省電模式)。
+# Python 無法保證拉高時間 (執行緒可能在兩次 output 之間被搶走)，新版會量每個脈衝，
+# 超時就丟掉這筆、強制重置晶片後重讀；這裡確認每一次超時都有被丟掉 (重置用的長脈衝不算超時)。
+# 用法: python bench_hx711.py [次數] [背景負載執行緒數]
+import random
+import sys
+import threading
+import time
+import types
+
+PD_SCK_LIMIT_US = 60.0
+
+
+class MockGPIO(types.ModuleType):
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    FALLING = "FALLING"
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.bits = []
+        self.pos = 0
+        self.high_since = None
+        self.max_high = 0.0
+        self.overruns = 0
+        self.resetting = False      # discardSample() 故意拉高重置晶片，不算超時
+
+    def load_bits(self, bits):
+        self.bits = bits
+        self.pos = 0
+
+    def setmode(self, mode): pass
+    def setwarnings(self, flag): pass
+    def setup(self, pin, mode): pass
+    def cleanup(self): pass
+    def add_event_detect(self, pin, edge, callback=None): pass
+    def remove_event_detect(self, pin): pass
+
+    def output(self, pin, value):
+        now = time.perf_counter()
+        if value:
+            self.high_since = now
+        elif self.high_since is not None and self.resetting:
+            self.high_since = None
+        elif self.high_since is not None:
+            high = now - self.high_since
+            self.max_high = max(self.max_high, high)
+            if high * 1e6 > PD_SCK_LIMIT_US: self.overruns += 1
+            self.high_since = None
+
+    def input(self, pin):
+        # DOUT：不在讀位元時永遠「已就緒」(0)；讀位元時依序回傳測試資料
+        if not self.bits: return 0
+        bit = self.bits[self.pos]
+        self.pos = (self.pos + 1) % len(self.bits)
+        return bit
+
+
+gpio = MockGPIO()
+rpi = types.ModuleType("RPi")
+rpi.GPIO = gpio
+sys.modules["RPi"] = rpi
+sys.modules["RPi.GPIO"] = gpio
+
+import hx711              # noqa: E402  (必須在假 GPIO 之後匯入)
+from hx711 import HX711   # noqa: E402
+
+
+def legacy_read(hx):
+    # 優化前的 read_long()
+    return hx.bytesToLong(hx.readRawBytes())
+
+
+def bench(name, fn, hx, samples):
+    gpio.max_high = 0.0
+    gpio.overruns = 0
+    discarded = hx.discardedSamples
+    start = time.perf_counter()
+    for _ in range(samples):
+        fn(hx)
+    elapsed = time.perf_counter() - start
+    max_high_us = gpio.max_high * 1e6
+    discarded = hx.discardedSamples - discarded
+    # 舊版不檢查：超時的樣本照樣回傳 (讀到的是省電模式後的錯誤資料)
+    flag = "OK" if gpio.overruns == 0 else ("已全部丟棄重讀" if discarded >= gpio.overruns else "⚠️ 錯誤樣本")
+    print(f"{name:<24} {samples / elapsed:9.0f} 筆/秒   PD_SCK 最長 {max_high_us:8.1f} µs   "
+          f"超時 {gpio.overruns} 次, 丟棄 {discarded} 筆 ({flag})")
+    return samples / elapsed
+
+
+def cpu_load(stop):
+    x = 0
+    while not stop.is_set():
+        x = (x * 31 + 7) % 1000003
+
+
+if __name__ == '__main__':
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    load_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    hx = HX711(23, 24)
+    time.sleep(0)
+    discard = hx.discardSample
+
+    def reset_pulse():
+        gpio.resetting = True
+        try:
+            return discard()
+        finally:
+            gpio.resetting = False
+    hx.discardSample = reset_pulse
+
+    # 先確認所有讀取格式下新舊兩條路徑結果一致 (只比資料，不因時間超時而重讀)
+    hx.maxHighTime = float("inf")
+    rng = random.Random(0)
+    for byte_format in ("MSB", "LSB"):
+        for bit_format in ("MSB", "LSB"):
+            hx.set_reading_format(byte_format, bit_format)
+            for _ in range(200):
+                bits = [rng.randint(0, 1) for _ in range(24 + hx.GAIN)]
+                gpio.load_bits(bits)
+                old = legacy_read(hx)
+                gpio.load_bits(bits)
+                new = hx.read_long()
+                assert old == new, (byte_format, bit_format, old, new)
+    print("✅ 四種讀取格式新舊結果一致")
+    hx.maxHighTime = hx711.PD_SCK_MAX_HIGH
+
+    hx.set_reading_format("MSB", "MSB")
+    gpio.load_bits([rng.randint(0, 1) for _ in range(1000)])
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=cpu_load, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for w in workers: w.start()
+
+    print(f"=== HX711 讀取基準測試 ({samples} 筆, 背景負載 {load_threads} 執行緒) ===")
+    old_rate = bench("舊版 readRawBytes", legacy_read, hx, samples)
+    new_rate = bench("新版 clockOutLong", lambda h: h.read_long(), hx, samples)
+    print(f"加速: {new_rate / old_rate:.2f}x")
+
+    stop.set()
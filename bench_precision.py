@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# FP32 / FP16 / INT8 模型的速度與結果比較 (同一組圖片)
+# 用法: python3 bench_precision.py --images <圖片資料夾> [--device CPU] [--precisions FP32,FP16,INT8]
+#                                  [--name mobilenet-v2] [--requests 4] [--limit 200]
+# 每個精度回報：
+#   延遲：一次一張 (infer) 的 p50 / p90 / p99
+#   吞吐量：--requests 個 infer request 同時跑 (AsyncInferenceEngine.infer_batch)
+#   狗品種 top-1 一致率：與第一個精度 (基準，預設 FP32) 的狗頭結果比較 (breed_head.DogHead)
+# 圖片放在以 ImageNet 類別 ID 命名的子資料夾 (例如 images/207/xxx.jpg) 時，另外計算對正確答案的準確率。
+# NCS2 只支援 FP16：--device MYRIAD 時只比 FP16 (其他精度會載入失敗並略過)。
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+
+from async_infer import AsyncInferenceEngine
+from breed_head import DogHead, DOG_HEAD_CLASSES, OTHER_CLASS, is_dog
+from compare_heads import list_images, run_model, percentile_ms
+from hardware import model_files
+
+MODEL_DIR = "models/public/mobilenet-v2"
+
+
+def load_images(folder, limit):
+    # 先全部解碼進記憶體，量測時不含讀檔時間；依路徑排序，每次都是同一組
+    items = sorted(list_images(folder))
+    if limit: items = items[:limit]
+    images, truths = [], []
+    for path, truth in items:
+        image = cv2.imread(path)
+        if image is None: continue
+        images.append(image)
+        truths.append(truth)
+    return images, truths
+
+
+def bench_one(classifier, images, warmup):
+    head = DogHead(classifier.num_outputs)
+    for image in images[:warmup]: run_model(classifier, image)
+
+    # 延遲：一次一張
+    latencies, top1 = [], []
+    for image in images:
+        probs, dt = run_model(classifier, image)
+        latencies.append(dt)
+        top1.append(int(DOG_HEAD_CLASSES[np.argmax(head(probs))]))
+
+    # 吞吐量：所有 request 同時跑
+    requests = len(classifier.exec_net.requests)
+    engine = AsyncInferenceEngine(classifier.exec_net, classifier.input_blob, classifier.out_blob,
+                                  classifier.preprocessor, on_result=lambda probs, meta: None,
+                                  num_requests=requests, postprocess=head)
+    try:
+        engine.infer_batch(images[:warmup])
+        t0 = time.perf_counter()
+        engine.infer_batch(images, timeout=30.0)
+        elapsed = time.perf_counter() - t0
+    finally:
+        engine.close()
+    return {'latencies': latencies, 'top1': top1, 'fps': len(images) / elapsed, 'requests': requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FP32 / FP16 / INT8 模型的吞吐量、延遲與結果一致率")
+    parser.add_argument("--images", required=True, help="圖片資料夾 (可有以類別 ID 命名的子資料夾)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--name", default="mobilenet-v2")
+    parser.add_argument("--precisions", default="FP32,FP16,INT8", help="逗號分隔，第一個當基準")
+    parser.add_argument("--device", default="CPU")
+    parser.add_argument("--requests", type=int, default=4, help="量吞吐量時同時跑的 infer request 數")
+    parser.add_argument("--limit", type=int, default=200, help="最多使用幾張圖片 (0 = 全部)")
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    from hardware import OpenVINOClassifier
+    images, truths = load_images(args.images, args.limit)
+    if not images: raise SystemExit(f"{args.images} 裡沒有圖片")
+    print(f">>> {len(images)} 張圖片，裝置 {args.device}，{args.requests} 個 infer request")
+
+    results = {}
+    for precision in (p.strip() for p in args.precisions.split(",")):
+        xml, bin_path = model_files(args.model_dir, precision, args.name)
+        if not os.path.exists(xml):
+            print(f"⚠️ 找不到 {xml}，略過 {precision}")
+            continue
+        try:
+            classifier = OpenVINOClassifier(xml, bin_path, args.device, num_requests=args.requests,
+                                            cpu_requests=args.requests)
+        except Exception as e:
+            print(f"❌ {precision} 無法在 {args.device} 載入，略過: {e}")
+            continue
+        results[precision] = bench_one(classifier, images, args.warmup)
+        print(f"    {precision} 完成")
+    if not results: raise SystemExit("沒有可比較的模型")
+
+    ref_name = next(iter(results))
+    ref = results[ref_name]['top1']
+    ref_dogs = [i for i, cid in enumerate(ref) if is_dog(cid)]
+    labelled = [(i, t if is_dog(t) else OTHER_CLASS) for i, t in enumerate(truths) if t is not None]
+
+    print(f"\n{'精度':<6} {'張/秒':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'top-1 一致':>10} {'狗品種一致':>10}" + (f" {'準確率':>8}" if labelled else ""))
+    for name, r in results.items():
+        top1 = r['top1']
+        agree = sum(a == b for a, b in zip(top1, ref)) / len(ref)
+        # 只看基準判斷為狗的圖片：品種是否相同
+        breed = f"{sum(top1[i] == ref[i] for i in ref_dogs) / len(ref_dogs):.1%}" if ref_dogs else "-"
+        line = (f"{name:<6} {r['fps']:8.1f} {percentile_ms(r['latencies'], 50):8.2f} "
+                f"{percentile_ms(r['latencies'], 90):8.2f} {percentile_ms(r['latencies'], 99):8.2f} "
+                f"{agree:10.1%} {breed:>10}")
+        if labelled:
+            line += f" {sum(top1[i] == want for i, want in labelled) / len(labelled):8.1%}"
+        print(line)
+    print(f"(一致率以 {ref_name} 為基準，狗品種一致只計基準判斷為狗的 {len(ref_dogs)} 張)")
+
+
+if __name__ == '__main__':
+    main()
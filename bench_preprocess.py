@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 前處理微基準測試：比較舊版 predict_image 的寫法與 Preprocessor
+# 用法: python bench_preprocess.py [次數]
+import sys
+import time
+import cv2
+import numpy as np
+from preprocess import Preprocessor
+from inference_roi import InferenceROI
+
+INPUT_SHAPE = (1, 3, 224, 224)   # mobilenet-v2 的 n, c, h, w
+FRAME_SHAPE = (480, 640, 3)      # 攝影機畫面大小
+
+
+def legacy_preprocess(image):
+    # 舊版 predict_image 的前處理 (每次查形狀、resize、transpose + reshape)
+    # transpose 後的陣列不連續，infer() 建立 blob 時還要再複製一次，這裡一併算進去
+    n, c, h, w_in = INPUT_SHAPE
+    if image.shape[2] == 4: image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    img_resized = cv2.resize(image, (w_in, h))
+    return np.ascontiguousarray(img_resized.transpose((2, 0, 1)).reshape((n, c, h, w_in)))
+
+
+def bench(name, fn, frames, loops):
+    fn(frames[0])  # 暖機
+    start = time.perf_counter()
+    for i in range(loops):
+        fn(frames[i % len(frames)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed / loops * 1e6:8.1f} µs/張   {loops / elapsed:8.0f} 張/秒")
+    return elapsed
+
+
+if __name__ == '__main__':
+    loops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8) for _ in range(8)]
+
+    pre = Preprocessor(INPUT_SHAPE)
+    # 模擬 infer request 的輸入 blob
+    blob = np.empty(INPUT_SHAPE, np.uint8)
+
+    # 先確認兩種寫法輸出一致
+    assert np.array_equal(legacy_preprocess(frames[0]), pre(frames[0], out=blob))
+
+    print(f"=== 前處理基準測試 ({loops} 次, {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]} → {INPUT_SHAPE[3]}x{INPUT_SHAPE[2]}) ===")
+    t_old = bench("舊版 (resize+transpose)", legacy_preprocess, frames, loops)
+    t_new = bench("Preprocessor (寫入 blob)", lambda f: pre(f, out=blob), frames, loops)
+    print(f"加速: {t_old / t_new:.2f}x")
+
+    batch = 8
+    b_loops = max(1, loops // batch)
+    start = time.perf_counter()
+    for _ in range(b_loops):
+        np.stack([legacy_preprocess(f)[0] for f in frames[:batch]])
+    t_old_b = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(b_loops):
+        pre.batch(frames[:batch])
+    t_new_b = time.perf_counter() - start
+    print(f"批次 {batch} 張: 舊版 {t_old_b / b_loops * 1e3:.2f} ms   Preprocessor {t_new_b / b_loops * 1e3:.2f} ms")
+
+    # 推論 ROI：動態外框裁切 (view) + letterbox。縮放的耗時主要看輸出大小 (224x224)，
+    # 裁切後前處理不會明顯變快；差別在狗身上的解析度 (縮小倍率變小)
+    boxed = Preprocessor(INPUT_SHAPE, letterbox=True)
+    print("--- 推論 ROI (耗時比 = ROI / 整張，1.00 = 一樣快) ---")
+    t_full = bench("整張 + letterbox", lambda f: boxed(f, out=blob), frames, loops)
+    fh, fw = FRAME_SHAPE[:2]
+    full_scale = max(fw / INPUT_SHAPE[3], fh / INPUT_SHAPE[2])
+    # 動態外框 (0~1 比例)：遠處的小狗、碗前一隻中型犬、貼近鏡頭的大狗
+    for name, motion_box in (("小 (遠處)", (0.45, 0.5, 0.1, 0.15)),
+                             ("中 (碗前)", (0.3, 0.35, 0.3, 0.45)),
+                             ("大 (貼近)", (0.1, 0.1, 0.7, 0.8))):
+        roi = InferenceROI("motion")
+        t_roi = bench(f"ROI {name}", lambda f: boxed(roi.crop(f, motion_box), out=blob), frames, loops)
+        x0, y0, x1, y1 = roi.last_box
+        scale = max((x1 - x0) / INPUT_SHAPE[3], (y1 - y0) / INPUT_SHAPE[2])
+        print(f"    裁切 {x1 - x0}x{y1 - y0} (畫面的 {roi.stats()['avg_area_ratio']:.0%})  耗時比 {t_roi / t_full:.2f}  "
+              f"縮放倍率 {scale:.2f} (整張 {full_scale:.2f})，狗身上解析度 {full_scale / scale:.2f}x")
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# ImageNet 狗品種類別範圍
+DOG_CLASS_MIN = 151
+DOG_CLASS_MAX = 268
+NUM_DOG_CLASSES = DOG_CLASS_MAX - DOG_CLASS_MIN + 1
+OTHER_CLASS = 1000         # 「其他 (不是狗)」，接在 ImageNet 0~999 之後 (-1 已被當成推論失敗)
+
+# 狗頭輸出第 i 格對應的 ImageNet 類別 ID：118 個狗品種 + 最後一格「其他」
+DOG_HEAD_CLASSES = np.append(np.arange(DOG_CLASS_MIN, DOG_CLASS_MAX + 1), OTHER_CLASS)
+
+
+def is_dog(cid):
+    return bool(DOG_CLASS_MIN <= cid <= DOG_CLASS_MAX)
+
+
+class DogHead:
+    """
+    推論後處理：只保留狗品種那一段，之後投票、top-k 都只處理 119 個數字。
+    - 完整 1000 類模型：取 151~268 的機率，其餘合併成「其他」= 1 - 狗的機率總和
+    - prepare_dog_head.py 產生的縮減模型 (119 類)：輸出已經是這個格式，直接複製
+    classes 把每一格對回 ImageNet 類別 ID (寵物資料庫的 breed_id 不變)。
+    """
+    classes = DOG_HEAD_CLASSES
+
+    def __init__(self, num_outputs):
+        if num_outputs == len(DOG_HEAD_CLASSES): self.full = False
+        elif num_outputs > DOG_CLASS_MAX: self.full = True
+        else: raise ValueError(f"無法辨識的模型輸出大小: {num_outputs}")
+        self.num_outputs = num_outputs
+
+    def __call__(self, probs):
+        # 回傳新的陣列 (可直接交給其他執行緒)，不保留 infer request 的輸出記憶體
+        probs = probs.reshape(-1)
+        out = np.empty(len(self.classes), np.float32)
+        if self.full:
+            out[:-1] = probs[DOG_CLASS_MIN:DOG_CLASS_MAX + 1]
+            out[-1] = max(0.0, 1.0 - float(out[:-1].sum()))
+        else:
+            out[:] = probs
+        return out
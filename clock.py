@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# 餵食流程共用的時鐘：平常等同 time 模組；
+# 模擬硬體時可設定 speed 倍速，讓整條流程 (出料、穩定、冷卻) 比真實時間跑得快。
+# 只有「物理時間」相關的地方用這個時鐘；網頁串流、推論延遲統計仍用真實時間。
+import threading
+import time as _time
+
+_lock = threading.Lock()
+_scaled = False            # 沒調過倍速就直接用 time 模組 (零額外誤差)
+_speed = 1.0
+_base_real = _time.monotonic()
+_base_mono = _base_real
+_base_wall = _time.time()
+
+
+def set_speed(speed):
+    """切換倍速 (以目前時間為基準接續，不會跳時間)。"""
+    global _scaled, _speed, _base_real, _base_mono, _base_wall
+    if speed <= 0: raise ValueError("speed 必須大於 0")
+    with _lock:
+        real = _time.monotonic()
+        mono, wall = monotonic(), time()
+        _base_real, _base_mono, _base_wall = real, mono, wall
+        _speed = float(speed)
+        _scaled = True
+
+
+def speed():
+    return _speed
+
+
+def monotonic():
+    if not _scaled: return _time.monotonic()
+    return _base_mono + (_time.monotonic() - _base_real) * _speed
+
+
+def time():
+    if not _scaled: return _time.time()
+    return _base_wall + (_time.monotonic() - _base_real) * _speed
+
+
+def sleep(seconds):
+    if seconds > 0: _time.sleep(seconds / _speed)
+
+
+def real(seconds):
+    """流程秒數換算成真實秒數 (給 Event.wait、Timer 這類只吃真實時間的 API)。"""
+    return seconds / _speed
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# 完整 1000 類模型 vs 狗頭 (prepare_dog_head.py 產生的 119 類模型) 的準確率與延遲比較
+# 用法: python3 compare_heads.py --images <圖片資料夾> [--dog-xml models/public/mobilenet-v2/FP16/mobilenet-v2-dog.xml]
+#                                [--device MYRIAD] [--k 3]
+#       python3 compare_heads.py --postprocess-only      # 只比較後處理 (不需要 OpenVINO 與模型)
+# 圖片放在以 ImageNet 類別 ID 命名的子資料夾 (例如 images/207/xxx.jpg) 時，另外計算對正確答案的準確率。
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+
+from breed_head import DogHead, DOG_HEAD_CLASSES, OTHER_CLASS, is_dog
+from detection_voter import DetectionVoter
+from photo_analyzer import IMAGE_EXTS, top_k
+
+FULL_XML = "models/public/mobilenet-v2/FP16/mobilenet-v2.xml"
+DOG_XML = "models/public/mobilenet-v2/FP16/mobilenet-v2-dog.xml"
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else 0.0
+
+
+def report(name, samples):
+    print(f"{name:<26} 平均 {np.mean(samples) * 1000:7.3f} ms  p50 {percentile_ms(samples, 50):7.3f}  "
+          f"p95 {percentile_ms(samples, 95):7.3f}  ({len(samples)} 次)")
+
+
+# --- 後處理：舊版 (1000 類 argmax 再判斷範圍) vs 狗頭 (只看 119 格) ---
+def legacy_postprocess(probs, k):
+    cid = int(np.argmax(probs))
+    ids, values = top_k(probs, k)
+    return (cid if is_dog(cid) else None), ids, values
+
+
+def dog_postprocess(head, probs, k):
+    out = head(probs)
+    idx, values = top_k(out, k)
+    cid = int(DOG_HEAD_CLASSES[idx[0]])
+    return (cid if is_dog(cid) else None), DOG_HEAD_CLASSES[idx], values
+
+
+def bench_postprocess(loops, k):
+    rng = np.random.default_rng(0)
+    logits = rng.normal(0, 2, (64, 1000)).astype(np.float32)
+    probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    head_full = DogHead(1000)
+    head_dog = DogHead(len(DOG_HEAD_CLASSES))
+    reduced = np.stack([head_full(p) for p in probs])
+    cases = [("舊版 (1000 類)", lambda p: legacy_postprocess(p, k), probs),
+             ("狗頭後處理 (1000 → 119)", lambda p: dog_postprocess(head_full, p, k), probs),
+             ("狗頭模型 (輸出 119)", lambda p: dog_postprocess(head_dog, p, k), reduced)]
+    # 即時迴圈每張推論結果都要進投票器 (8 張加權平均)，向量越短越省
+    voter_full = DetectionVoter()
+    voter_dog = DetectionVoter(classes=DOG_HEAD_CLASSES)
+    cases += [("投票器 (1000 類)", voter_full.update, probs),
+              ("投票器 (119 類)", voter_dog.update, reduced)]
+    print(f">>> 後處理 {loops} 次 (top-{k})")
+    for name, fn, data in cases:
+        samples = []
+        for i in range(loops):
+            t0 = time.perf_counter()
+            fn(data[i % len(data)])
+            samples.append(time.perf_counter() - t0)
+        report(name, samples)
+
+
+# --- 實際模型 ---
+def list_images(folder):
+    items = []
+    for root, _, files in os.walk(folder):
+        label = os.path.basename(root)
+        truth = int(label) if label.isdigit() else None
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS): items.append((os.path.join(root, name), truth))
+    return items
+
+
+def run_model(classifier, image):
+    req = classifier.exec_net.requests[0]
+    classifier.preprocessor(image, out=req.input_blobs[classifier.input_blob].buffer)
+    t0 = time.perf_counter()
+    req.infer()
+    elapsed = time.perf_counter() - t0
+    return req.output_blobs[classifier.out_blob].buffer[0].reshape(-1).copy(), elapsed
+
+
+def compare(args):
+    from hardware import OpenVINOClassifier
+    images = list_images(args.images)
+    if not images: raise SystemExit(f"{args.images} 裡沒有圖片")
+    full = OpenVINOClassifier(args.full_xml, os.path.splitext(args.full_xml)[0] + ".bin",
+                              args.device, num_requests=1)
+    dog = OpenVINOClassifier(args.dog_xml, os.path.splitext(args.dog_xml)[0] + ".bin",
+                             args.device, num_requests=1)
+    head_full, head_dog = DogHead(full.num_outputs), DogHead(dog.num_outputs)
+    print(f">>> {len(images)} 張圖片，裝置 {args.device}，完整 {full.num_outputs} 類 vs 狗頭 {dog.num_outputs} 類")
+
+    t_full, t_dog, p_legacy, p_dog = [], [], [], []
+    same_top1 = same_is_dog = overlap = 0
+    max_diff = 0.0
+    correct = {'full': 0, 'dog': 0}
+    labelled = 0
+    for path, truth in images:
+        image = cv2.imread(path)
+        if image is None: continue
+        probs, dt = run_model(full, image); t_full.append(dt)
+        out, dt = run_model(dog, image); t_dog.append(dt)
+
+        t0 = time.perf_counter(); ref_cid, _, _ = legacy_postprocess(probs, args.k); p_legacy.append(time.perf_counter() - t0)
+        t0 = time.perf_counter(); dog_cid, dog_ids, _ = dog_postprocess(head_dog, out, args.k); p_dog.append(time.perf_counter() - t0)
+
+        # 以完整模型 + 狗頭後處理為基準 (同樣是 119 格，才能逐格比較)
+        ref = head_full(probs)
+        ref_idx, _ = top_k(ref, args.k)
+        ref_top = DOG_HEAD_CLASSES[ref_idx]
+        same_top1 += int(ref_top[0] == dog_ids[0])
+        same_is_dog += int((ref_cid is None) == (dog_cid is None))
+        overlap += len(set(ref_top.tolist()) & set(dog_ids.tolist())) / args.k
+        max_diff = max(max_diff, float(np.abs(ref - head_dog(out)).max()))
+        if truth is not None:
+            labelled += 1
+            want = truth if is_dog(truth) else OTHER_CLASS
+            correct['full'] += int((ref_cid if ref_cid is not None else OTHER_CLASS) == want)
+            correct['dog'] += int(dog_ids[0] == want)
+
+    n = len(t_full)
+    # 「是否為狗」比的是舊版判斷 (1000 類 argmax) 與狗頭判斷 (「其他」是 882 類的總和，較容易勝出)
+    print(f"top-1 一致 {same_top1 / n:.1%}  是否為狗一致 (vs 舊版) {same_is_dog / n:.1%}  "
+          f"top-{args.k} 重疊 {overlap / n:.1%}  機率最大差異 {max_diff:.4f}")
+    if labelled:
+        print(f"對正確答案 ({labelled} 張)：舊版 {correct['full'] / labelled:.1%}  狗頭 {correct['dog'] / labelled:.1%}")
+    report("推論 完整模型", t_full)
+    report("推論 狗頭模型", t_dog)
+    report("後處理 舊版 (1000 類)", p_legacy)
+    report("後處理 狗頭 (119 類)", p_dog)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="完整模型與狗頭模型的準確率 / 延遲比較")
+    parser.add_argument("--images", help="圖片資料夾 (可有以類別 ID 命名的子資料夾)")
+    parser.add_argument("--full-xml", default=FULL_XML)
+    parser.add_argument("--dog-xml", default=DOG_XML)
+    parser.add_argument("--device", default="MYRIAD")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--postprocess-only", action="store_true", help="只比較後處理")
+    parser.add_argument("--loops", type=int, default=20000)
+    args = parser.parse_args()
+    if args.postprocess_only:
+        bench_postprocess(args.loops, args.k)
+        return
+    if not args.images: parser.error("需要 --images (或改用 --postprocess-only)")
+    compare(args)
+
+
+if __name__ == '__main__':
+    main()
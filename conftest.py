@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+# test_loadcell.py / test_weight.py 是接著樹莓派實機跑的校正腳本 (需要 RPi.GPIO)，不是 pytest 測試
+collect_ignore = ["test_loadcell.py", "test_weight.py"]
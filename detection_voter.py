@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import collections
+import threading
+import numpy as np
+
+import clock
+from breed_head import is_dog
+
+
+class DetectionVoter:
+    """
+    多張畫面投票：把最近 window 張的 softmax 向量以指數衰減加權平均 (越新權重越高)，
+    同一個結果 (某品種，或「沒有狗」) 連續 min_frames 張都是第一名才發出事件。
+    同一結果只發一次；持續存在時每 reemit_after 秒再發一次，讓冷卻結束後仍能觸發餵食。
+    classes[i] 為機率向量第 i 格的類別 ID (例如 DogHead.classes)；None = 位置就是 ImageNet 類別 ID。
+    """
+
+    def __init__(self, window=8, decay=0.7, min_frames=3, min_score=0.7, reemit_after=10.0, classes=None):
+        self.window = window
+        self.decay = decay
+        self.min_frames = min_frames
+        self.min_score = min_score
+        self.reemit_after = reemit_after
+        self.classes = classes
+        self._history = collections.deque(maxlen=window)
+        self._streak_label = None
+        self._streak = 0
+        self._emitted = None
+        self._emitted_at = 0.0
+        self._lock = threading.Lock()
+        self.last_score = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._history.clear()
+            self._streak_label = None
+            self._streak = 0
+            self._emitted = None
+
+    def _label(self, cid, score):
+        # 狗且分數夠高才算某品種，其餘一律視為「沒有狗」(None)
+        if is_dog(cid) and score >= self.min_score: return cid
+        return None
+
+    def update(self, probs, now=None):
+        """
+        餵入一張畫面的機率向量。
+        有新事件時回傳 (label, score)：label 為品種 ID，或 None 代表沒有狗；否則回傳 False。
+        """
+        if now is None: now = clock.monotonic()
+        with self._lock:
+            self._history.append(np.asarray(probs, dtype=np.float32))
+            n = len(self._history)
+            weights = self.decay ** np.arange(n - 1, -1, -1, dtype=np.float32)
+            avg = np.tensordot(weights, np.stack(self._history), axes=1) / weights.sum()
+            idx = int(np.argmax(avg))
+            score = float(avg[idx])
+            cid = idx if self.classes is None else int(self.classes[idx])
+            self.last_score = score
+            label = self._label(cid, score)
+
+            if label == self._streak_label:
+                self._streak += 1
+            else:
+                self._streak_label = label
+                self._streak = 1
+
+            if self._streak < self.min_frames: return False
+            if label == self._emitted and now - self._emitted_at < self.reemit_after: return False
+            self._emitted = label
+            self._emitted_at = now
+            return label, score
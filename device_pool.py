@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import collections
+import threading
+import time
+
+
+class DeviceStats:
+    """單一裝置的推論統計：忙碌中的 request 數、完成數、錯誤、延遲與最近的吞吐量。"""
+
+    def __init__(self, name, slots, window=10.0):
+        self.name = name
+        self.slots = slots
+        self.window = window
+        self.busy = 0
+        self.completed = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.latency = 0.0               # 指數平均 (秒)
+        self._done_at = collections.deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.busy += 1
+
+    def finish(self, ok, elapsed):
+        now = time.monotonic()
+        with self._lock:
+            self.busy = max(0, self.busy - 1)
+            if not ok:
+                self.errors += 1
+                self.consecutive_errors += 1
+                return
+            self.completed += 1
+            self.consecutive_errors = 0
+            self.latency = elapsed if self.completed == 1 else 0.9 * self.latency + 0.1 * elapsed
+            self._done_at.append(now)
+
+    def fps(self):
+        now = time.monotonic()
+        with self._lock:
+            n = sum(1 for t in self._done_at if now - t <= self.window)
+        return n / self.window
+
+    def to_dict(self):
+        return {'device': self.name, 'slots': self.slots, 'busy': self.busy,
+                'completed': self.completed, 'errors': self.errors,
+                'latency_ms': round(self.latency * 1000, 1), 'fps': round(self.fps(), 1)}
+
+
+class _Slot:
+    """某個裝置上的一個 infer request；轉接完成回呼，順便記錄該裝置的延遲。"""
+
+    def __init__(self, dev, request):
+        self.dev = dev
+        self._req = request
+        self._callback = None
+        self._data = None
+        self._t0 = 0.0
+
+    @property
+    def input_blobs(self):
+        return self._req.input_blobs
+
+    @property
+    def output_blobs(self):
+        return self._req.output_blobs
+
+    def set_completion_callback(self, py_callback, py_data=None):
+        self._callback = py_callback
+        self._data = py_data
+        self._req.set_completion_callback(py_callback=self._on_complete, py_data=None)
+
+    def started(self):
+        self._t0 = time.monotonic()
+        self.dev.start()
+
+    def _on_complete(self, status, _data=None):
+        if self._t0:
+            self.dev.finish(status == 0, time.monotonic() - self._t0)
+            self._t0 = 0.0
+        if self._callback: self._callback(status, self._data)
+
+    def infer(self):
+        # 同步推論 (infer_sync) 不會觸發完成回呼，在這裡自己記
+        self.started()
+        t0 = self._t0
+        self._t0 = 0.0
+        try:
+            self._req.infer()
+        except Exception:
+            self.dev.finish(False, 0.0)
+            raise
+        self.dev.finish(True, time.monotonic() - t0)
+
+
+class MultiDeviceExecNet:
+    """
+    把多個裝置 (多支 NCS2、CPU) 各自的 exec_net 合成一個，介面與 ExecutableNetwork 相同
+    (requests[] + start_async)。所有裝置的 request 攤平成一串，依裝置順序編號；
+    AsyncInferenceEngine 總是先拿編號最小的空閒 request，所以畫面會送到
+    排在前面 (較快) 且有空位的裝置，前面的都忙才輪到後面的。
+    """
+
+    def __init__(self, nets, missing=()):
+        # nets = [(裝置名稱, exec_net)]，依優先順序排列；missing = 有指定但載入失敗的裝置
+        self.missing = list(missing)
+        self.devices = []
+        self.requests = []
+        self._targets = []
+        for name, net in nets:
+            dev = DeviceStats(name, len(net.requests))
+            self.devices.append(dev)
+            for i, req in enumerate(net.requests):
+                self.requests.append(_Slot(dev, req))
+                self._targets.append((net, i))
+
+    def start_async(self, request_id, inputs=None):
+        net, i = self._targets[request_id]
+        slot = self.requests[request_id]
+        slot.started()
+        try:
+            net.start_async(request_id=i, inputs=inputs)
+        except Exception:
+            slot._t0 = 0.0
+            slot.dev.finish(False, 0.0)
+            raise
+
+    def unhealthy(self, max_errors):
+        """回傳連續失敗達 max_errors 次的裝置名稱 (例如 NCS2 被拔掉)，沒有則 None。"""
+        for dev in self.devices:
+            if dev.consecutive_errors >= max_errors: return dev.name
+        return None
+
+    def stats(self):
+        return [dev.to_dict() for dev in self.devices]
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+
+import clock
+
+# 餵食紀錄：一次餵食工作一筆，day 欄位 (當地日期) 用來做每日統計的索引
+FEEDS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS feeds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started REAL NOT NULL,
+        day TEXT NOT NULL,
+        pet TEXT NOT NULL,
+        breed_id INTEGER,
+        result TEXT NOT NULL,
+        target REAL NOT NULL,
+        start_weight REAL NOT NULL,
+        final_weight REAL NOT NULL,
+        delivered REAL NOT NULL,
+        pulses INTEGER NOT NULL,
+        duration REAL NOT NULL
+    )
+'''
+# 重量曲線：降頻後的 float32 陣列直接存成 BLOB (每秒 5 點，一次餵食約 1KB 以內)
+CURVES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS feed_curves (
+        feed_id INTEGER PRIMARY KEY,
+        dt REAL NOT NULL,
+        data BLOB NOT NULL
+    )
+'''
+FEEDS_INDEXES = (
+    # 每日統計只需要掃索引 (breed_id, day, delivered 都在索引裡)
+    'CREATE INDEX IF NOT EXISTS idx_feeds_breed_day ON feeds (breed_id, day, delivered)',
+    'CREATE INDEX IF NOT EXISTS idx_feeds_day ON feeds (day, delivered)',
+    'CREATE INDEX IF NOT EXISTS idx_feeds_breed_started ON feeds (breed_id, started)',
+)
+FEED_COLUMNS = ('started', 'day', 'pet', 'breed_id', 'result', 'target', 'start_weight',
+                'final_weight', 'delivered', 'pulses', 'duration')
+
+
+def create_schema(conn):
+    conn.execute(FEEDS_SCHEMA)
+    conn.execute(CURVES_SCHEMA)
+    for sql in FEEDS_INDEXES: conn.execute(sql)
+    conn.commit()
+
+
+def day_of(ts):
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+
+class CurveRecorder:
+    """
+    餵食期間的重量曲線：取樣執行緒每筆樣本呼叫 add()，只做累加，
+    每 dt 秒收成一個平均值。沒有在錄的時候 add() 直接返回。
+    """
+
+    def __init__(self, dt=0.2, max_points=3000):
+        self.dt = dt
+        self.max_points = max_points
+        self._points = None
+        self._bucket_end = 0.0
+        self._sum = 0.0
+        self._n = 0
+
+    def start(self, now=None):
+        if now is None: now = clock.monotonic()
+        self._sum, self._n = 0.0, 0
+        self._bucket_end = now + self.dt
+        self._points = []
+
+    def add(self, t, kg):
+        points = self._points
+        if points is None: return
+        if t >= self._bucket_end:
+            if self._n and len(points) < self.max_points: points.append(self._sum / self._n)
+            self._sum, self._n = 0.0, 0
+            self._bucket_end += self.dt * max(1, int((t - self._bucket_end) / self.dt) + 1)
+        self._sum += kg
+        self._n += 1
+
+    def stop(self):
+        points, self._points = self._points, None
+        if points is None: return np.zeros(0, np.float32)
+        if self._n: points.append(self._sum / self._n)
+        return np.asarray(points, dtype=np.float32)
+
+
+class FeedLog:
+    """
+    餵食歷史：record() 只把資料丟進佇列，背景執行緒每 flush_interval 秒
+    (或累積 batch 筆) 用一個交易批次寫入，不卡餵食流程。
+    查詢用另一條連線 (WAL 模式下讀寫互不阻擋)。
+    """
+
+    def __init__(self, db_path, flush_interval=2.0, batch=64):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch = batch
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wconn = self._connect()
+        create_schema(self._wconn)
+        self._rconn = self._connect()
+        self.written = 0
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    # ---------- 寫入 ----------
+    def record(self, started, pet, breed_id, result, target, start_weight, final_weight,
+               pulses, duration, curve=None, curve_dt=0.2):
+        row = (started, day_of(started), pet, breed_id, result, float(target), float(start_weight),
+               float(final_weight), float(final_weight - start_weight), int(pulses), float(duration))
+        blob = None
+        if curve is not None and len(curve):
+            blob = np.asarray(curve, dtype=np.float32).tobytes()
+        self._queue.put((row, curve_dt, blob))
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch:
+                try: items.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty: break
+            try:
+                self.write_batch(items)
+            except sqlite3.Error as e:
+                print(f"⚠️ 餵食歷史寫入失敗: {e}")
+
+    def flush(self):
+        """把佇列中尚未寫入的紀錄立刻寫入 (測試或關機前使用)。"""
+        items = []
+        while True:
+            try: items.append(self._queue.get_nowait())
+            except queue.Empty: break
+        if items: self.write_batch(items)
+        return len(items)
+
+    def write_batch(self, items):
+        sql = f"INSERT INTO feeds ({', '.join(FEED_COLUMNS)}) VALUES ({', '.join('?' * len(FEED_COLUMNS))})"
+        with self._write_lock, self._wconn:
+            for row, dt, blob in items:
+                cur = self._wconn.execute(sql, row)
+                if blob is not None:
+                    self._wconn.execute('INSERT INTO feed_curves (feed_id, dt, data) VALUES (?,?,?)',
+                                        (cur.lastrowid, dt, blob))
+        self.written += len(items)
+
+    # ---------- 查詢 ----------
+    def _query(self, sql, args=()):
+        with self._read_lock:
+            return self._rconn.execute(sql, args).fetchall()
+
+    def daily_totals(self, breed_id=None, days=30, now=None):
+        """每日總餵食量：回傳 [{day, feeds, delivered}]，新的在前。"""
+        since = day_of((now or time.time()) - (days - 1) * 86400)
+        if breed_id is None:
+            rows = self._query('SELECT day, COUNT(*), SUM(delivered) FROM feeds '
+                               'WHERE day >= ? GROUP BY day ORDER BY day DESC', (since,))
+        else:
+            rows = self._query('SELECT day, COUNT(*), SUM(delivered) FROM feeds '
+                               'WHERE breed_id = ? AND day >= ? GROUP BY day ORDER BY day DESC',
+                               (int(breed_id), since))
+        return [{'day': d, 'feeds': n, 'delivered': round(total or 0.0, 4)} for d, n, total in rows]
+
+    def last_feeds(self, n=20, breed_id=None):
+        cols = 'id, ' + ', '.join(FEED_COLUMNS)
+        if breed_id is None:
+            rows = self._query(f'SELECT {cols} FROM feeds ORDER BY id DESC LIMIT ?', (int(n),))
+        else:
+            rows = self._query(f'SELECT {cols} FROM feeds WHERE breed_id = ? '
+                               'ORDER BY started DESC LIMIT ?', (int(breed_id), int(n)))
+        return [dict(zip(('id',) + FEED_COLUMNS, r)) for r in rows]
+
+    def curve(self, feed_id):
+        """回傳 (dt, np.float32 陣列) 或 None。"""
+        rows = self._query('SELECT dt, data FROM feed_curves WHERE feed_id = ?', (int(feed_id),))
+        if not rows: return None
+        dt, data = rows[0]
+        return dt, np.frombuffer(data, dtype=np.float32)
+
+    def close(self):
+        with self._read_lock:
+            self._rconn.close()
+        with self._write_lock:
+            self._wconn.close()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import collections
+import itertools
+import queue
+import threading
+import clock
+
+# 餵食工作狀態
+QUEUED = "queued"
+DISPENSING = "dispensing"
+SETTLING = "settling"
+DONE = "done"
+ABORTED = "aborted"
+FINISHED_STATES = (DONE, ABORTED)
+
+
+class FeedJob:
+    def __init__(self, job_id, pet_name, breed_id, target_kg):
+        self.id = job_id
+        self.pet_name = pet_name
+        self.breed_id = breed_id
+        self.target_kg = target_kg
+        self.state = QUEUED
+        self.reason = ""
+        self.created = clock.time()
+        self.started = None
+        self.finished = None
+        self.final_weight = None
+        self._cancel = threading.Event()
+
+    def cancel(self, reason="取消"):
+        if self.state in FINISHED_STATES: return
+        self.reason = reason
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pet': self.pet_name,
+            'breed_id': self.breed_id,
+            'target': round(self.target_kg, 4),
+            'state': self.state,
+            'reason': self.reason,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'final_weight': None if self.final_weight is None else round(self.final_weight, 4),
+        }
+
+
+class FeedScheduler:
+    """
+    餵食執行器：只有一個工作執行緒在驅動馬達，偵測端只負責 submit()。
+    - 同一隻寵物同時只會有一個排隊中/執行中的工作
+    - 冷卻：工作結束後 cooldown 秒內不接受同一隻寵物 (threading.Timer 到期解除)
+    - 頻率上限：每隻寵物每小時最多 max_per_hour 次
+    run_job(job) 由呼叫端提供，負責實際出料並更新 job.state。
+    """
+
+    def __init__(self, run_job, cooldown=60, max_per_hour=4, max_queue=4,
+                 history=20, on_cooldown_end=None):
+        self.run_job = run_job
+        self.cooldown = cooldown
+        self.max_per_hour = max_per_hour
+        self.on_cooldown_end = on_cooldown_end
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._active = {}                        # breed_id -> 排隊中/執行中的工作
+        self._cooling = {}                       # breed_id -> (結束時間, Timer)
+        self._recent = collections.defaultdict(collections.deque)  # breed_id -> 最近開始時間
+        self._history = collections.deque(maxlen=history)
+        self.current = None
+
+    def start(self):
+        t = threading.Thread(target=self._worker)
+        t.daemon = True
+        t.start()
+
+    # ---------- 送出 / 取消 ----------
+    def submit(self, pet_name, breed_id, target_kg):
+        """回傳 (job, None) 或 (None, 拒絕原因)。"""
+        now = clock.time()
+        with self._lock:
+            if breed_id in self._active:
+                return None, "已在餵食佇列中"
+            cooling = self._cooling.get(breed_id)
+            if cooling is not None:
+                return None, f"冷卻中 (剩 {max(0.0, cooling[0] - now):.0f} 秒)"
+            recent = self._recent[breed_id]
+            while recent and now - recent[0] > 3600: recent.popleft()
+            if len(recent) >= self.max_per_hour:
+                return None, f"已達每小時 {self.max_per_hour} 次上限"
+            job = FeedJob(next(self._ids), pet_name, breed_id, target_kg)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                return None, "餵食佇列已滿"
+            self._active[breed_id] = job
+            self._history.append(job)
+        return job, None
+
+    def cancel_all(self, reason="手動停止"):
+        with self._lock:
+            jobs = list(self._active.values())
+        for job in jobs: job.cancel(reason)
+        return len(jobs)
+
+    def cancel(self, job_id, reason="取消"):
+        with self._lock:
+            for job in self._active.values():
+                if job.id == job_id:
+                    job.cancel(reason)
+                    return True
+        return False
+
+    # ---------- 查詢 ----------
+    @property
+    def busy(self):
+        return self.current is not None
+
+    def jobs(self):
+        with self._lock:
+            jobs = [j.to_dict() for j in reversed(self._history)]
+            cooling = {str(bid): round(max(0.0, until - clock.time()), 1)
+                       for bid, (until, _) in self._cooling.items()}
+        return {'jobs': jobs, 'cooldowns': cooling,
+                'current': self.current.id if self.current else None}
+
+    def cooldown_left(self, breed_id):
+        with self._lock:
+            cooling = self._cooling.get(breed_id)
+        return 0.0 if cooling is None else max(0.0, cooling[0] - clock.time())
+
+    # ---------- 工作執行緒 ----------
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job.cancelled:
+                job.state = ABORTED
+            else:
+                self.current = job
+                job.started = clock.time()
+                # 真的開始出料才算進每小時次數；排隊中被取消的不算
+                with self._lock:
+                    self._recent[job.breed_id].append(job.started)
+                try:
+                    self.run_job(job)
+                except Exception as e:
+                    print(f"餵食工作錯誤: {e}")
+                    job.reason = job.reason or str(e)
+                    job.state = ABORTED
+                finally:
+                    self.current = None
+                if job.state not in FINISHED_STATES:
+                    job.state = ABORTED if job.cancelled else DONE
+            job.finished = clock.time()
+            self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            self._active.pop(job.breed_id, None)
+            if job.started is None: return   # 還沒開始就被取消，不進入冷卻
+            timer = threading.Timer(clock.real(self.cooldown), self._cooldown_expired, args=(job.breed_id,))
+            timer.daemon = True
+            self._cooling[job.breed_id] = (job.finished + self.cooldown, timer)
+        timer.start()
+
+    def _cooldown_expired(self, breed_id):
+        with self._lock:
+            self._cooling.pop(breed_id, None)
+        if self.on_cooldown_end is not None:
+            self.on_cooldown_end(breed_id)
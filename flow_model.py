@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+import threading
+import time
+
+import clock
+
+
+class FlowRateModel:
+    """
+    出料量線上學習模型：每次開門 d 秒實際落下的量 ≈ rate * (d - open_delay) + lag_kg
+      rate       : 閘門全開時的流速 (kg/秒)
+      lag_kg     : 關門後仍在空中掉落的飼料 (只能 >= 0)
+      open_delay : 閘門從收到訊號到開始出料的延遲 (秒，只能 >= 0)
+    以遞迴最小平方法 (RLS，帶遺忘因子) 學 rate 與截距 c = lag_kg - rate * open_delay，
+    c 為正算落料、為負算開門延遲 (兩者在一次出料裡分不開)；每次出料後更新並存檔讓下次開機沿用。
+    規劃出料時扣掉 margin 個標準差的預測不確定度 (參數的共變異數 P + 量測雜訊 + 每次出料的
+    流速抖動)：模型還不確定時少餵一點，多餵的飼料收不回來，少餵只要再補一次。
+    """
+
+    MAX_LAG_KG = 0.03       # 落料上限 30 g
+    MAX_OPEN_DELAY = 0.5    # 開門延遲上限 0.5 秒
+
+    def __init__(self, rate=0.05, lag_kg=0.0, path=None,
+                 forgetting=0.98, noise_std=0.003, jitter=0.1, margin=2.0, tolerance=0.005):
+        self.path = path
+        self.forgetting = forgetting
+        self.R = noise_std ** 2
+        self.default_rate = rate
+        self.default_jitter = jitter
+        self.margin = margin            # 規劃時扣掉幾個標準差
+        self.tolerance = tolerance      # 可接受的超量 (kg)，與餵食迴圈「達標」的誤差相同
+        self._lock = threading.Lock()
+        self._reset(rate, lag_kg)
+        if path: self.load()
+
+    def _reset(self, rate, lag_kg):
+        self.rate = rate
+        self._c = min(max(lag_kg, 0.0), self.MAX_LAG_KG)
+        # 先驗不確定度：流速 ±100%，固定量 ±5 g
+        self.P = [[rate * rate, 0.0], [0.0, 0.005 ** 2]]
+        # 每次開門流速的相對變化 (變異數)：殘差平方與流量平方的加權比 (帶遺忘因子)，
+        # 出料量小的那幾次權重小，不會被量測雜訊放大
+        self.jitter_var = self.default_jitter ** 2
+        self._jitter_num = self.jitter_var * (rate * 4.0) ** 2
+        self._jitter_den = (rate * 4.0) ** 2
+        self.updates = 0
+
+    @property
+    def lag_kg(self):
+        return max(self._c, 0.0)
+
+    @property
+    def open_delay(self):
+        return max(-self._c / self.rate, 0.0)
+
+    def _clamp(self):
+        # 防呆：流速限制在預設值的 0.2 ~ 5 倍；落料 0 ~ 30 g、開門延遲 0 ~ 0.5 秒
+        self.rate = min(max(self.rate, 0.2 * self.default_rate), 5.0 * self.default_rate)
+        self._c = min(max(self._c, -self.rate * self.MAX_OPEN_DELAY), self.MAX_LAG_KG)
+
+    # ---------- 規劃 ----------
+    def _std(self, duration):
+        # 開門 duration 秒的出料量預測標準差 (呼叫端持有 _lock)
+        P = self.P
+        x0, x1 = duration, 1.0
+        var = x0 * (P[0][0] * x0 + P[0][1] * x1) + x1 * (P[1][0] * x0 + P[1][1] * x1)
+        flow = self.rate * duration
+        return (max(var, 0.0) + self.R + self.jitter_var * flow * flow) ** 0.5
+
+    def duration_for(self, missing_kg, min_s=0.1, max_s=10.0, min_aim=0.5):
+        # 讓「超過目標 tolerance 以上」的機率約為 margin 個標準差之外：
+        # 瞄準 缺量 + tolerance - margin x 標準差，不超過缺量、至少 min_aim 的缺量。
+        # 標準差跟開門時間有關，迭代兩次
+        with self._lock:
+            aim = missing_kg
+            for _ in range(2):
+                d = max((aim - self._c) / self.rate, 0.0)
+                aim = missing_kg + self.tolerance - self.margin * self._std(d)
+                aim = min(max(aim, missing_kg * min_aim), missing_kg)
+            d = (aim - self._c) / self.rate
+        return min(max(d, min_s), max_s)
+
+    def std(self, duration):
+        with self._lock:
+            return self._std(duration)
+
+    def predict(self, duration):
+        with self._lock:
+            return self.rate * max(duration - self.open_delay, 0.0) + self.lag_kg
+
+    # ---------- 學習 ----------
+    def update(self, duration, delivered_kg):
+        """
+        以一次出料的 (開門秒數, 實際增加重量) 更新模型。
+        實際量與預測差太多 (飼料桶空了、卡料、狗在吃) 就不學，回傳 False。
+        """
+        predicted = self.predict(duration)
+        if predicted > 0 and not (0.2 <= delivered_kg / predicted <= 5.0):
+            return False
+
+        with self._lock:
+            x0, x1 = duration, 1.0
+            P = self.P
+            Px0 = P[0][0] * x0 + P[0][1] * x1
+            Px1 = P[1][0] * x0 + P[1][1] * x1
+            denom = self.forgetting * self.R + x0 * Px0 + x1 * Px1
+            k0, k1 = Px0 / denom, Px1 / denom
+            err = delivered_kg - (self.rate * x0 + self._c * x1)
+            flow = self.rate * duration
+            lam = self.forgetting
+            self._jitter_num = lam * self._jitter_num + max(err * err - self.R, 0.0)
+            self._jitter_den = lam * self._jitter_den + flow * flow
+            self.jitter_var = self._jitter_num / self._jitter_den
+            self.rate += k0 * err
+            self._c += k1 * err
+            self.P = [[(P[0][0] - k0 * Px0) / lam, (P[0][1] - k0 * Px1) / lam],
+                      [(P[1][0] - k1 * Px0) / lam, (P[1][1] - k1 * Px1) / lam]]
+            self._clamp()
+            self.updates += 1
+        return True
+
+    # ---------- 存檔 ----------
+    @staticmethod
+    def _checked_P(P):
+        """2x2、全部有限、正定 (對稱化後兩個主對角 > 0 且行列式 > 0) 才回傳 float 矩陣，否則 None。"""
+        try:
+            if len(P) != 2 or any(len(row) != 2 for row in P): return None
+            P = [[float(v) for v in row] for row in P]
+        except (TypeError, ValueError):
+            return None
+        if not all(math.isfinite(v) for row in P for v in row): return None
+        off = (P[0][1] + P[1][0]) / 2
+        if P[0][0] <= 0 or P[1][1] <= 0 or P[0][0] * P[1][1] - off * off <= 0: return None
+        return P
+
+    def to_dict(self):
+        with self._lock:
+            return {'rate': self.rate, 'lag_kg': self.lag_kg, 'open_delay': self.open_delay, 'P': self.P,
+                    'jitter': self.jitter_var ** 0.5, 'updates': self.updates, 'saved_at': time.time()}
+
+    def save(self):
+        if not self.path: return
+        data = self.to_dict()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            with self._lock:
+                self.rate = float(data['rate'])
+                self._c = float(data['lag_kg']) - self.rate * float(data.get('open_delay', 0.0))
+                self._clamp()
+                P = self._checked_P(data.get('P'))
+                # 存檔裡的 P 壞掉 (形狀不對、NaN/inf、不正定)：退回先驗，免得 _std 算出 NaN 或負變異數
+                self.P = P if P is not None else [[self.rate * self.rate, 0.0], [0.0, 0.005 ** 2]]
+                self.jitter_var = float(data.get('jitter', self.default_jitter)) ** 2
+                self._jitter_num = self.jitter_var * self._jitter_den
+                self.updates = int(data.get('updates', 0))
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+
+class FeedStats:
+    """一次餵食的收斂紀錄，結束時以 JSON 一行寫進記錄檔。"""
+
+    def __init__(self, pet_name, target_kg, start_weight, mode):
+        self.pet_name = pet_name
+        self.target_kg = target_kg
+        self.start_weight = start_weight
+        self.mode = mode
+        self.start_t = clock.monotonic()
+        self.pulses = []
+
+    def add_pulse(self, duration, delivered_kg, predicted_kg):
+        self.pulses.append({'duration': round(duration, 3),
+                            'delivered': round(delivered_kg, 4),
+                            'predicted': round(predicted_kg, 4)})
+
+    def finish(self, final_weight, result, path=None):
+        record = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'pet': self.pet_name,
+            'mode': self.mode,
+            'result': result,
+            'target': round(self.target_kg, 4),
+            'start_weight': round(self.start_weight, 4),
+            'final_weight': round(final_weight, 4),
+            'error': round(final_weight - self.target_kg, 4),
+            'cycles': len(self.pulses),
+            'total_time': round(clock.monotonic() - self.start_t, 1),
+            'pulses': self.pulses,
+        }
+        if path:
+            try:
+                with open(path, "a") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"⚠️ 餵食紀錄寫入失敗: {e}")
+        return record
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import cv2
+
+
+class FrameBroadcaster:
+    """
+    影像廣播站：每張新畫面只編碼一次 JPEG，所有 /video_feed 訂閱者共用。
+    每張畫面帶有遞增的序號，訂閱者等待 Condition 通知，不再空轉。
+    """
+
+    def __init__(self, default_quality=80, observe=None, valid=None, overlay=None):
+        self.default_quality = default_quality
+        self.observe = observe          # observe(秒數)：JPEG 編碼耗時 (量測用，可為 None)
+        self.valid = valid              # valid(tag)：畫面來自 FramePool 時，編碼後確認 buffer 沒被覆寫
+        self.overlay = overlay          # overlay(frame) → 畫上除錯資訊的複本 (例如推論 ROI)，有人要看才畫
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._frame = None
+        self._tag = None
+        self._seq = 0
+        # 目前這張畫面已編碼的結果 {(quality, overlay): bytes}，換新畫面時清空
+        self._jpeg_cache = {}
+        self.encode_count = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, frame, tag=None):
+        # 呼叫端交出畫面後就不可再修改它 (只存參考，不複製)；tag 為 FramePool 的序號
+        with self._cond:
+            self._frame = frame
+            self._tag = tag
+            self._seq += 1
+            self._jpeg_cache = {}
+            self._cond.notify_all()
+
+    def wait_next(self, last_seq, quality=None, timeout=1.0, overlay=False):
+        """
+        等待比 last_seq 更新的畫面，回傳 (seq, jpeg_bytes)。
+        慢的客戶端直接跳到最新一張，不會排隊。逾時則回傳 (last_seq, None)。
+        overlay=True 時畫上除錯資訊 (與沒畫的分開快取)。
+        """
+        if quality is None: quality = self.default_quality
+        key = (quality, bool(overlay and self.overlay))
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq, timeout):
+                return last_seq, None
+            seq, frame, tag = self._seq, self._frame, self._tag
+            jpg = self._jpeg_cache.get(key)
+        if jpg is not None:
+            return seq, jpg
+        return seq, self._encode(seq, frame, key, tag)
+
+    def _encode(self, seq, frame, key, tag=None):
+        # 同一張畫面、同一畫質只編碼一次；編碼時不佔用 _cond，不會擋住 publish
+        quality, overlay = key
+        with self._encode_lock:
+            with self._cond:
+                jpg = self._jpeg_cache.get(key) if self._seq == seq else None
+            if jpg is not None:
+                return jpg
+            t0 = time.perf_counter()
+            if overlay: frame = self.overlay(frame)
+            flag, enc = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+            if self.observe is not None: self.observe(time.perf_counter() - t0)
+            if not flag:
+                return None
+            # 編碼期間 buffer 已被擷取迴圈重複使用，結果可能是半張新畫面，丟掉
+            if self.valid is not None and not self.valid(tag):
+                return None
+            jpg = enc.tobytes()
+            self.encode_count += 1
+            with self._cond:
+                if self._seq == seq:
+                    self._jpeg_cache[key] = jpg
+            return jpg
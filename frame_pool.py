@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class FramePool:
+    """
+    預先配置的畫面緩衝區：擷取迴圈輪流寫入 size 塊 buffer，不再每張畫面配置新陣列。
+    消費端 (JPEG 編碼、推論、動態閘門) 拿到的是唯讀 view + 序號；
+    第 seq 張的 buffer 要到第 seq + size 張才會被覆寫，
+    用完後以 valid(seq) 確認期間沒被覆寫 (與 seqlock 相同的讀後檢查)。
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self._bufs = []
+        self._views = []
+        self._shape = None
+        self._seq = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def _allocate(self, shape, dtype):
+        self._bufs = [np.empty(shape, dtype) for _ in range(self.size)]
+        self._views = []
+        for b in self._bufs:
+            v = b.view()
+            v.flags.writeable = False
+            self._views.append(v)
+        self._shape = (shape, np.dtype(dtype))
+
+    def acquire(self, shape, dtype=np.uint8):
+        """取得下一塊可寫入的 buffer，回傳 (seq, buffer)；畫面尺寸改變時才重新配置。"""
+        if self._shape != (shape, np.dtype(dtype)): self._allocate(shape, dtype)
+        self._seq += 1
+        return self._seq, self._bufs[self._seq % self.size]
+
+    def view(self, seq):
+        """第 seq 張的唯讀 view (不複製)。"""
+        return self._views[seq % self.size]
+
+    def valid(self, seq):
+        """第 seq 張的 buffer 是否還沒被之後的畫面覆寫。"""
+        return seq is not None and 0 <= self._seq - seq < self.size
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# 硬體抽象層：app.py 只透過這裡定義的介面使用秤、閘門、攝影機與分類器。
+# PiBackend 是樹莓派上的實際硬體；sim_hardware.SimBackend 是一般電腦上的模擬版。
+# 硬體相關套件 (RPi.GPIO、gpiozero、openvino) 都在建立裝置時才 import，
+# 所以沒有這些套件的電腦也能載入 app.py 跑模擬。
+import math
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+import cv2
+
+import clock
+
+
+# ================= 介面 =================
+class Scale(ABC):
+    """秤：read_long() 阻塞到下一筆原始讀數 (由 HX711Sampler 背景呼叫)。"""
+
+    @abstractmethod
+    def read_long(self):
+        ...
+
+    def get_offset(self):
+        return 0
+
+
+class Gate(ABC):
+    """出料閘門。close() 不等馬達轉完就返回。"""
+
+    @abstractmethod
+    def open(self):
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+class Camera(ABC):
+    """攝影機：read(out) 回傳 (ret, frame)，有給 out 就寫進 out；讀取失敗時自行重連。"""
+
+    @abstractmethod
+    def read(self, out=None):
+        ...
+
+    def release(self):
+        pass
+
+
+class Classifier(ABC):
+    """
+    分類器：提供 AsyncInferenceEngine 需要的 exec_net (requests / start_async)、
+    輸入輸出 blob 名稱、輸出類別數與對應的 Preprocessor。
+    子類別實作 available_devices() 與 load(裝置, request 數)；open() 依 device 字串逐一載入，
+    合成 exec_net 並設定 device / fallback。
+    """
+    exec_net = None
+    input_blob = None
+    out_blob = None
+    num_outputs = None
+    preprocessor = None
+    device = None
+    fallback = False
+
+    @abstractmethod
+    def available_devices(self):
+        """目前列舉得到的推論裝置名稱。"""
+
+    @abstractmethod
+    def load(self, device, num_requests):
+        """把模型載入單一裝置，回傳該裝置的 exec_net；失敗就丟例外。"""
+
+    def open(self, device, num_requests=2, cpu_requests=1, fallback=None):
+        self.exec_net, self.fallback = open_devices(device, self.available_devices(), self.load,
+                                                    num_requests, cpu_requests, fallback)
+        self.device = ",".join(d.name for d in self.exec_net.devices)
+
+
+class Backend(ABC):
+    """硬體後端：app.py 透過它建立秤、閘門、攝影機與分類器。"""
+    name = None
+
+    @abstractmethod
+    def scale(self):
+        ...
+
+    @abstractmethod
+    def gate(self):
+        ...
+
+    @abstractmethod
+    def camera(self):
+        ...
+
+    @abstractmethod
+    def available_devices(self):
+        ...
+
+    @abstractmethod
+    def classifier(self, model_xml, model_bin, device="MYRIAD", num_requests=2, cache_dir=None,
+                   fallback=None, cpu_requests=1):
+        ...
+
+    def cleanup(self):
+        pass
+
+
+# ================= 樹莓派實機 =================
+class HX711Scale(Scale):
+    def __init__(self, dout, pd_sck, event_mode=True):
+        import RPi.GPIO as GPIO
+        from hx711 import HX711
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        # 不在建構子裡固定睡 1 秒；開機歸零前 app 會等秤穩定
+        self.hx = HX711(dout, pd_sck, settleTime=0)
+        self.hx.set_reading_format("MSB", "MSB")
+        self.hx.reset()
+        if event_mode: self.hx.enable_event_mode(timeout=1.0)
+
+    def read_long(self):
+        return self.hx.read_long()
+
+    def get_offset(self):
+        return self.hx.get_offset()
+
+
+class ServoGate(Gate):
+    def __init__(self, pin, open_angle=90, close_angle=0, travel_time=0.5):
+        from gpiozero import AngularServo
+        self.open_angle = open_angle
+        self.close_angle = close_angle
+        self.travel_time = travel_time
+        self.servo = AngularServo(pin, min_angle=0, max_angle=180,
+                                  min_pulse_width=0.0005, max_pulse_width=0.0025)
+        self.servo.value = None
+
+    def open(self):
+        self.servo.angle = self.open_angle
+
+    def close(self):
+        # 關門後不等馬達轉完；travel_time 後在背景斷電 (若期間又開門就不斷電)
+        self.servo.angle = self.close_angle
+        def detach():
+            if self.servo.angle == self.close_angle: self.servo.value = None
+        t = threading.Timer(clock.real(self.travel_time), detach)
+        t.daemon = True
+        t.start()
+
+
+class OpenCVCamera(Camera):
+    def __init__(self, index=0, width=640, height=480, fps=30):
+        self.index = index
+        self.size = (width, height)
+        self.fps = fps
+        self.cap = None
+        self._open()
+
+    def _open(self):
+        self.cap = cv2.VideoCapture(self.index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+
+    def read(self, out=None):
+        ret, frame = self.cap.read(out) if out is not None else self.cap.read()
+        if not ret:
+            self.cap.release(); time.sleep(1); self._open()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def expand_devices(spec, available):
+    """
+    "MYRIAD,CPU" → 實際要載入的裝置名稱 (依序)。
+    MYRIAD 等類型名稱展開成所有插著的同類裝置 (MYRIAD.1.2-ma2480 ...)；找不到的照原名保留，載入時才報錯。
+    """
+    devices = []
+    for name in (n.strip() for n in spec.split(",")):
+        if not name: continue
+        matches = [d for d in available if d == name or d.startswith(name + ".")]
+        devices += [d for d in (matches or [name]) if d not in devices]
+    return devices
+
+
+def open_devices(spec, available, load, num_requests=2, cpu_requests=1, fallback=None):
+    """
+    依序在 spec 的每個裝置上 load(裝置, request 數) 載入模型，載入失敗的略過；
+    全部失敗時改用 fallback (例如沒插 NCS2 的電腦用 CPU)；載入失敗的記在 exec_net.missing。
+    回傳 (MultiDeviceExecNet, 是否用了 fallback)。
+    """
+    from device_pool import MultiDeviceExecNet
+
+    def requests_for(dev):
+        return cpu_requests if dev.split(".")[0] == "CPU" else num_requests
+
+    nets = []
+    missing = []
+    for dev in expand_devices(spec, available):
+        try:
+            nets.append((dev, load(dev, requests_for(dev))))
+        except Exception as e:
+            print(f"❌ {dev} 載入失敗: {e}")
+            missing.append(dev)
+    used_fallback = False
+    if not nets and fallback:
+        print(f"⚠️ {spec} 都無法使用，改用 {fallback}")
+        nets.append((fallback, load(fallback, requests_for(fallback))))
+        used_fallback = True
+    if not nets: raise RuntimeError(f"沒有可用的推論裝置 ({spec})")
+    return MultiDeviceExecNet(nets, missing), used_fallback
+
+
+MODEL_PRECISIONS = ("FP32", "FP16", "INT8")
+
+
+def model_files(model_dir, precision, name):
+    """Model Zoo 的目錄結構：<model_dir>/<精度>/<name>.xml + .bin (INT8 由 quantize_model.py 產生)。"""
+    if precision not in MODEL_PRECISIONS:
+        raise ValueError(f"不支援的模型精度: {precision} (可用 {', '.join(MODEL_PRECISIONS)})")
+    stem = os.path.join(model_dir, precision, name)
+    return stem + ".xml", stem + ".bin"
+
+
+class OpenVINOClassifier(Classifier):
+    """
+    同一份 IR 可載入多個裝置 (device="MYRIAD,CPU"；MYRIAD = 所有插著的 NCS2)，
+    合成一個 MultiDeviceExecNet，畫面送到有空位的裝置；都載入失敗時改用 fallback。
+    cache_dir 有設定時，第一次編譯後把 exec_net 匯出成 blob，之後直接 import_network，
+    省掉 MYRIAD 每次開機 10 秒以上的編譯；模型檔比 blob 新時自動重新編譯。
+    """
+
+    def __init__(self, model_xml, model_bin, device="MYRIAD", num_requests=2, cache_dir=None,
+                 fallback=None, cpu_requests=1):
+        from openvino.inference_engine import IECore
+        from preprocess import Preprocessor
+        self.ie = IECore()
+        self.model_xml = model_xml
+        self.model_bin = model_bin
+        self.cache_dir = cache_dir
+        self.net = self.ie.read_network(model=model_xml, weights=model_bin)
+        self.input_blob = next(iter(self.net.input_info))
+        self.out_blob = next(iter(self.net.outputs))
+        self.num_outputs = math.prod(self.net.outputs[self.out_blob].shape[1:])
+        self.preprocessor = Preprocessor.from_network(self.net, self.input_blob)
+        self.cached = False
+
+        self.open(device, num_requests, cpu_requests, fallback)
+
+    def available_devices(self):
+        return self.ie.available_devices
+
+    def load(self, device, num_requests):
+        ie = self.ie
+        blob = None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 同類裝置 (每支 NCS2) 共用同一個 blob；檔名含精度目錄，FP16 / INT8 同名模型不會互相蓋掉
+            name = os.path.splitext(os.path.basename(self.model_xml))[0]
+            variant = os.path.basename(os.path.dirname(os.path.abspath(self.model_xml)))
+            blob = os.path.join(self.cache_dir, f"{name}.{variant}.{device.split('.')[0]}.blob")
+            newest = max(os.path.getmtime(self.model_xml), os.path.getmtime(self.model_bin))
+            if os.path.exists(blob) and os.path.getmtime(blob) >= newest:
+                try:
+                    exec_net = ie.import_network(model_file=blob, device_name=device,
+                                                 num_requests=num_requests)
+                    self.cached = True
+                    return exec_net
+                except Exception as e:
+                    print(f"⚠️ 模型快取無法使用，重新編譯: {e}")
+            try:
+                # CPU / GPU 用 OpenVINO 內建的模型快取 (MYRIAD 不支援，改靠下面的 export)
+                ie.set_config({"CACHE_DIR": self.cache_dir}, device.split(".")[0])
+            except Exception:
+                pass
+
+        exec_net = ie.load_network(network=self.net, device_name=device, num_requests=num_requests)
+        if blob:
+            try:
+                exec_net.export(blob)
+            except Exception:
+                pass    # CPU 等不支援匯出的裝置靠上面的 CACHE_DIR
+        return exec_net
+
+
+class PiBackend(Backend):
+    """樹莓派 + HX711 + 伺服馬達 + USB 攝影機 + NCS2 (可多支，或退回 CPU)。"""
+    name = "pi"
+
+    def __init__(self, dt_pin, sck_pin, servo_pin, servo_open=90, servo_close=0,
+                 servo_travel=0.5, event_mode=True, camera_index=0):
+        self.dt_pin = dt_pin
+        self.sck_pin = sck_pin
+        self.servo_pin = servo_pin
+        self.servo_open = servo_open
+        self.servo_close = servo_close
+        self.servo_travel = servo_travel
+        self.event_mode = event_mode
+        self.camera_index = camera_index
+
+    def scale(self):
+        return HX711Scale(self.dt_pin, self.sck_pin, event_mode=self.event_mode)
+
+    def gate(self):
+        return ServoGate(self.servo_pin, self.servo_open, self.servo_close, self.servo_travel)
+
+    def camera(self):
+        return OpenCVCamera(self.camera_index)
+
+    def available_devices(self):
+        # 目前列舉得到的推論裝置 (不載入模型)，給 model_supervisor 判斷有沒有新插上的 NCS2
+        from openvino.inference_engine import IECore
+        return IECore().available_devices
+
+    def classifier(self, model_xml, model_bin, device="MYRIAD", num_requests=2, cache_dir=None,
+                   fallback=None, cpu_requests=1):
+        return OpenVINOClassifier(model_xml, model_bin, device, num_requests, cache_dir,
+                                  fallback, cpu_requests)
+
+    def cleanup(self):
+        try:
+            import RPi.GPIO as GPIO
+            GPIO.cleanup()
+        except ImportError:
+            pass
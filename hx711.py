@@ -2,9 +2,16 @@ import RPi.GPIO as GPIO
 import time
 import threading
 
+# PD_SCK high for more than 60us powers the HX711 down, which corrupts the
+# sample being clocked out.  clockOutLong() times every high phase against
+# this limit (with some margin) and discards the sample if it was exceeded.
+PD_SCK_MAX_HIGH = 50e-6
+# How long discardSample() holds PD_SCK high to force a power-down reset.
+PD_SCK_RESET_HIGH = 100e-6
+
 class HX711:
 
-    def __init__(self, dout, pd_sck, gain=128):
+    def __init__(self, dout, pd_sck, gain=128, settleTime=1.0):
         self.PD_SCK = pd_sck
 
         self.DOUT = dout
@@ -33,10 +40,32 @@ class HX711:
         self.byte_format = 'MSB'
         self.bit_format = 'MSB'
 
+        # Fast read path: the 24 bits are always clocked in MSB-first order,
+        # then rearranged by this function if another reading format is
+        # configured.  None means MSB/MSB, which needs no rearranging.
+        self.reorderRaw = None
+
+        # Edge-triggered (interrupt) mode.  When enabled, samples are read by
+        # a FALLING-edge callback on DOUT and handed to read_long() callers
+        # through sampleCond, instead of busy-waiting on is_ready().
+        self.eventMode = False
+        self.eventTimeout = 1.0
+        self.sampleCond = threading.Condition()
+        self.sampleSeq = 0
+
+        # Samples thrown away because PD_SCK stayed high too long (the
+        # thread was preempted mid-pulse), and how often to retry.
+        self.maxHighTime = PD_SCK_MAX_HIGH
+        self.readRetries = 3
+        self.discardedSamples = 0
+        self.discardNext = False
+
         self.set_gain(gain)
         
-        # Think about whether this is necessary.
-        time.sleep(1)
+        # Think about whether this is necessary.  Callers that wait for the
+        # readings to stabilise themselves can pass settleTime=0.
+        if settleTime > 0:
+            time.sleep(settleTime)
 
 
     def convertFromTwosComplement24bit(self, inputValue):
@@ -111,6 +140,18 @@ class HX711:
         while not self.is_ready():
            pass
 
+        dataBytes = self.clockOutBytes()
+
+        # Release the Read Lock, now that we've finished driving the HX711
+        # serial interface.
+        self.readLock.release()
+
+        return dataBytes
+
+
+    def clockOutBytes(self):
+        # Caller must hold readLock and have seen is_ready().
+
         # Read three bytes of data from the HX711.
         firstByte  = self.readNextByte()
         secondByte = self.readNextByte()
@@ -122,10 +163,6 @@ class HX711:
            # Clock a bit out of the HX711 and throw it away.
            self.readNextBit()
 
-        # Release the Read Lock, now that we've finished driving the HX711
-        # serial interface.
-        self.readLock.release()           
-
         # Depending on how we're configured, return an ordered list of raw byte
         # values.
         if self.byte_format == 'LSB':
@@ -134,11 +171,96 @@ class HX711:
            return [firstByte, secondByte, thirdByte]
 
 
+    def clockOutLong(self):
+        # Fast path equivalent of clockOutBytes() + bytesToLong().  Caller
+        # must hold readLock and have seen is_ready().  Returns None if the
+        # sample had to be discarded.
+        #
+        # PD_SCK must not stay high for more than 60us or the HX711 powers
+        # down.  Python can't guarantee that (another thread may take the GIL
+        # or the OS may preempt us between the two output calls), so each
+        # high phase is timed and the sample is thrown away if one ran over.
+        # discardSample() then forces a full reset, since an overrun below
+        # 60us leaves the chip part-way through the word.  The GPIO functions
+        # and pins are bound to locals to keep each bit down to a handful of
+        # bytecodes.
+        output = GPIO.output
+        read = GPIO.input
+        clock = time.perf_counter
+        sck = self.PD_SCK
+        dout = self.DOUT
+        maxHigh = self.maxHighTime
+
+        value = 0
+        for i in range(24 + self.GAIN):
+            t = clock()
+            output(sck, True)
+            output(sck, False)
+            if clock() - t > maxHigh:
+                return self.discardSample()
+            # The last GAIN pulses only select channel/gain for the next
+            # conversion.
+            if i < 24:
+                value = (value << 1) | read(dout)
+
+        if self.discardNext:
+            # First conversion after a power-down reset is channel A/128.
+            self.discardNext = False
+            self.discardedSamples += 1
+            return None
+
+        if self.reorderRaw is not None:
+            value = self.reorderRaw(value)
+
+        # 24bit twos-complement to signed.
+        if value & 0x800000:
+            value -= 0x1000000
+
+        self.lastVal = value
+        return value
+
+
+    def discardSample(self):
+        # Caller holds readLock.  A pulse ran over maxHighTime, so the HX711
+        # may have powered down (over 60us) or may still be part-way through
+        # shifting out the word (50-60us); in the second case DOUT is a data
+        # bit, and is_ready() could take a low one for a new conversion and
+        # read a misaligned word.  Force a real power-down reset either way:
+        # hold PD_SCK high past 60us, then lower it so the chip powers up and
+        # starts a fresh conversion (DOUT stays high until it is ready).
+        GPIO.output(self.PD_SCK, True)
+        time.sleep(PD_SCK_RESET_HIGH)
+        GPIO.output(self.PD_SCK, False)
+        # It comes back up in its default channel A / gain 128 mode, so with
+        # any other gain the next conversion must be thrown away as well.
+        self.discardedSamples += 1
+        self.discardNext = (self.GAIN != 1)
+        return None
+
+
     def read_long(self):
-        # Get a sample from the HX711 in the form of raw bytes.
-        dataBytes = self.readRawBytes()
+        # In event mode the data-ready callback does the reading; just wait
+        # for the next sample it publishes.
+        if self.eventMode:
+            return self.wait_for_sample(self.eventTimeout)
+
+        self.readLock.acquire()
+        try:
+            for attempt in range(self.readRetries + 1):
+                # Wait until HX711 is ready for us to read a sample.
+                while not self.is_ready():
+                   pass
+
+                value = self.clockOutLong()
+                if value is not None:
+                    return value
+        finally:
+            self.readLock.release()
+
+        raise IOError("HX711::read_long(): PD_SCK held high too long on %d reads in a row" % (self.readRetries + 1))
 
 
+    def bytesToLong(self, dataBytes):
         if self.DEBUG_PRINTING:
             print(dataBytes,)
         
@@ -160,6 +282,70 @@ class HX711:
         return int(signedIntValue)
 
     
+    def enable_event_mode(self, timeout=1.0):
+        if self.eventMode:
+            return
+
+        self.eventTimeout = timeout
+        self.eventMode = True
+        GPIO.add_event_detect(self.DOUT, GPIO.FALLING,
+                              callback=self.dataReadyCallback)
+
+        # If a conversion is already waiting, DOUT is low and no falling edge
+        # will come until it has been read, so read it now.
+        if self.is_ready():
+            self.dataReadyCallback(self.DOUT)
+
+
+    def disable_event_mode(self):
+        if not self.eventMode:
+            return
+
+        GPIO.remove_event_detect(self.DOUT)
+        self.eventMode = False
+
+
+    def dataReadyCallback(self, channel):
+        # DOUT also toggles while the data bits are being clocked out, and
+        # another thread may be driving the interface (set_gain, power_up).
+        # Ignore edges that don't correspond to a pending conversion.
+        if not self.readLock.acquire(False):
+            return
+
+        try:
+            if not self.is_ready():
+                return
+            value = self.clockOutLong()
+        finally:
+            self.readLock.release()
+
+        # Discarded sample: the next data-ready edge brings a fresh one.
+        if value is None:
+            return
+
+        with self.sampleCond:
+            self.sampleSeq += 1
+            self.sampleCond.notify_all()
+
+        return value
+
+
+    def wait_for_sample(self, timeout=1.0):
+        with self.sampleCond:
+            seq = self.sampleSeq
+            if self.sampleCond.wait_for(lambda: self.sampleSeq != seq, timeout):
+                return int(self.lastVal)
+
+        # No edge arrived.  If an edge was dropped while the lock was busy,
+        # DOUT is stuck low waiting for us, so read it directly to recover.
+        if self.is_ready():
+            value = self.dataReadyCallback(self.DOUT)
+            if value is not None:
+                return int(value)
+
+        raise TimeoutError("HX711::wait_for_sample(): no data-ready edge within %.2fs" % timeout)
+
+
     def read_average(self, times=3):
         # Make sure we've been asked to take a rational amount of samples.
         if times <= 0:
@@ -216,8 +402,8 @@ class HX711:
        else:
           # If times is even we have to take the arithmetic mean of
           # the two middle values.
-          midpoint = len(valueList) / 2
-          return sum(valueList[midpoint:midpoint+2]) / 2.0
+          midpoint = len(valueList) // 2
+          return sum(valueList[midpoint-1:midpoint+1]) / 2.0
 
 
     # Compatibility function, uses channel A version
@@ -314,6 +500,8 @@ class HX711:
         else:
             raise ValueError("Unrecognised bitformat: \"%s\"" % bit_format)
 
+        self.reorderRaw = makeRawReorder(self.byte_format, self.bit_format)
+
             
     # sets offset for channel A for compatibility reasons
     def set_offset(self, offset):
@@ -415,8 +603,38 @@ class HX711:
         self.power_down()
         self.power_up()
 
+# Bit-reversal table for LSB bit_format.
+_REVERSED_BYTE = [int('{:08b}'.format(b)[::-1], 2) for b in range(256)]
+
+def makeRawReorder(byte_format, bit_format):
+    # Returns a function mapping a 24bit value clocked in MSB-first to the
+    # value readRawBytes()/bytesToLong() give for the requested format, or
+    # None for MSB/MSB where they are identical.
+    swapBytes = (byte_format == 'LSB')
+    reverseBits = (bit_format == 'LSB')
+
+    if not swapBytes and not reverseBits:
+        return None
+
+    def reorder(value):
+        b0 = (value >> 16) & 0xff
+        b1 = (value >> 8) & 0xff
+        b2 = value & 0xff
+
+        if reverseBits:
+            b0 = _REVERSED_BYTE[b0]
+            b1 = _REVERSED_BYTE[b1]
+            b2 = _REVERSED_BYTE[b2]
+
+        if swapBytes:
+            b0, b2 = b2, b0
+
+        return (b0 << 16) | (b1 << 8) | b2
+
+    return reorder
+
 def hx711_add_event_detect(hx711_instance, event_callback):
-        GPIO.add_event_detect(self.DOUT, GPIO.FALLING, 
+        GPIO.add_event_detect(hx711_instance.DOUT, GPIO.FALLING, 
             callback=event_callback)
 
 # EOF - hx711.py
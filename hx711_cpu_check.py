@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# HX711 CPU 使用率比較：忙碌輪詢 vs DOUT 下降緣中斷
+# 用法: python hx711_cpu_check.py [每種模式秒數]
+import sys
+import time
+import RPi.GPIO as GPIO
+from hx711 import HX711
+
+DT_PIN = 23
+SCK_PIN = 24
+
+
+def measure(hx, seconds):
+    samples = 0
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    while time.monotonic() - wall0 < seconds:
+        hx.read_long()
+        samples += 1
+    cpu = time.process_time() - cpu0
+    wall = time.monotonic() - wall0
+    return samples / wall, cpu / wall * 100
+
+
+try:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    GPIO.setmode(GPIO.BCM)
+    hx = HX711(DT_PIN, SCK_PIN)
+    hx.set_reading_format("MSB", "MSB")
+    hx.reset()
+
+    print(f"=== 忙碌輪詢模式 ({seconds:.0f} 秒) ===")
+    sps, cpu = measure(hx, seconds)
+    print(f"取樣率: {sps:.1f} SPS   CPU: {cpu:.1f}%")
+
+    hx.enable_event_mode()
+    print(f"=== 中斷模式 ({seconds:.0f} 秒) ===")
+    sps, cpu = measure(hx, seconds)
+    print(f"取樣率: {sps:.1f} SPS   CPU: {cpu:.1f}%")
+    hx.disable_event_mode()
+
+except KeyboardInterrupt:
+    print("\n強制結束")
+finally:
+    GPIO.cleanup()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import cv2
+
+
+class InferenceROI:
+    """
+    推論前的裁切範圍：只把碗附近 / 有動靜的那一塊送去分類，不再把整張 640x480 壓成 224x224。
+    - full：整張畫面
+    - fixed：固定的 roi (碗附近)
+    - motion：動態閘門算出的變動外框 (MotionGate.last_box)，向外擴大 margin、至少 min_size，
+              並補成模型輸入的長寬比 (letterbox 補邊少)；沒有外框時退回 roi
+    crop() 回傳原畫面的 view (不複製)，FramePool 的序號檢查照樣有效。
+    """
+    MODES = ("full", "fixed", "motion")
+
+    def __init__(self, mode="full", roi=None, margin=0.25, min_size=0.35, aspect=1.0):
+        if mode not in self.MODES: raise ValueError(f"不支援的 ROI 模式: {mode}")
+        self.mode = mode
+        self.roi = roi              # (x, y, w, h) 0~1 比例；None = 全畫面
+        self.margin = margin        # 動態外框每邊向外擴大的比例 (相對外框大小)
+        self.min_size = min_size    # 動態裁切邊長至少是畫面短邊的幾倍
+        self.aspect = aspect        # 模型輸入的寬 / 高
+        self.last_box = None        # 最近一次的裁切範圍 (x0, y0, x1, y1) 像素
+        self.last_source = None     # 'full' / 'fixed' / 'motion'
+        self.crops = 0
+        self._area = 0.0            # 裁切面積 / 畫面面積 的累計
+
+    def select(self, shape, motion_box=None):
+        """畫面大小 shape (h, w, ...) 與動態外框 → 裁切範圍 (x0, y0, x1, y1) 像素。"""
+        fh, fw = shape[:2]
+        if self.mode == "motion" and motion_box is not None:
+            box, source = self._expand(motion_box, fw, fh), "motion"
+        elif self.mode != "full" and self.roi is not None:
+            x, y, w, h = self.roi
+            box, source = (x * fw, y * fh, (x + w) * fw, (y + h) * fh), "fixed"
+        else:
+            box, source = (0, 0, fw, fh), "full"
+        x0, y0, x1, y1 = (int(round(v)) for v in box)
+        x0, y0 = min(max(x0, 0), fw - 1), min(max(y0, 0), fh - 1)
+        x1, y1 = min(max(x1, x0 + 1), fw), min(max(y1, y0 + 1), fh)
+        self.last_box, self.last_source = (x0, y0, x1, y1), source
+        return self.last_box
+
+    def _expand(self, motion_box, fw, fh):
+        x, y, w, h = motion_box
+        cx, cy = (x + w / 2) * fw, (y + h / 2) * fh
+        w, h = w * fw * (1 + 2 * self.margin), h * fh * (1 + 2 * self.margin)
+        side = self.min_size * min(fw, fh)
+        w, h = max(w, side), max(h, side)
+        # 補成模型的長寬比 (只放大不縮小)，超出畫面時貼齊邊界
+        if w / h < self.aspect: w = h * self.aspect
+        else: h = w / self.aspect
+        w, h = min(w, fw), min(h, fh)
+        x0 = min(max(cx - w / 2, 0), fw - w)
+        y0 = min(max(cy - h / 2, 0), fh - h)
+        return x0, y0, x0 + w, y0 + h
+
+    def crop(self, frame, motion_box=None):
+        x0, y0, x1, y1 = self.select(frame.shape, motion_box)
+        self.crops += 1
+        self._area += (x1 - x0) * (y1 - y0) / (frame.shape[0] * frame.shape[1])
+        return frame[y0:y1, x0:x1]
+
+    def draw(self, frame):
+        """/video_feed 除錯用：複製一份畫面，畫出固定 ROI (黃) 與最近一次的推論裁切 (綠)。"""
+        out = frame.copy()
+        fh, fw = out.shape[:2]
+        if self.roi is not None and self.mode != "full":
+            x, y, w, h = self.roi
+            cv2.rectangle(out, (int(x * fw), int(y * fh)), (int((x + w) * fw) - 1, int((y + h) * fh) - 1),
+                          (0, 255, 255), 1)
+        box = self.last_box
+        if box is not None:
+            x0, y0, x1, y1 = box
+            cv2.rectangle(out, (x0, y0), (x1 - 1, y1 - 1), (0, 255, 0), 2)
+            cv2.putText(out, f"ROI {self.last_source}", (x0 + 4, max(y0 - 6, 14)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        return out
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'source': self.last_source,
+            'box': list(self.last_box) if self.last_box else None,
+            'crops': self.crops,
+            'avg_area_ratio': round(self._area / self.crops, 3) if self.crops else 0.0,
+        }
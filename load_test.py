@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# 壓力測試：同時打 /status 與開多條 /video_feed，回報延遲 p50/p99
+# 用法: python3 load_test.py http://192.168.1.100:5000 [--status-clients 8] [--video-clients 3] [--duration 20]
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(values, p):
+    if not values: return float('nan')
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def status_client(base, stop, latencies, errors):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + "/status", timeout=10) as r:
+                r.read()
+            latencies.append(time.perf_counter() - t0)
+        except (urllib.error.URLError, OSError):
+            errors.append(1)
+            time.sleep(0.1)
+
+
+def video_client(base, stop, first_frame, gaps, errors):
+    # 讀 multipart 串流，以 JPEG 結尾標記計算每張畫面的間隔
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(base + "/video_feed", timeout=10) as r:
+            last = None
+            buf = b""
+            while not stop.is_set():
+                chunk = r.read(16384)
+                if not chunk: break
+                buf += chunk
+                while True:
+                    end = buf.find(b"\xff\xd9")
+                    if end < 0: break
+                    buf = buf[end + 2:]
+                    now = time.perf_counter()
+                    if last is None: first_frame.append(now - t0)
+                    else: gaps.append(now - last)
+                    last = now
+    except urllib.error.HTTPError as e:
+        errors.append(e.code)
+    except (urllib.error.URLError, OSError):
+        errors.append(1)
+
+
+def report(name, values, unit=1000.0, suffix="ms"):
+    print(f"{name:<22} n={len(values):<6} p50={percentile(values, 50) * unit:8.1f}{suffix}  "
+          f"p99={percentile(values, 99) * unit:8.1f}{suffix}  max={max(values, default=float('nan')) * unit:8.1f}{suffix}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智慧餵食器壓力測試")
+    parser.add_argument("base", help="例如 http://192.168.1.100:5000")
+    parser.add_argument("--status-clients", type=int, default=8)
+    parser.add_argument("--video-clients", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+    base = args.base.rstrip("/")
+
+    stop = threading.Event()
+    status_lat, status_err = [], []
+    first_frame, frame_gaps, video_err = [], [], []
+    threads = [threading.Thread(target=status_client, args=(base, stop, status_lat, status_err))
+               for _ in range(args.status_clients)]
+    threads += [threading.Thread(target=video_client, args=(base, stop, first_frame, frame_gaps, video_err))
+                for _ in range(args.video_clients)]
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    print(f">>> {args.status_clients} 個 /status 客戶端 + {args.video_clients} 條 /video_feed，持續 {args.duration:.0f} 秒...")
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads: t.join(timeout=5)
+
+    print("=" * 70)
+    report("/status 延遲", status_lat)
+    print(f"{'':<22} 吞吐量 {len(status_lat) / args.duration:.1f} req/s, 錯誤 {len(status_err)}")
+    report("/video_feed 首張畫面", first_frame)
+    report("/video_feed 畫面間隔", frame_gaps)
+    if frame_gaps:
+        print(f"{'':<22} 平均 {len(frame_gaps) / args.duration / max(1, len(first_frame)):.1f} fps/條, 錯誤 {video_err}")
+
+
+if __name__ == '__main__':
+    main()
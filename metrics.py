@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# 輕量量測：固定 bucket 直方圖 + 慢事件環狀緩衝區，輸出 Prometheus 文字格式 (/metrics)。
+# observe() 只做一次 bisect + 幾個加法 (約 1 微秒)，可以在正式環境一直開著。
+import bisect
+import collections
+import contextlib
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, slow=None, registry=None):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.slow = slow
+        self.registry = registry
+        self._counts = [0] * (len(self.buckets) + 1)   # 最後一格是 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, detail=None):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+            self._count += 1
+        if self.slow is not None and seconds >= self.slow and self.registry is not None:
+            self.registry.slow_event(self.name, seconds, detail)
+
+    def since(self, t0, detail=None):
+        """observe(perf_counter() - t0)，回傳量到的秒數。"""
+        dt = time.perf_counter() - t0
+        self.observe(dt, detail)
+        return dt
+
+    @contextlib.contextmanager
+    def span(self, detail=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.since(t0, detail)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def render(self):
+        counts, total, n = self.snapshot()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        acc = 0
+        for le, c in zip(self.buckets, counts):
+            acc += c
+            lines.append(f'{self.name}_bucket{{le="{le:g}"}} {acc}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {n}')
+        lines.append(f"{self.name}_sum {total:.6f}")
+        lines.append(f"{self.name}_count {n}")
+        return lines
+
+
+class Registry:
+    """所有直方圖與 gauge 的集合；gauge 由函式在輸出時才取值，平常不花任何成本。"""
+
+    def __init__(self, slow_events=200):
+        self._histograms = []
+        self._gauges = []
+        self._slow = collections.deque(maxlen=slow_events)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, slow=None):
+        h = Histogram(name, help_text, buckets, slow, registry=self)
+        self._histograms.append(h)
+        return h
+
+    def gauge(self, name, help_text, fn, kind="gauge", label=None):
+        # kind = gauge 或 counter (累計值，例如已送出的推論數)
+        # 有 label 時 fn 回傳 {標籤值: 數值}，例如每個推論裝置各一行
+        self._gauges.append((name, help_text, fn, kind, label))
+
+    def slow_event(self, name, seconds, detail=None):
+        self._slow.append({'time': time.time(), 'metric': name,
+                           'ms': round(seconds * 1000, 2), 'detail': detail})
+
+    def slow_events(self, n=None):
+        events = list(self._slow)
+        return events[-n:] if n else events
+
+    def render(self):
+        lines = []
+        for h in self._histograms: lines += h.render()
+        for name, help_text, fn, kind, label in self._gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None: continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if label is None:
+                lines.append(f"{name} {float(value):g}")
+            else:
+                lines += [f'{name}{{{label}="{k}"}} {float(v):g}' for k, v in value.items()]
+        return "\n".join(lines) + "\n"
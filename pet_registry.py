@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+
+# 寵物資料表 (init_db.py 與 app.py 共用同一份定義)
+# 欄位：名字、體重、目標食量(體重x2%)、品種ID、品種名稱
+PETS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS pets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        weight REAL NOT NULL,
+        target_feed REAL NOT NULL,
+        breed_id INTEGER NOT NULL,
+        breed_name TEXT NOT NULL
+    )
+'''
+PETS_INDEX = 'CREATE INDEX IF NOT EXISTS idx_pets_breed_id ON pets (breed_id)'
+
+
+def create_schema(conn):
+    conn.execute(PETS_SCHEMA)
+    conn.execute(PETS_INDEX)
+    conn.commit()
+
+
+class PetRegistry:
+    """
+    寵物資料快取：開機時從 SQLite 載入一次，以 breed_id 為 key 放在記憶體。
+    偵測流程只做 dict 查詢；/save_pet 寫入資料庫後同步更新快取。
+    資料庫使用單一持久連線 (WAL 模式)，寫入以鎖保護。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        create_schema(self._conn)
+        self._pets = {}
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT name, weight, target_feed, breed_id, breed_name FROM pets ORDER BY rowid').fetchall()
+        # 同一品種有多筆時以最後一筆為準 (與舊版 DELETE + INSERT 行為一致)
+        self._pets = {int(r[3]): r for r in rows}
+        return len(self._pets)
+
+    def get(self, breed_id):
+        """回傳 (name, weight, target_feed, breed_id, breed_name) 或 None。"""
+        return self._pets.get(int(breed_id))
+
+    def save(self, name, weight, target_feed, breed_id, breed_name):
+        breed_id = int(breed_id)
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM pets WHERE breed_id=?', (breed_id,))
+                self._conn.execute(
+                    'INSERT INTO pets (name, weight, target_feed, breed_id, breed_name) VALUES (?,?,?,?,?)',
+                    (name, weight, target_feed, breed_id, breed_name))
+            # 換掉整個 dict，讀取端永遠看到完整的一份
+            pets = dict(self._pets)
+            pets[breed_id] = (name, weight, target_feed, breed_id, breed_name)
+            self._pets = pets
+
+    def all(self):
+        return list(self._pets.values())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import collections
+import hashlib
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from breed_head import is_dog
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def top_k(probs, k):
+    """機率最高的 k 個類別，回傳 (類別 ID 陣列, 機率陣列)，由高到低。"""
+    k = min(k, len(probs))
+    idx = np.argpartition(probs, -k)[-k:]
+    idx = idx[np.argsort(probs[idx])[::-1]]
+    return idx, probs[idx]
+
+
+class ArchiveTooLarge(ValueError):
+    """zip 的項目數或解壓後總大小超過上限 (/analyze_photos 回 413)。"""
+
+
+def read_zip(data, max_files, max_bytes, max_total=None, max_entries=None):
+    """
+    從 zip 取出圖片檔，回傳 [(檔名, bytes)]；單檔解壓後超過 max_bytes 的直接略過 (防 zip bomb)。
+    項目數超過 max_entries、或取出的圖片解壓後合計超過 max_total 時丟出 ArchiveTooLarge
+    (依 zip 目錄記載的大小先檢查，不必解壓；zipfile 讀取時也不會超過記載的大小)。
+    """
+    items = []
+    total = 0
+    with zipfile.ZipFile(data) as zf:
+        infos = zf.infolist()
+        if max_entries is not None and len(infos) > max_entries:
+            raise ArchiveTooLarge(f"zip 內有 {len(infos)} 個項目，上限 {max_entries}")
+        for info in infos:
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTS): continue
+            if info.file_size > max_bytes: continue
+            total += info.file_size
+            if max_total is not None and total > max_total:
+                raise ArchiveTooLarge(f"zip 解壓後超過 {max_total // (1024 * 1024)} MB")
+            items.append((info.filename, zf.read(info)))
+            if len(items) >= max_files: break
+    return items
+
+
+class PhotoAnalyzer:
+    """
+    多張照片分類 (/analyze_photos)：
+    - 以內容 SHA-256 為 key 快取前 cache_top 名結果，重複上傳不再推論
+    - 解碼交給執行緒池 (cv2.imdecode 會釋放 GIL)
+    - 沒有快取的圖片一次交給 infer_batch (多個 infer request 並行)
+    - classes 同 DetectionVoter：機率向量位置 → 類別 ID (None = 位置即 ID)
+    """
+
+    def __init__(self, infer_batch, labels, decode_workers=2, cache_size=256, cache_top=10, classes=None):
+        self.infer_batch = infer_batch
+        self.labels = labels
+        self.classes = classes
+        self.cache_top = cache_top
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers)
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None: self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, entry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size: self._cache.popitem(last=False)
+
+    @staticmethod
+    def _decode(data):
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    def analyze(self, items, k=3):
+        """items = [(檔名, bytes)]，回傳每張的結果 dict (順序與輸入相同)。"""
+        k = max(1, min(k, self.cache_top))
+        keys = [hashlib.sha256(data).hexdigest() for _, data in items]
+        entries = [self._cache_get(key) for key in keys]
+
+        # 只解碼沒有快取的圖片；同一批內重複的圖片只算一次
+        todo = {}
+        for i, (key, entry) in enumerate(zip(keys, entries)):
+            if entry is None and key not in todo: todo[key] = i
+        self.hits += len(items) - len(todo)
+        self.misses += len(todo)
+
+        errors = {}
+        fresh = {}
+        if todo:
+            order = list(todo.items())
+            images = list(self._decode_pool.map(self._decode, [items[i][1] for _, i in order]))
+            valid = [(key, img) for (key, _), img in zip(order, images) if img is not None]
+            errors = {key: "無法解析圖片" for (key, _), img in zip(order, images) if img is None}
+            if valid:
+                probs = self.infer_batch([img for _, img in valid])
+                for (key, _), p in zip(valid, probs):
+                    idx, values = top_k(p, self.cache_top)
+                    fresh[key] = (idx if self.classes is None else self.classes[idx], values)
+                    self._cache_put(key, fresh[key])
+
+        results = []
+        for (name, _), key, entry in zip(items, keys, entries):
+            cached = entry is not None
+            if entry is None: entry = fresh.get(key)
+            if entry is None:
+                results.append({'name': name, 'hash': key, 'error': errors.get(key, "推論失敗")})
+                continue
+            ids, values = entry
+            top = [{'breed_id': int(c), 'breed_name': self.labels.get(int(c), "?"),
+                    'prob': round(float(p), 4), 'is_dog': is_dog(c)}
+                   for c, p in zip(ids[:k], values[:k])]
+            results.append({'name': name, 'hash': key, 'cached': cached,
+                            'is_dog': top[0]['is_dog'], 'top': top})
+        return results
+
+    def stats(self):
+        return {'cached': len(self._cache), 'hits': self.hits, 'misses': self.misses}
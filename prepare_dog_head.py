@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# 模型前置處理：把 MobileNet-V2 IR 的輸出縮成 118 個狗品種 + 1 格「其他」(共 119 類)，存成新的 IR
+# 用法: python3 prepare_dog_head.py [--xml models/public/mobilenet-v2/FP16/mobilenet-v2.xml] [--other exact|mean]
+#
+# 兩種做法 (直接改 IR 的 xml 與 bin，不需要安裝 OpenVINO)：
+#   exact (預設)：保留 1000 類的 fc7 與 SoftMax，後面接一個 1x1 卷積把機率挑出來：
+#                 前 118 格 = 狗品種機率，最後一格 = 其餘 882 類的機率總和。結果與完整模型完全相同，
+#                 輸出從 1000 個數字變成 119 個 (USB 傳輸與後處理都變少)。
+#   mean：直接把 fc7 切成 119 列 (省掉 fc7 約 88% 的乘加)，「其他」那列用非狗類別權重的平均，
+#         加上 log(882) 的偏移 (log-sum-exp 的下界近似)；非狗物體很明確時「其他」會被低估，
+#         請先用 compare_heads.py 確認準確率再使用。
+# 產生的模型輸出第 i 格對應 breed_head.DOG_HEAD_CLASSES[i]，app.py 的 BREED_HEAD 必須是 "dog"。
+import argparse
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+
+from breed_head import DOG_CLASS_MIN, DOG_CLASS_MAX, DOG_HEAD_CLASSES
+
+ELEMENT_TYPES = {'f16': np.float16, 'f32': np.float32}
+PRECISIONS = {'f16': "FP16", 'f32': "FP32"}
+
+
+class IR:
+    """IR v10/v11 的 xml + bin：以 layer id 查圖層與連線，Const 的資料可以讀取或換掉。"""
+
+    def __init__(self, xml_path, bin_path):
+        self.tree = ET.parse(xml_path)
+        self.root = self.tree.getroot()
+        self.layers_el = self.root.find('layers')
+        self.edges_el = self.root.find('edges')
+        self.layers = {l.get('id'): l for l in self.layers_el}
+        with open(bin_path, 'rb') as f:
+            self.blob = f.read()
+        self.replaced = {}      # layer id -> 新的 Const 資料 (bytes)
+
+    def producer(self, layer_id, port=None):
+        """接到 layer_id (某個輸入 port) 的上游圖層與 edge。"""
+        for e in self.edges_el:
+            if e.get('to-layer') == layer_id and (port is None or e.get('to-port') == str(port)):
+                return self.layers[e.get('from-layer')], e
+        raise ValueError(f"圖層 {layer_id} 沒有輸入")
+
+    def const(self, layer):
+        data = layer.find('data')
+        dtype = ELEMENT_TYPES[data.get('element_type')]
+        shape = [int(x) for x in data.get('shape').split(',')]
+        offset, size = int(data.get('offset')), int(data.get('size'))
+        return np.frombuffer(self.blob, dtype, size // np.dtype(dtype).itemsize, offset).reshape(shape)
+
+    def set_const(self, layer, array):
+        data = layer.find('data')
+        data.set('shape', ", ".join(str(d) for d in array.shape))
+        data.set('size', str(array.nbytes))
+        self.replaced[layer.get('id')] = array.tobytes()
+        set_port_dims(layer.find('output')[0], array.shape)
+
+    def add_layer(self, before, layer_type, name, version="opset1"):
+        lid = str(max(int(i) for i in self.layers) + 1)
+        layer = ET.Element('layer', {'id': lid, 'name': name, 'type': layer_type, 'version': version})
+        self.layers_el.insert(list(self.layers_el).index(before), layer)
+        self.layers[lid] = layer
+        return layer
+
+    def add_edge(self, from_layer, from_port, to_layer, to_port):
+        ET.SubElement(self.edges_el, 'edge', {'from-layer': from_layer.get('id'), 'from-port': str(from_port),
+                                              'to-layer': to_layer.get('id'), 'to-port': str(to_port)})
+
+    def save(self, xml_path, bin_path):
+        # 重新排 bin：每塊 Const 資料只寫一次 (共用同一塊的照舊共用)，換掉的寫新資料，用不到的丟掉
+        out = bytearray()
+        placed = {}
+        for lid, layer in self.layers.items():
+            data = layer.find('data')
+            if layer.get('type') != 'Const' or data is None or data.get('offset') is None: continue
+            if lid in self.replaced:
+                chunk, key = self.replaced[lid], ('new', lid)
+            else:
+                offset, size = int(data.get('offset')), int(data.get('size'))
+                chunk, key = self.blob[offset:offset + size], (offset, size)
+            if key not in placed:
+                placed[key] = len(out)
+                out += chunk
+            data.set('offset', str(placed[key]))
+        ET.indent(self.tree, "\t")
+        self.tree.write(xml_path, encoding="utf-8", xml_declaration=True)
+        with open(bin_path, 'wb') as f:
+            f.write(out)
+
+
+def port(layer, direction, index):
+    return layer.find(direction).findall('port')[index]
+
+
+def port_el(precision, dims, port_id, names=None):
+    p = ET.Element('port', {'id': str(port_id), 'precision': precision})
+    if names: p.set('names', names)
+    for d in dims:
+        ET.SubElement(p, 'dim').text = str(d)
+    return p
+
+
+def set_port_dims(p, dims):
+    for el, d in zip(p.findall('dim'), dims):
+        el.text = str(d)
+
+
+def set_channels(layer, n):
+    # 把所有 port 的第 2 維 (類別數) 改成 n
+    for group in ('input', 'output'):
+        ports = layer.find(group)
+        if ports is None: continue
+        for p in ports:
+            dims = p.findall('dim')
+            if len(dims) >= 2: dims[1].text = str(n)
+
+
+def find_head(ir):
+    """Result ← SoftMax ← Add(bias) ← Convolution(fc) 的分類頭；結構不同就報錯。"""
+    results = [l for l in ir.layers.values() if l.get('type') == 'Result']
+    if len(results) != 1: raise ValueError("模型必須只有一個輸出")
+    result = results[0]
+    softmax, _ = ir.producer(result.get('id'))
+    if softmax.get('type') != 'SoftMax': raise ValueError("輸出前一層不是 SoftMax")
+    add, _ = ir.producer(softmax.get('id'))
+    if add.get('type') != 'Add': raise ValueError("SoftMax 前一層不是加偏置 (Add)")
+    conv, _ = ir.producer(add.get('id'), 0)
+    bias, _ = ir.producer(add.get('id'), 1)
+    if conv.get('type') != 'Convolution' or bias.get('type') != 'Const':
+        raise ValueError("分類層不是 1x1 Convolution + 偏置")
+    weights, _ = ir.producer(conv.get('id'), 1)
+    return result, softmax, add, conv, bias, weights
+
+
+def non_dog_mask(n):
+    mask = np.ones(n, bool)
+    mask[DOG_CLASS_MIN:DOG_CLASS_MAX + 1] = False
+    return mask
+
+
+def slice_fc(ir, head):
+    # mean：fc7 只留狗品種那幾列，再加一列近似「其他」的 logit
+    result, softmax, add, conv, bias, weights = head
+    w = ir.const(weights).astype(np.float32)
+    b = ir.const(bias).astype(np.float32)
+    dtype = ir.const(weights).dtype
+    n = w.shape[0]
+    other = non_dog_mask(n)
+    w_new = np.concatenate([w[DOG_CLASS_MIN:DOG_CLASS_MAX + 1], w[other].mean(axis=0, keepdims=True)])
+    b_flat = b.reshape(-1)
+    b_new = np.append(b_flat[DOG_CLASS_MIN:DOG_CLASS_MAX + 1], b_flat[other].mean() + np.log(other.sum()))
+    k = len(DOG_HEAD_CLASSES)
+    ir.set_const(weights, w_new.astype(dtype))
+    ir.set_const(bias, b_new.reshape((1, k) + b.shape[2:]).astype(dtype))
+    set_port_dims(port(conv, 'input', 1), w_new.shape)
+    port(conv, 'output', 0).findall('dim')[1].text = str(k)
+    for layer in (add, softmax, result): set_channels(layer, k)
+
+
+def select_probs(ir, head):
+    # exact：SoftMax 之後接一個 1x1 卷積，權重是 0/1 選擇矩陣
+    result, softmax, add, conv, bias, weights = head
+    data = weights.find('data')
+    etype = data.get('element_type')
+    precision = PRECISIONS[etype]
+    out_port = port(softmax, 'output', 0)
+    n = int(out_port.findall('dim')[1].text)
+    k = len(DOG_HEAD_CLASSES)
+    sel = np.zeros((k, n, 1, 1), ELEMENT_TYPES[etype])
+    sel[np.arange(k - 1), np.arange(DOG_CLASS_MIN, DOG_CLASS_MAX + 1)] = 1
+    sel[k - 1, non_dog_mask(n)] = 1
+
+    # 輸出名稱留給新的最後一層，原本的 SoftMax 改名
+    name = softmax.get('name')
+    names = out_port.get('names')
+    softmax.set('name', name + "/full")
+    if names: out_port.set('names', name + "/full")
+
+    const = ir.add_layer(result, 'Const', name + "/dog_select")
+    ET.SubElement(const, 'data', {'element_type': etype, 'offset': "0", 'shape': "", 'size': "0"})
+    ET.SubElement(const, 'output').append(port_el(precision, sel.shape, 0))
+    ir.set_const(const, sel)
+
+    select = ir.add_layer(result, 'Convolution', name)
+    ET.SubElement(select, 'data', {'auto_pad': "explicit", 'dilations': "1, 1", 'pads_begin': "0, 0",
+                                   'pads_end': "0, 0", 'strides': "1, 1"})
+    inputs = ET.SubElement(select, 'input')
+    inputs.append(port_el(precision, (1, n, 1, 1), 0))
+    inputs.append(port_el(precision, sel.shape, 1))
+    ET.SubElement(select, 'output').append(port_el(precision, (1, k, 1, 1), 2, names))
+
+    _, edge = ir.producer(result.get('id'))
+    ir.edges_el.remove(edge)
+    ir.add_edge(softmax, out_port.get('id'), select, 0)
+    ir.add_edge(const, 0, select, 1)
+    ir.add_edge(select, 2, result, 0)
+    set_channels(result, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生只輸出狗品種 + 其他的縮減模型")
+    parser.add_argument("--xml", default="models/public/mobilenet-v2/FP16/mobilenet-v2.xml")
+    parser.add_argument("--bin", default=None, help="預設與 --xml 同名")
+    parser.add_argument("--out", default=None, help="輸出的 xml (預設 <原檔名>-dog.xml)")
+    parser.add_argument("--other", choices=("exact", "mean"), default="exact", help="「其他」的算法")
+    args = parser.parse_args()
+    stem = os.path.splitext(args.xml)[0]
+    bin_path = args.bin or stem + ".bin"
+    out_xml = args.out or stem + "-dog.xml"
+    out_bin = os.path.splitext(out_xml)[0] + ".bin"
+
+    ir = IR(args.xml, bin_path)
+    head = find_head(ir)
+    if args.other == "mean": slice_fc(ir, head)
+    else: select_probs(ir, head)
+    ir.save(out_xml, out_bin)
+    print(f"✅ 已輸出 {out_xml} ({os.path.getsize(out_bin) / 1e6:.2f} MB, 原本 {len(ir.blob) / 1e6:.2f} MB)")
+    print(f"   輸出 {len(DOG_HEAD_CLASSES)} 類 (118 個狗品種 + 其他)，app.py 設定 "
+          f"MODEL_NAME = \"{os.path.splitext(os.path.basename(out_xml))[0]}\"、BREED_HEAD = \"dog\"")
+
+
+if __name__ == '__main__':
+    main()
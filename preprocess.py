@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import threading
+import cv2
+import numpy as np
+
+
+class Preprocessor:
+    """
+    模型輸入前處理：n/c/h/w 在載入模型時算一次，之後每張畫面只做
+    一次 resize (寫進預先配置的暫存區) + 一次 HWC→NCHW 搬移 (直接寫進目標 buffer)。
+    單張 (即時迴圈) 與多張 (/analyze_photo) 共用同一段程式。
+    letterbox=True 時保持長寬比縮放，上下或左右補 pad 色 (不把狗壓扁)；
+    裁切 ROI 由呼叫端傳入 view (frame[y0:y1, x0:x1])，這裡不必知道。
+    """
+
+    def __init__(self, shape, dtype=np.uint8, letterbox=False, pad=127):
+        self.n, self.c, self.h, self.w = shape
+        self.dtype = dtype
+        self.letterbox = letterbox
+        self.pad = pad          # 補邊的灰階值；127 減掉模型內建的平均值後接近 0
+        # 每個執行緒各自一份暫存區，Flask 多執行緒呼叫也不會互相覆蓋
+        self._local = threading.local()
+
+    @classmethod
+    def from_network(cls, net, input_key=None):
+        # 必須在 load_network 之前呼叫：把輸入精度設成 U8，省掉 float 轉換與 USB 傳輸量
+        if input_key is None: input_key = next(iter(net.input_info))
+        info = net.input_info[input_key]
+        info.precision = "U8"
+        return cls(tuple(info.input_data.shape), np.uint8)
+
+    def _scratch(self):
+        resized = getattr(self._local, "resized", None)
+        if resized is None:
+            resized = np.empty((self.h, self.w, self.c), np.uint8)
+            self._local.resized = resized
+            self._local.buffers = {}
+            self._local.placed = None
+        return resized
+
+    def placement(self, width, height):
+        """寬 x 高的圖縮進模型輸入的位置 (x, y, w, h)；沒有 letterbox 時是整個輸入。"""
+        if not self.letterbox: return 0, 0, self.w, self.h
+        scale = min(self.w / width, self.h / height)
+        w = min(self.w, max(1, round(width * scale)))
+        h = min(self.h, max(1, round(height * scale)))
+        return (self.w - w) // 2, (self.h - h) // 2, w, h
+
+    def _resize(self, image):
+        resized = self._scratch()
+        x, y, w, h = placed = self.placement(image.shape[1], image.shape[0])
+        if placed != self._local.placed:
+            # 位置改變才重畫補邊；之後同樣大小的畫面只覆寫中間那塊
+            resized[:] = self.pad
+            self._local.placed = placed
+        cv2.resize(image, (w, h), dst=resized[y:y + h, x:x + w])
+        return resized
+
+    def buffer(self, batch=1):
+        # 取得 (此執行緒) 重複使用的 NCHW buffer；下一次同樣大小的呼叫會覆蓋它
+        self._scratch()
+        buf = self._local.buffers.get(batch)
+        if buf is None:
+            buf = np.empty((batch, self.c, self.h, self.w), self.dtype)
+            self._local.buffers[batch] = buf
+        return buf
+
+    def fill(self, image, out, index=0):
+        if image.ndim == 2: image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.shape[2] == 4: image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        resized = self._resize(image)
+        dst = out[index]
+        if dst.dtype == np.uint8:
+            # cv2.split 直接把三個通道寫進 NCHW 的三個平面
+            cv2.split(resized, [dst[ch] for ch in range(self.c)])
+        else:
+            np.copyto(dst, resized.transpose((2, 0, 1)), casting="unsafe")
+        return out
+
+    def __call__(self, image, out=None):
+        # out 可直接給 infer request 的輸入 blob，完全不經過中間陣列
+        if out is None: out = self.buffer(1)
+        return self.fill(image, out.reshape((-1, self.c, self.h, self.w)))
+
+    def batch(self, images):
+        out = self.buffer(len(images))
+        for i, image in enumerate(images):
+            self.fill(image, out, i)
+        return out
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# 模型前置處理：用本機的校正圖片把 MobileNet-V2 做訓練後 INT8 量化 (NNCF)，存成新的 IR
+# 用法: python3 quantize_model.py --images <校正圖片資料夾> [--precision FP32] [--name mobilenet-v2]
+#                                 [--subset 300] [--preset performance|mixed]
+# 需要另外安裝: pip install nncf  (OpenVINO 2023 起 POT 已停止維護，改用 NNCF 的 quantize)
+#
+# 預設讀 models/public/mobilenet-v2/FP32/mobilenet-v2.xml，輸出到 models/public/mobilenet-v2/INT8/。
+# 校正圖片挑 100~300 張實際攝影機拍到的畫面 (有狗、沒狗、不同光線)，不需要標註；
+# 前處理與推論時相同 (preprocess.Preprocessor：BGR、直接 resize，平均值與縮放已在 IR 裡)。
+# INT8 模型給只有 CPU 的電腦用 (NCS2 只跑 FP16)，app.py 設定 MODEL_PRECISION = "INT8"；
+# 量化後用 bench_precision.py 比較 FP32 / FP16 / INT8 的速度與結果一致率。
+import argparse
+import os
+import cv2
+import numpy as np
+
+from compare_heads import list_images
+from hardware import model_files
+from preprocess import Preprocessor
+
+MODEL_DIR = "models/public/mobilenet-v2"
+
+
+def calibration_images(folder, limit):
+    # 固定順序 (依路徑排序)，同一份資料夾每次量化結果相同
+    paths = sorted(path for path, _ in list_images(folder))
+    if limit and len(paths) > limit:
+        step = len(paths) / limit
+        paths = [paths[int(i * step)] for i in range(limit)]
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以校正圖片產生 INT8 量化模型")
+    parser.add_argument("--images", required=True, help="校正圖片資料夾 (可有子資料夾，不需要標註)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--name", default="mobilenet-v2", help="模型名稱 (例如縮減模型 mobilenet-v2-dog)")
+    parser.add_argument("--precision", default="FP32", help="量化來源的精度 (建議 FP32)")
+    parser.add_argument("--subset", type=int, default=300, help="最多使用幾張校正圖片")
+    parser.add_argument("--preset", choices=("performance", "mixed"), default="performance",
+                        help="performance = 對稱量化 (CPU 最快)；mixed = 激活值非對稱 (準確率較好)")
+    args = parser.parse_args()
+
+    try:
+        import nncf
+        from openvino.runtime import Core, serialize
+    except ImportError as e:
+        raise SystemExit(f"❌ 需要 OpenVINO 與 NNCF (pip install nncf): {e}")
+
+    src_xml, src_bin = model_files(args.model_dir, args.precision, args.name)
+    out_xml, out_bin = model_files(args.model_dir, "INT8", args.name)
+    paths = calibration_images(args.images, args.subset)
+    if not paths: raise SystemExit(f"{args.images} 裡沒有圖片")
+
+    model = Core().read_model(model=src_xml, weights=src_bin)
+    shape = tuple(model.input(0).get_shape())
+    pre = Preprocessor(shape, np.float32)
+
+    def transform(path):
+        image = cv2.imread(path)
+        if image is None: raise ValueError(f"無法讀取 {path}")
+        # 每次回傳新的陣列 (NNCF 可能先收集再一起推論)
+        return pre(image, out=np.empty(shape, np.float32))
+
+    print(f">>> 量化 {src_xml}，{len(paths)} 張校正圖片，preset={args.preset}")
+    preset = nncf.QuantizationPreset.PERFORMANCE if args.preset == "performance" else nncf.QuantizationPreset.MIXED
+    quantized = nncf.quantize(model, nncf.Dataset(paths, transform), preset=preset, subset_size=len(paths))
+
+    os.makedirs(os.path.dirname(out_xml), exist_ok=True)
+    serialize(quantized, out_xml, out_bin)
+    print(f"✅ 已輸出 {out_xml} ({os.path.getsize(out_bin) / 1e6:.2f} MB, 原本 {os.path.getsize(src_bin) / 1e6:.2f} MB)")
+    print(f"   app.py 設定 MODEL_PRECISION = \"INT8\" (推論裝置用 CPU)；"
+          f"比較: python3 bench_precision.py --images {args.images}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# 正式環境啟動方式：以 waitress (多執行緒 WSGI) 取代 Flask 開發伺服器
+# 用法: python3 serve.py [--host 0.0.0.0] [--port 5000]
+#
+# 只用單一行程：GPIO、攝影機、NCS2 都綁在這個行程裡，
+# 不能用多 worker 行程 (例如 gunicorn -w 4)，否則硬體會被初始化多次。
+import argparse
+from waitress import serve
+
+import app as feeder
+
+# 一般 API (/status、/set_system、/save_pet...) 額外保留的執行緒
+API_THREADS = 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智慧餵食器正式環境伺服器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    # 每條串流都會佔住一個執行緒，所以 worker 數 = 串流上限 + 上傳分析 + 一般 API
+    threads = (feeder.MAX_VIDEO_STREAMS + feeder.MAX_EVENT_STREAMS
+               + feeder.ANALYZE_MAX_PENDING + API_THREADS)
+
+    feeder.start_background()
+    print(f">>> waitress 啟動於 {args.host}:{args.port} ({threads} 個 worker 執行緒)")
+    serve(feeder.app, host=args.host, port=args.port, threads=threads,
+          channel_timeout=feeder.REQUEST_TIMEOUT,
+          connection_limit=threads * 2,
+          ident="smart-feeder")
+
+
+if __name__ == '__main__':
+    main()
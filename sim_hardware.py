@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# 模擬硬體：在一般 Linux 電腦上跑完整的偵測 + 餵食流程 (不需要樹莓派、HX711、NCS2)。
+# 用法：FEEDER_BACKEND=sim python3 app.py，或參考 sim_run.py。
+import threading
+import numpy as np
+import cv2
+
+import clock
+from hardware import Scale, Gate, Camera, Classifier, Backend
+from preprocess import Preprocessor
+
+
+class SimWorld:
+    """
+    餵食器的物理模型 (時間一律用 clock.monotonic，可倍速)：
+    - 閘門打開 open_delay 秒後才開始出料，每次開門的流速有 flow_jitter 的隨機變化
+    - 卡在閘門上的一小撮飼料 (gate_drop_kg) 在開門瞬間落下
+    - 飼料從閘門到碗要 fall_time 秒，關門後還會繼續落一點 (空中落料量)
+    """
+
+    def __init__(self, flow_rate=0.05, flow_jitter=0.1, open_delay=0.15, fall_time=0.3,
+                 gate_drop_kg=0.002, bowl_kg=0.0, tare_kg=0.01, seed=None):
+        self.flow_rate = flow_rate
+        self.flow_jitter = flow_jitter
+        self.open_delay = open_delay
+        self.fall_time = fall_time
+        self.gate_drop_kg = gate_drop_kg
+        self.tare_kg = tare_kg
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._base = bowl_kg          # 已經落定的重量
+        self._pulses = []             # [開始出料時間, 停止出料時間 (None=還開著), 流速]
+        self._drops = []              # (落地時間, kg)
+        self.gate_open = False
+
+    def set_gate(self, is_open, now=None):
+        if now is None: now = clock.monotonic()
+        with self._lock:
+            if is_open and not self.gate_open:
+                rate = self.flow_rate * max(0.0, 1.0 + self.rng.normal(0, self.flow_jitter))
+                self._pulses.append([now + self.open_delay, None, rate])
+                if self.gate_drop_kg > 0: self._drops.append((now + self.fall_time, self.gate_drop_kg))
+            elif not is_open and self.gate_open and self._pulses:
+                self._pulses[-1][1] = max(now, self._pulses[-1][0])
+            self.gate_open = is_open
+
+    def eat(self, kg):
+        """模擬狗吃掉 kg (重量不會小於 0)。"""
+        with self._lock:
+            self._base = max(0.0, self._base - kg)
+
+    def bowl_kg(self, now=None):
+        if now is None: now = clock.monotonic()
+        with self._lock:
+            landed_until = now - self.fall_time
+            total = self._base
+            keep = []
+            for p in self._pulses:
+                start, end, rate = p
+                stop = landed_until if end is None else min(end, landed_until)
+                if stop > start: total += (stop - start) * rate
+                # 已全部落地的出料併進 _base，避免清單越來越長
+                if end is not None and end <= landed_until: self._base += (end - start) * rate
+                else: keep.append(p)
+            self._pulses = keep
+            drops = []
+            for t, kg in self._drops:
+                if t <= now:
+                    total += kg
+                    self._base += kg
+                else: drops.append((t, kg))
+            self._drops = drops
+            return total
+
+    def falling(self, now=None):
+        # 是否有飼料正在落下 (碗會震動，秤的雜訊變大)
+        if now is None: now = clock.monotonic()
+        with self._lock:
+            return self.gate_open or any(e is not None and now - e < self.fall_time
+                                         for _, e, _ in self._pulses)
+
+
+class SimScale(Scale):
+    """模擬 HX711：固定取樣率，輸出原始讀數 = 零點 + (碗+紙盒) x 校正因子 + 雜訊。"""
+
+    def __init__(self, world, zero_offset, factor, sps=80, noise_kg=0.0008,
+                 impact_noise_kg=0.004, spike_prob=0.002, seed=None):
+        self.world = world
+        self.rng = np.random.default_rng(seed)
+        self.zero_offset = zero_offset
+        self.factor = factor
+        self.period = 1.0 / sps
+        self.noise_kg = noise_kg
+        self.impact_noise_kg = impact_noise_kg
+        self.spike_prob = spike_prob
+        self._next = clock.monotonic()
+
+    def read_long(self):
+        self._next += self.period
+        now = clock.monotonic()
+        if self._next > now: clock.sleep(self._next - now)
+        else: self._next = now   # 落後太多就不補
+        w = self.world
+        kg = w.bowl_kg() + w.tare_kg
+        kg += self.rng.normal(0, self.impact_noise_kg if w.falling() else self.noise_kg)
+        # 偶發的單點突波 (與實機 HX711 的讀取錯誤類似)
+        if self.rng.random() < self.spike_prob: kg += self.rng.choice((-1, 1)) * 0.5
+        return int(self.zero_offset + kg * self.factor)
+
+
+class SimGate(Gate):
+    def __init__(self, world):
+        self.world = world
+
+    def open(self):
+        self.world.set_gate(True)
+
+    def close(self):
+        self.world.set_gate(False)
+
+
+class SimScene:
+    """
+    訪客時間表：每 period 秒循環一次，schedule 為 [(開始秒, 持續秒, 品種ID), ...]。
+    攝影機依此畫出「狗」，分類器依此回答，兩者看到的是同一個場景。
+    """
+
+    def __init__(self, schedule=((5.0, 20.0, 207),), period=90.0):
+        self.schedule = list(schedule)
+        self.period = period
+        self.t0 = clock.monotonic()
+
+    def visitor(self, now=None):
+        if now is None: now = clock.monotonic()
+        t = (now - self.t0) % self.period
+        for start, duration, breed_id in self.schedule:
+            if start <= t < start + duration: return breed_id
+        return None
+
+
+class ReplayCamera(Camera):
+    """
+    重播影片檔 (播完從頭開始)；沒有影片時產生合成畫面：
+    灰色背景，有訪客時畫一個會移動的方塊，讓動態閘門有東西可以偵測。
+    以 clock 控制張數，倍速時每秒真實時間會產生更多張。
+    """
+
+    def __init__(self, scene, path=None, fps=30, size=(640, 480)):
+        self.scene = scene
+        self.path = path
+        self.period = 1.0 / fps
+        self.size = size
+        self.cap = cv2.VideoCapture(path) if path else None
+        self._next = clock.monotonic()
+        self._bg = np.full((size[1], size[0], 3), 90, np.uint8)
+
+    def read(self, out=None):
+        self._next += self.period
+        now = clock.monotonic()
+        if self._next > now: clock.sleep(self._next - now)
+        else: self._next = now
+        if self.cap is not None:
+            ret, frame = self.cap.read(out) if out is not None else self.cap.read()
+            if not ret:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read()
+            return ret, frame
+        # 合成畫面 (原本的畫面會被 app 上下左右翻轉，這裡不用管方向)
+        frame = out if out is not None and out.shape == self._bg.shape else np.empty_like(self._bg)
+        np.copyto(frame, self._bg)
+        if self.scene.visitor(now) is not None:
+            w, h = self.size
+            x = int((np.sin(now * 1.3) * 0.3 + 0.5) * (w - 160))
+            cv2.rectangle(frame, (x, h // 3), (x + 160, h // 3 + 140), (20, 35, 60), -1)
+        return True, frame
+
+    def release(self):
+        if self.cap is not None: self.cap.release()
+
+
+class _Blob:
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+
+class CannedRequest:
+    """模擬 OpenVINO InferRequest：固定延遲後依 SimScene 產生 softmax 輸出。"""
+
+    def __init__(self, net, input_shape, num_classes):
+        self.net = net
+        self.input_blobs = {net.input_name: _Blob(np.zeros(input_shape, np.uint8))}
+        self.output_blobs = {net.output_name: _Blob(np.zeros((1, num_classes), np.float32))}
+        self._callback = None
+        self._data = None
+
+    def set_completion_callback(self, py_callback, py_data=None):
+        self._callback = py_callback
+        self._data = py_data
+
+    def _fill(self):
+        self.net.fill_output(self.output_blobs[self.net.output_name].buffer[0])
+
+    def infer(self):
+        clock.sleep(self.net.latency())
+        self._fill()
+        if self._callback: self._callback(0, self._data)
+
+    def async_infer(self):
+        def done():
+            self._fill()
+            if self._callback: self._callback(0, self._data)
+        t = threading.Timer(clock.real(self.net.latency()), done)
+        t.daemon = True
+        t.start()
+
+
+class CannedExecNet:
+    """模擬 ExecutableNetwork：requests[] + start_async()，與 AsyncInferenceEngine 相容。"""
+
+    def __init__(self, scene, num_requests=2, latency=0.03, latency_jitter=0.005,
+                 confidence=0.9, background_class=0, num_classes=1000,
+                 input_shape=(1, 3, 224, 224), seed=None):
+        self.scene = scene
+        self.latency_mean = latency
+        self.latency_jitter = latency_jitter
+        self.confidence = confidence
+        self.background_class = background_class
+        self.input_name = "data"
+        self.output_name = "prob"
+        self.rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = [CannedRequest(self, input_shape, num_classes) for _ in range(num_requests)]
+        self.unplugged = False      # 模擬 NCS2 被拔掉：之後的 start_async 都會失敗
+
+    def latency(self):
+        with self._rng_lock:
+            return max(0.0, self.rng.normal(self.latency_mean, self.latency_jitter))
+
+    def fill_output(self, out):
+        breed_id = self.scene.visitor()
+        cid = self.background_class if breed_id is None else breed_id
+        with self._rng_lock:
+            conf = min(1.0, max(0.0, self.confidence + self.rng.normal(0, 0.05)))
+        out.fill((1.0 - conf) / (len(out) - 1))
+        out[cid] = conf
+
+    def start_async(self, request_id, inputs=None):
+        if self.unplugged: raise RuntimeError("Failed to queue inference: device lost")
+        self.requests[request_id].async_infer()
+
+
+class SimClassifier(Classifier):
+    """裝置列舉與載入都交給 SimBackend (它記得哪些 NCS2 被拔掉)。"""
+
+    def __init__(self, backend, input_shape=(1, 3, 224, 224), num_outputs=1000):
+        self.backend = backend
+        self.input_blob = "data"
+        self.out_blob = "prob"
+        self.num_outputs = num_outputs
+        self.preprocessor = Preprocessor(input_shape, np.uint8)
+
+    def available_devices(self):
+        return self.backend.available_devices()
+
+    def load(self, device, num_requests):
+        return self.backend._load(device, num_requests)
+
+
+class SimBackend(Backend):
+    """
+    模擬後端。speed > 1 時整條流程 (取樣、出料、穩定、冷卻、推論延遲) 依倍速加快，
+    可拿來做回歸測試與效能量測。sticks 支模擬 NCS2 (延遲 infer_latency) 加上 CPU (延遲 cpu_latency)。
+    """
+    name = "sim"
+
+    def __init__(self, zero_offset, factor, speed=1.0, video=None, schedule=None,
+                 period=90.0, infer_latency=0.03, cpu_latency=0.08, sticks=1, load_time=1.0,
+                 seed=None, **world_args):
+        if speed != 1.0: clock.set_speed(speed)
+        self.zero_offset = zero_offset
+        self.factor = factor
+        self.video = video
+        self.infer_latency = infer_latency
+        self.cpu_latency = cpu_latency
+        self.load_time = load_time          # 模擬模型編譯 / 載入到裝置的時間
+        self.sticks = [f"MYRIAD.1.{i + 1}-ma2480" for i in range(sticks)]
+        self.unplugged = set()
+        self._exec_nets = []                # [(裝置名稱, CannedExecNet)]
+        self.world = SimWorld(seed=seed, **world_args)
+        self.scene = SimScene(schedule, period) if schedule else SimScene(period=period)
+
+    def scale(self):
+        return SimScale(self.world, self.zero_offset, self.factor)
+
+    def gate(self):
+        return SimGate(self.world)
+
+    def camera(self):
+        return ReplayCamera(self.scene, path=self.video)
+
+    def available_devices(self):
+        return ["CPU"] + [d for d in self.sticks if d not in self.unplugged]
+
+    def _load(self, device, num_requests):
+        clock.sleep(self.load_time)
+        if device not in self.available_devices():
+            raise RuntimeError(f"Can not init Myriad device: NC_ERROR ({device})")
+        latency = self.cpu_latency if device == "CPU" else self.infer_latency
+        net = CannedExecNet(self.scene, num_requests=num_requests, latency=latency)
+        self._exec_nets.append((device, net))
+        return net
+
+    def classifier(self, model_xml=None, model_bin=None, device="MYRIAD", num_requests=2, cache_dir=None,
+                   fallback=None, cpu_requests=1):
+        classifier = SimClassifier(self)
+        classifier.open(device, num_requests, cpu_requests, fallback)
+        return classifier
+
+    def unplug(self, seconds, sticks=None):
+        """模擬 NCS2 (預設全部) 被拔掉 seconds 秒後再插回 (測試自動重連與退回 CPU)。"""
+        sticks = set(sticks or self.sticks)
+        self.unplugged |= sticks
+        for name, net in self._exec_nets:
+            if name in sticks: net.unplugged = True
+        def replug(): self.unplugged -= sticks
+        t = threading.Timer(clock.real(seconds), replug)
+        t.daemon = True
+        t.start()
+
+    def cleanup(self):
+        pass
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# 模擬硬體的回歸 / 效能測試：在一般電腦上以倍速跑完整的「偵測 → 排程 → 出料 → 穩定」流程
+# 用法: python3 sim_run.py [--speed 10] [--feeds 5] [--target 0.2]
+# 所有輸出檔 (資料庫、流速模型、紀錄) 都寫在暫存資料夾，不會動到正式的 feeder.db
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智慧餵食器模擬測試")
+    parser.add_argument("--speed", type=float, default=10.0, help="倍速")
+    parser.add_argument("--feeds", type=int, default=5, help="跑幾次餵食後結束")
+    parser.add_argument("--target", type=float, default=0.2, help="寵物目標食量 (kg)")
+    parser.add_argument("--breed", type=int, default=207, help="模擬訪客的品種 ID")
+    parser.add_argument("--video", default=None, help="重播的影片檔 (預設用合成畫面)")
+    parser.add_argument("--sticks", type=int, default=1, help="模擬插著幾支 NCS2 (0 = 只有 CPU)")
+    parser.add_argument("--device", default=None, help="推論裝置，例如 MYRIAD,CPU (預設同 app.py)")
+    parser.add_argument("--unplug", type=float, default=0.0,
+                        help="第一次餵食後模擬 NCS2 被拔掉幾秒 (測試自動重連)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="最長真實秒數")
+    args = parser.parse_args()
+
+    os.environ["FEEDER_BACKEND"] = "sim"
+    os.environ["FEEDER_SIM_SPEED"] = str(args.speed)
+    os.environ["FEEDER_SIM_STICKS"] = str(args.sticks)
+    if args.device: os.environ["FEEDER_INFER_DEVICE"] = args.device
+    if args.video: os.environ["FEEDER_SIM_VIDEO"] = os.path.abspath(args.video)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="feeder_sim_"))
+
+    import clock
+    import feed_scheduler
+    import app as feeder
+
+    feeder.pets.save("模擬狗", args.target / feeder.FEED_RATIO, args.target, args.breed, "sim")
+    feeder.start_background()
+    feeder.system_running = True
+
+    real_t0 = time.monotonic()
+    sim_t0 = clock.monotonic()
+    seen = set()
+    results = []
+    while len(results) < args.feeds and time.monotonic() - real_t0 < args.timeout:
+        time.sleep(0.05)
+        for job in feeder.feeder.jobs()['jobs']:
+            if job['id'] in seen or job['state'] not in feed_scheduler.FINISHED_STATES: continue
+            seen.add(job['id'])
+            results.append(job)
+            print(f">>> [模擬] 工作 #{job['id']} {job['state']}: 目標 {job['target']:.3f} kg, "
+                  f"最終 {job['final_weight']} kg, 用時 {job['finished'] - job['started']:.1f} 秒 (模擬時間)")
+            # 狗把碗吃乾淨，下次來訪才會再觸發餵食
+            feeder.hw.world.eat(job['final_weight'] or 0.0)
+            if args.unplug > 0 and len(results) == 1:
+                print(f">>> [模擬] 拔掉 NCS2 {args.unplug:g} 秒")
+                feeder.hw.unplug(args.unplug)
+
+    real = time.monotonic() - real_t0
+    sim = clock.monotonic() - sim_t0
+    print("=" * 60)
+    print(f"完成 {len(results)} 次餵食，模擬 {sim:.0f} 秒 / 真實 {real:.1f} 秒 (實際倍速 x{sim / real:.1f})")
+    done = [j for j in results if j['state'] == feed_scheduler.DONE]
+    if done:
+        errors = [abs(j['final_weight'] - j['target']) * 1000 for j in done]
+        print(f"誤差 平均 {sum(errors) / len(errors):.1f} g, 最大 {max(errors):.1f} g")
+    print(f"流速模型: {feeder.flow_model.to_dict()}")
+    print(f"啟動狀態: {feeder.readiness}")
+    if feeder.infer_engine: print(f"推論: {feeder.infer_engine.stats()}")
+    print(f"動態閘門: {feeder.motion_gate.stats()}")
+    print(f"推論 ROI: {feeder.infer_roi.stats()}")
+    return 0 if len(done) == args.feeds else 1
+
+
+if __name__ == '__main__':
+    code = main()
+    # 取樣、攝影機等背景執行緒不會自己結束，直接結束行程
+    sys.stdout.flush()
+    os._exit(code)
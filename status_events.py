@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+
+class StatusHub:
+    """
+    狀態推播中心：單一背景執行緒定時取狀態快照，跟上一次比對，
+    有變動的欄位才記下新版本號並喚醒所有 /events 訂閱者。
+    throttle 可限制個別欄位的最短推送間隔 (例如重量)。
+    """
+
+    def __init__(self, snapshot_fn, interval=0.1, throttle=None):
+        self.snapshot_fn = snapshot_fn
+        self.interval = interval
+        self.throttle = throttle or {}
+        self._cond = threading.Condition()
+        self._state = {}
+        self._field_version = {}
+        self._version = 0
+        self._last_push = {}
+
+    def start(self):
+        t = threading.Thread(target=self._run)
+        t.daemon = True
+        t.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ 狀態推播錯誤: {e}")
+            time.sleep(self.interval)
+
+    def poll(self):
+        snap = self.snapshot_fn()
+        now = time.monotonic()
+        changed = {}
+        for k, v in snap.items():
+            if k in self._state and self._state[k] == v: continue
+            limit = self.throttle.get(k)
+            if limit and now - self._last_push.get(k, 0.0) < limit: continue
+            changed[k] = v
+        if not changed: return
+        with self._cond:
+            self._version += 1
+            for k, v in changed.items():
+                self._state[k] = v
+                self._field_version[k] = self._version
+                self._last_push[k] = now
+            self._cond.notify_all()
+
+    def wait_changes(self, since_version, timeout=15.0):
+        """
+        等待比 since_version 新的變動，回傳 (目前版本, {變動欄位: 值})。
+        since_version=0 會拿到完整狀態；逾時回傳空 dict (讓呼叫端送 keepalive)。
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > since_version, timeout)
+            changed = {k: self._state[k] for k, ver in self._field_version.items()
+                       if ver > since_version}
+            return self._version, changed
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# 非同步推論引擎：infer_batch 逾時時還在跑的 request 要等做完才歸還；close() 之後拒絕借用
+import time
+
+import numpy as np
+import pytest
+
+from async_infer import AsyncInferenceEngine
+from sim_hardware import CannedExecNet, SimScene
+
+
+def make_engine(latency, num_requests=2):
+    net = CannedExecNet(SimScene(schedule=()), num_requests=num_requests, latency=latency,
+                        latency_jitter=0.0, seed=0)
+    engine = AsyncInferenceEngine(net, "data", "prob", preprocess=lambda image, out: out,
+                                  on_result=lambda probs, meta: None, num_requests=num_requests)
+    return engine
+
+
+def wait_idle(engine, n, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while engine._idle.qsize() < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return engine._idle.qsize()
+
+
+def test_batch_timeout_keeps_running_requests_out_until_done():
+    engine = make_engine(latency=0.3)
+    images = [np.zeros((8, 8, 3), np.uint8)] * 2
+    with pytest.raises(TimeoutError):
+        engine.infer_batch(images, timeout=0.05)
+    # 兩個 request 都還在跑：不能借給別人 (輸出會被完成時覆寫)
+    assert engine._idle.qsize() == 0
+    # 做完後由完成回呼歸還
+    assert wait_idle(engine, 2) == 2
+    assert engine._waiters == {}
+    # 歸還後照常可用
+    assert len(engine.infer_batch(images, timeout=2.0)) == 2
+    engine.close()
+
+
+def test_batch_returns_requests():
+    engine = make_engine(latency=0.01)
+    results = engine.infer_batch([np.zeros((8, 8, 3), np.uint8)] * 5, timeout=2.0)
+    assert len(results) == 5 and all(r.shape == (1000,) for r in results)
+    assert wait_idle(engine, 2) == 2
+    engine.close()
+
+
+def test_close_rejects_borrowers():
+    engine = make_engine(latency=0.01)
+    engine.close()
+    time.sleep(0.05)
+    # 哨兵一直留在空閒佇列裡：每個借用者都會被拒絕，不會拿 -1 去用
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            engine.infer_sync(np.zeros((8, 8, 3), np.uint8))
+        with pytest.raises(RuntimeError):
+            engine.infer_batch([np.zeros((8, 8, 3), np.uint8)], timeout=1.0)
+    assert -1 in engine._idle.queue
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# 餵食歷史：寫入 → 查詢的來回 (每日統計、最近紀錄、重量曲線)，以及曲線降頻
+import time
+
+import numpy as np
+import pytest
+
+from feed_log import FeedLog, CurveRecorder, day_of
+
+NOW = time.mktime((2026, 10, 18, 12, 0, 0, 0, 0, -1))      # 當地時間中午，前後幾小時都在同一天
+DAY = 86400
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = FeedLog(str(tmp_path / "feeder.db"))
+    yield log
+    log.close()
+
+
+def add(log, started, breed_id, start_weight, final_weight, curve=None, pet="Lucky"):
+    log.record(started, pet, breed_id, "done", 0.2, start_weight, final_weight,
+               pulses=2, duration=12.5, curve=curve, curve_dt=0.2)
+
+
+def test_last_feeds_round_trip(log):
+    add(log, NOW - 3600, 207, 0.05, 0.20)
+    add(log, NOW - 60, 208, 0.00, 0.10, pet="Max")
+    add(log, NOW, 207, 0.10, 0.19)
+    assert log.flush() == 3 and log.written == 3
+
+    rows = log.last_feeds(10)
+    assert [r['id'] for r in rows] == [3, 2, 1]
+    first = rows[2]
+    assert first['pet'] == "Lucky" and first['breed_id'] == 207 and first['result'] == "done"
+    assert first['started'] == NOW - 3600 and first['day'] == day_of(NOW)
+    assert first['delivered'] == pytest.approx(0.15)
+    assert first['pulses'] == 2 and first['duration'] == 12.5
+
+    assert [r['id'] for r in log.last_feeds(10, breed_id=207)] == [3, 1]
+    assert [r['id'] for r in log.last_feeds(1)] == [3]
+    assert log.last_feeds(10, breed_id=999) == []
+
+
+def test_daily_totals(log):
+    add(log, NOW, 207, 0.0, 0.2)
+    add(log, NOW - 3600, 207, 0.1, 0.2)
+    add(log, NOW - 3600, 208, 0.0, 0.05)
+    add(log, NOW - DAY, 207, 0.0, 0.3)
+    add(log, NOW - 40 * DAY, 207, 0.0, 0.3)     # 超過 30 天，不計
+    log.flush()
+
+    today, yesterday = day_of(NOW), day_of(NOW - DAY)
+    assert log.daily_totals(207, now=NOW) == [
+        {'day': today, 'feeds': 2, 'delivered': 0.3},
+        {'day': yesterday, 'feeds': 1, 'delivered': 0.3},
+    ]
+    assert log.daily_totals(None, now=NOW)[0] == {'day': today, 'feeds': 3, 'delivered': 0.35}
+    assert [d['day'] for d in log.daily_totals(207, days=1, now=NOW)] == [today]
+
+
+def test_curve_round_trip(log):
+    curve = np.linspace(0.0, 0.2, 50, dtype=np.float32)
+    add(log, NOW, 207, 0.0, 0.2, curve=curve)
+    add(log, NOW, 208, 0.0, 0.1)                  # 沒有曲線
+    log.flush()
+    dt, data = log.curve(1)
+    assert dt == 0.2 and data.dtype == np.float32
+    assert np.array_equal(data, curve)
+    assert log.curve(2) is None
+
+
+def test_background_writer(log):
+    log.flush_interval = 0.05
+    log.start()
+    add(log, NOW, 207, 0.0, 0.2)
+    deadline = time.monotonic() + 2.0
+    while log.written < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r['id'] for r in log.last_feeds()] == [1]
+
+
+def test_curve_recorder_buckets():
+    rec = CurveRecorder(dt=0.2)
+    rec.add(0.0, 1.0)                 # 沒在錄：忽略
+    rec.start(now=0.0)
+    for t, kg in ((0.05, 1.0), (0.1, 3.0), (0.25, 5.0), (0.9, 7.0)):
+        rec.add(t, kg)
+    # 0~0.2 平均 2；0.2~0.4 只有 5；中間空的區間不補點；最後一桶在 stop() 收成
+    assert rec.stop().tolist() == [2.0, 5.0, 7.0]
+    assert len(rec.stop()) == 0
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# 餵食排程器：工作狀態轉換、取消、冷卻與頻率上限
+import threading
+import time
+
+from feed_scheduler import FeedScheduler, QUEUED, DISPENSING, DONE, ABORTED
+
+
+def wait_until(pred, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        if time.monotonic() > deadline: return False
+        time.sleep(0.005)
+    return True
+
+
+class Runner:
+    """run_job：標成出料中，等測試放行 (或被取消) 才結束。"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+
+    def __call__(self, job):
+        job.state = DISPENSING
+        self.started.append(job.id)
+        while not self.release.wait(0.01):
+            if job.cancelled: return
+
+
+def make(runner, **kwargs):
+    s = FeedScheduler(runner, **kwargs)
+    s.start()
+    return s
+
+
+def test_done_then_cooldown_then_accepts_again():
+    ended = []
+    runner = Runner()
+    s = make(runner, cooldown=0.2, on_cooldown_end=ended.append)
+    job, why = s.submit("Lucky", 207, 0.2)
+    assert why is None and job.state in (QUEUED, DISPENSING)
+    assert s.submit("Lucky", 207, 0.2) == (None, "已在餵食佇列中")
+    assert wait_until(lambda: job.state == DISPENSING) and s.busy
+    runner.release.set()
+    assert wait_until(lambda: job.state == DONE)
+    assert wait_until(lambda: not s.busy)
+    # 冷卻中拒絕，其他寵物不受影響
+    assert wait_until(lambda: s.cooldown_left(207) > 0)
+    _, why = s.submit("Lucky", 207, 0.2)
+    assert why.startswith("冷卻中")
+    other, why = s.submit("Max", 208, 0.1)
+    assert other is not None
+    assert wait_until(lambda: 207 in ended)
+    again, why = s.submit("Lucky", 207, 0.2)
+    assert again is not None and again.id != job.id
+
+
+def test_cancel_queued_job_skips_cooldown():
+    runner = Runner()
+    s = make(runner, cooldown=60)
+    first, _ = s.submit("Lucky", 207, 0.2)
+    queued, _ = s.submit("Max", 208, 0.1)
+    assert wait_until(lambda: first.state == DISPENSING)
+    assert s.cancel(queued.id, "不要了")
+    runner.release.set()
+    assert wait_until(lambda: queued.state == ABORTED and queued.finished is not None)
+    assert queued.started is None and queued.reason == "不要了"
+    assert 208 not in runner.started
+    # 還沒開始就取消：不進冷卻，可以馬上再送
+    assert wait_until(lambda: s.submit("Max", 208, 0.1)[0] is not None)
+    assert s.cooldown_left(207) > 0
+
+
+def test_cancel_running_job_aborts_and_cools_down():
+    runner = Runner()
+    s = make(runner, cooldown=60)
+    job, _ = s.submit("Lucky", 207, 0.2)
+    assert wait_until(lambda: job.state == DISPENSING)
+    assert s.cancel_all("手動停止") == 1
+    assert wait_until(lambda: job.state == ABORTED)
+    assert job.reason == "手動停止"
+    assert wait_until(lambda: s.cooldown_left(207) > 0)
+    # 已結束的工作不能再取消，原因不會被改掉
+    job.cancel("再取消一次")
+    assert job.reason == "手動停止"
+    assert not s.cancel(job.id)
+
+
+def test_run_job_error_aborts():
+    def boom(job):
+        raise RuntimeError("閘門卡住")
+    s = make(boom, cooldown=60)
+    job, _ = s.submit("Lucky", 207, 0.2)
+    assert wait_until(lambda: job.state == ABORTED)
+    assert job.reason == "閘門卡住"
+
+
+def test_hourly_limit_and_full_queue():
+    runner = Runner()
+    runner.release.set()
+    s = make(runner, cooldown=0.0, max_per_hour=2)
+    for _ in range(2):
+        job, _ = s.submit("Lucky", 207, 0.2)
+        assert wait_until(lambda: job.state == DONE)
+        assert wait_until(lambda: 207 not in s._cooling)
+    assert s.submit("Lucky", 207, 0.2) == (None, "已達每小時 2 次上限")
+
+    # 工作執行緒沒啟動：佇列滿了就拒絕
+    s = FeedScheduler(runner, max_queue=1)
+    assert s.submit("Lucky", 207, 0.2)[0] is not None
+    assert s.submit("Max", 208, 0.1) == (None, "餵食佇列已滿")
+    assert [j['state'] for j in s.jobs()['jobs']] == [QUEUED]
+
+
+def test_cancelled_queued_job_not_counted_hourly():
+    runner = Runner()
+    s = make(runner, cooldown=0.0, max_per_hour=1)
+    first, _ = s.submit("Lucky", 207, 0.2)
+    queued, _ = s.submit("Max", 208, 0.1)
+    assert wait_until(lambda: first.state == DISPENSING)
+    assert s.cancel(queued.id)
+    runner.release.set()
+    assert wait_until(lambda: queued.state == ABORTED and first.state == DONE)
+    # 排隊中就取消的那次沒出料，不佔每小時的額度；真的出料過的有
+    assert wait_until(lambda: s.submit("Max", 208, 0.1)[0] is not None)
+    assert wait_until(lambda: 207 not in s._cooling)
+    assert s.submit("Lucky", 207, 0.2) == (None, "已達每小時 1 次上限")
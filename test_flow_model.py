@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# 出料模型：模擬世界閉迴路不超量、收斂後 ≤2 次出料；RLS 的防呆範圍
+import numpy as np
+import pytest
+
+from flow_model import FlowRateModel
+from sim_hardware import SimWorld
+
+TARGET = 0.2
+DONE = 0.005        # 與 app.py 餵食迴圈相同：缺量 <= 5 g 算達標
+
+
+def feed_loop(world, model, rng, feeds, t=0.0):
+    # app.py 餵食迴圈的簡化版：等秤穩定 → 算開門時間 → 開關閘門 → 量實際落下多少 → 學習
+    results = []
+    for _ in range(feeds):
+        world.eat(1.0)
+        pulses = 0
+        while True:
+            t += 10
+            bowl = world.bowl_kg(t) + rng.normal(0, 0.0008)
+            missing = TARGET - bowl
+            if missing <= DONE: break
+            d = model.duration_for(missing)
+            world.set_gate(True, t)
+            world.set_gate(False, t + d)
+            t += d + 5
+            after = world.bowl_kg(t) + rng.normal(0, 0.0008)
+            model.update(d, after - bowl)
+            pulses += 1
+        results.append((pulses, bowl - TARGET))
+    return results
+
+
+def test_no_overshoot_and_two_pulses_after_warmup():
+    # 流速抖動 3% 的出料器；前 3 次是暖機 (模型從預設流速開始學)
+    for seed in (0, 1):
+        world = SimWorld(seed=seed, flow_jitter=0.03)
+        model = FlowRateModel(rate=0.05)
+        results = feed_loop(world, model, np.random.default_rng(seed + 100), feeds=25)
+        for pulses, error in results[3:]:
+            assert error <= DONE
+            assert 1 <= pulses <= 2
+        # 模擬世界開門延遲 0.15 秒、沒有閘門外的落料：截距學成開門延遲，不是負的落料
+        assert model.lag_kg >= 0
+        assert 0.1 <= model.open_delay <= 0.2
+
+
+def test_undershoots_while_unsure():
+    model = FlowRateModel(rate=0.05)
+    d = model.duration_for(0.2)
+    # 沒學過：先驗流速 ±100%，只瞄準缺量的一半 (min_aim)
+    assert abs(model.predict(d) - 0.1) < 1e-9
+    for _ in range(30):
+        model.update(d, model.predict(d))
+    # 學了幾次、沒有殘差：不確定度剩量測雜訊與流速抖動，瞄得比較近
+    assert model.std(d) < 0.02
+    assert model.predict(model.duration_for(0.2)) > model.predict(d)
+
+
+def test_clamps():
+    model = FlowRateModel(rate=0.05)
+    # 每次都比預期少很多 (但在 0.2 倍以上，會學)：截距壓在開門延遲上限，流速不低於預設的 0.2 倍
+    for _ in range(200):
+        d = 2.0
+        model.update(d, model.predict(d) * 0.25)
+    assert model.rate >= 0.2 * 0.05
+    assert model.lag_kg == 0.0
+    assert model.open_delay <= FlowRateModel.MAX_OPEN_DELAY + 1e-9
+
+    model = FlowRateModel(rate=0.05)
+    # 短開門卻出很多：落料不超過 30 g，流速不超過預設的 5 倍
+    for _ in range(200):
+        model.update(0.2, min(model.predict(0.2) * 4, 0.2))
+    assert model.lag_kg <= FlowRateModel.MAX_LAG_KG
+    assert model.rate <= 5 * 0.05
+    assert model.open_delay == 0.0
+
+    # 建構時給負的 lag_kg 也會被擋掉
+    assert FlowRateModel(rate=0.05, lag_kg=-0.01).lag_kg == 0.0
+
+
+def test_rejects_outliers():
+    model = FlowRateModel(rate=0.05)
+    before = model.to_dict()
+    assert not model.update(2.0, 0.0)          # 飼料桶空了
+    assert not model.update(2.0, 1.0)          # 狗在吃 / 量測錯
+    assert model.rate == before['rate'] and model.updates == 0
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "flow.json")
+    model = FlowRateModel(rate=0.05, path=path)
+    world = SimWorld(seed=3, flow_jitter=0.03)
+    feed_loop(world, model, np.random.default_rng(3), feeds=5)
+    model.save()
+    loaded = FlowRateModel(rate=0.05, path=path)
+    assert loaded.rate == model.rate
+    assert abs(loaded.open_delay - model.open_delay) < 1e-12
+    assert loaded.lag_kg == model.lag_kg
+    assert abs(loaded.jitter_var - model.jitter_var) < 1e-12
+
+
+def test_load_old_file_with_negative_lag(tmp_path):
+    # 舊版存檔沒有 open_delay，lag_kg 可能學成負的：讀進來變成開門延遲
+    path = tmp_path / "flow.json"
+    path.write_text('{"rate": 0.05, "lag_kg": -0.005, "P": [[1e-6, 0], [0, 1e-6]], "updates": 10}')
+    model = FlowRateModel(rate=0.05, path=str(path))
+    assert model.lag_kg == 0.0
+    assert abs(model.open_delay - 0.1) < 1e-9
+
+
+@pytest.mark.parametrize("P", ['[[1e-6, 0], [0, 1e-6], [0, 0]]', '[[NaN, 0], [0, 1e-6]]',
+                               '[[1e-6, 1e-5], [1e-5, 1e-6]]', '[[-1e-6, 0], [0, 1e-6]]', '"x"', 'null'])
+def test_load_bad_covariance_falls_back_to_prior(tmp_path, P):
+    path = tmp_path / "flow.json"
+    path.write_text('{"rate": 0.05, "lag_kg": 0.002, "P": %s, "updates": 10}' % P)
+    model = FlowRateModel(rate=0.05, path=str(path))
+    assert model.rate == 0.05 and model.lag_kg == 0.002
+    assert model.P == [[0.05 * 0.05, 0.0], [0.0, 0.005 ** 2]]
+    assert np.isfinite(model.std(1.0)) and model.std(1.0) > 0
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# HX711 讀取：PD_SCK 脈衝超時 (50~60 µs，晶片還沒斷電) 後要強制重置，下一筆不能錯位
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class FakeChip(types.ModuleType):
+    """
+    假的 RPi.GPIO + 位元層級的 HX711：words 依序是每次轉換的結果 (24 位元)。
+    時間由假時鐘推進 (每次 output 1 µs)；stall = {第幾個脈衝: 額外拉高秒數} 模擬執行緒被搶走。
+    PD_SCK 拉高超過 60 µs 晶片斷電，拉低後重新開始轉換 (下一個 word)。
+    """
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    FALLING = "FALLING"
+
+    def __init__(self, words, gain_pulses=1):
+        super().__init__("RPi.GPIO")
+        self.words = list(words)
+        self.gain_pulses = gain_pulses
+        self.now = 0.0
+        self.high_since = None
+        self.pulse = 0              # 目前這個 word 已送出的脈衝數
+        self.pulses_total = 0
+        self.stall = {}
+        self.resets = 0
+
+    def setmode(self, mode): pass
+    def setwarnings(self, flag): pass
+    def setup(self, pin, mode): pass
+    def add_event_detect(self, pin, edge, callback=None): pass
+    def remove_event_detect(self, pin): pass
+
+    def output(self, pin, value):
+        self.now += 1e-6
+        if value:
+            self.high_since = self.now
+            self.pulse += 1
+            self.pulses_total += 1
+            self.now += self.stall.pop(self.pulses_total, 0.0)
+            return
+        if self.high_since is None: return
+        high = self.now - self.high_since
+        self.high_since = None
+        if high > 60e-6:
+            # 斷電重置：這個 word 作廢，醒來後重新轉換
+            self.resets += 1
+            self.words.pop(0)
+            self.pulse = 0
+        elif self.pulse == 24 + self.gain_pulses:
+            self.words.pop(0)
+            self.pulse = 0
+
+    def input(self, pin):
+        # 沒在讀：DOUT 低 = 轉換完成；讀到第 n 位元時 DOUT 是 word 的第 n 位 (MSB 先)
+        if self.pulse == 0: return 0 if self.words else 1
+        if self.pulse > 24: return 1
+        return (self.words[0] >> (24 - self.pulse)) & 1
+
+    # hx711 模組的 time：perf_counter / sleep 都走假時鐘
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def make_hx(monkeypatch):
+    def make(words):
+        # 建構時 set_gain() 會先讀掉一筆
+        chip = FakeChip([0] + list(words))
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = chip
+        monkeypatch.setitem(sys.modules, "RPi", rpi)
+        monkeypatch.setitem(sys.modules, "RPi.GPIO", chip)
+        sys.modules.pop("hx711", None)
+        hx711 = importlib.import_module("hx711")
+        monkeypatch.setattr(hx711, "time", chip)
+        hx = hx711.HX711(5, 6, settleTime=0)
+        return hx, chip
+    yield make
+    sys.modules.pop("hx711", None)
+
+
+WORDS = [0x123456, 0x0F0F0F, 0x00FF00, 0x7A5A5A]
+
+
+def test_reads_words_in_order(make_hx):
+    hx, chip = make_hx(WORDS)
+    assert [hx.read_long() for _ in range(3)] == WORDS[:3]
+    assert hx.discardedSamples == 0
+
+
+def test_overrun_below_powerdown_resets_before_next_read(make_hx):
+    # 第 10 個脈衝多拉高 55 µs：超過 50 µs 的上限但晶片沒斷電，還停在 word 中間
+    hx, chip = make_hx(WORDS)
+    chip.stall[25 + 10] = 55e-6
+    value = hx.read_long()
+    # 強制重置丟掉被打斷的那一筆，重讀到的是完整的下一筆，不是錯位的資料
+    assert value == WORDS[1]
+    assert hx.discardedSamples == 1 and chip.resets == 1
+    assert hx.read_long() == WORDS[2]
+
+
+def test_overrun_past_powerdown(make_hx):
+    hx, chip = make_hx(WORDS)
+    chip.stall[55] = 80e-6      # 第二筆 (建構時讀掉一筆之後) 的第 5 個脈衝：晶片真的斷電
+    assert hx.read_long() == WORDS[0]
+    # 晶片自己斷電一次、discardSample 再強制重置一次；之後讀到的是完整的新轉換
+    assert hx.read_long() in WORDS[2:]
+    assert hx.discardedSamples == 1 and chip.resets == 2
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# /analyze_photos 的 zip 讀取：單檔、總大小、項目數上限
+import io
+import zipfile
+
+import pytest
+
+from photo_analyzer import ArchiveTooLarge, read_zip
+
+
+def make_zip(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+def test_reads_images_only_and_skips_oversized():
+    data = make_zip([("a.jpg", b"x" * 10), ("notes.txt", b"y"), ("dir/b.PNG", b"z" * 10),
+                     ("big.jpg", b"0" * 1000)])
+    items = read_zip(data, max_files=10, max_bytes=100)
+    assert [name for name, _ in items] == ["a.jpg", "dir/b.PNG"]
+    assert items[0][1] == b"x" * 10
+
+
+def test_max_files():
+    data = make_zip([(f"{i}.jpg", b"x") for i in range(5)])
+    assert len(read_zip(data, max_files=3, max_bytes=100)) == 3
+
+
+def test_total_uncompressed_limit():
+    # 每張都在單檔上限內，但加起來超過總上限 (高壓縮率的 zip bomb)
+    data = make_zip([(f"{i}.jpg", b"\0" * 1000) for i in range(10)])
+    with pytest.raises(ArchiveTooLarge):
+        read_zip(data, max_files=100, max_bytes=1000, max_total=5000)
+    data.seek(0)
+    assert len(read_zip(data, max_files=100, max_bytes=1000, max_total=10000)) == 10
+
+
+def test_entry_count_limit():
+    data = make_zip([(f"{i}.txt", b"") for i in range(20)] + [("a.jpg", b"x")])
+    with pytest.raises(ArchiveTooLarge):
+        read_zip(data, max_files=10, max_bytes=100, max_entries=20)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# /video_feed、/events 的連線名額：任何方式結束的回應都要歸還名額
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def feeder(tmp_path_factory):
+    # 模擬硬體、不啟動背景執行緒；資料庫等檔案寫在暫存資料夾。
+    # 環境變數與工作目錄在這個模組結束後還原，不影響之後收集的測試
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("FEEDER_BACKEND", "sim")
+        mp.chdir(tmp_path_factory.mktemp("feeder"))
+        mp.delitem(sys.modules, "app", raising=False)
+        feeder = importlib.import_module("app")
+        # 沒有擷取迴圈：先放一張畫面，串流才有第一個 chunk
+        seq, buf = feeder.frame_pool.acquire((48, 64, 3))
+        buf[:] = 0
+        feeder.broadcaster.publish(feeder.frame_pool.view(seq), seq)
+        yield feeder
+
+
+@pytest.mark.parametrize("path, slots, limit", [
+    ("/video_feed", "video_slots", "MAX_VIDEO_STREAMS"),
+    ("/events", "event_slots", "MAX_EVENT_STREAMS"),
+])
+def test_head_requests_release_slot(feeder, path, slots, limit):
+    client = feeder.app.test_client()
+    for _ in range(getattr(feeder, limit) * 2):
+        resp = client.head(path)
+        assert resp.status_code == 200
+        resp.close()
+    assert getattr(feeder, slots)._value == getattr(feeder, limit)
+
+
+@pytest.mark.parametrize("path, slots, limit", [
+    ("/video_feed", "video_slots", "MAX_VIDEO_STREAMS"),
+    ("/events", "event_slots", "MAX_EVENT_STREAMS"),
+])
+def test_closed_response_releases_slot(feeder, path, slots, limit):
+    client = feeder.app.test_client()
+    resp = client.get(path, buffered=False)
+    assert getattr(feeder, slots)._value == getattr(feeder, limit) - 1
+    resp.close()        # 客戶端讀了開頭就斷線
+    assert getattr(feeder, slots)._value == getattr(feeder, limit)
+
+
+def test_full_returns_503(feeder):
+    client = feeder.app.test_client()
+    open_streams = [client.get("/video_feed", buffered=False) for _ in range(feeder.MAX_VIDEO_STREAMS)]
+    assert client.get("/video_feed", buffered=False).status_code == 503
+    for resp in open_streams: resp.close()
+    assert feeder.video_slots._value == feeder.MAX_VIDEO_STREAMS
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# 重量濾波：滑動視窗 (偶數筆中位數、移除舊值)、估計模式、Kalman 跳變、穩定判斷
+import numpy as np
+import pytest
+
+import clock
+from weight_filter import SlidingWindow, Kalman1D, WeightEstimator, SettleDetector
+
+
+def test_median_odd_and_even():
+    w = SlidingWindow(10)
+    for x in (5.0, 1.0, 3.0):
+        w.add(x)
+    assert w.median() == 3.0
+    w.add(9.0)
+    assert w.median() == 4.0     # (3 + 5) / 2
+    assert SlidingWindow(3).median() is None
+
+
+def test_window_evicts_oldest():
+    w = SlidingWindow(3)
+    for x in (100.0, 1.0, 2.0, 3.0):
+        w.add(x)
+    assert len(w) == 3
+    assert w.median() == 2.0
+    assert w.mean() == 2.0
+    assert w.variance() == pytest.approx(1.0)
+    # 重複值也要移除正確的那一個
+    w = SlidingWindow(2)
+    for x in (1.0, 1.0, 2.0):
+        w.add(x)
+    assert w.median() == 1.5
+
+
+def test_trimmed_mean_drops_outliers():
+    w = SlidingWindow(10)
+    for x in (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 50.0, -50.0):
+        w.add(x)
+    assert w.trimmed_mean(0.1) == 1.0
+
+
+def test_kalman_jumps_on_step():
+    k = Kalman1D(measurement_std=0.002)
+    for _ in range(50):
+        k.update(0.100)
+    assert k.x == pytest.approx(0.100)
+    # 倒料：1 kg 的變化遠超過 5 個標準差，直接跳到新值
+    assert k.update(1.100) == 1.100
+
+
+def test_estimator_modes():
+    with pytest.raises(ValueError):
+        WeightEstimator(mode="mean")
+    est = WeightEstimator(window=5, mode="median")
+    assert est.estimate() == (None, None)
+    for i, x in enumerate((1.0, 2.0, 3.0, 4.0)):
+        est.add(i, x)
+    assert est.estimate()[0] == 2.5
+    est.reset()
+    assert est.estimate() == (None, None)
+
+
+class FakeSampler:
+    def __init__(self, t, v):
+        self.t, self.v = np.asarray(t, float), np.asarray(v, float)
+
+    def since(self, t0):
+        mask = self.t > t0
+        return self.t[mask], self.v[mask]
+
+
+SCALE = 1000.0      # 原始讀數 / kg
+
+
+def detector(values, span=1.0, **kwargs):
+    now = clock.monotonic()
+    t = np.linspace(now - span, now, len(values))
+    return SettleDetector(FakeSampler(t, np.asarray(values) * SCALE), SCALE, window_s=1.0, **kwargs)
+
+
+def test_settle_stable_with_noise():
+    rng = np.random.default_rng(0)
+    d = detector(0.5 + rng.normal(0, 0.0005, 40), span=0.99)
+    slope, std, mean = d.measure()
+    assert abs(slope) < 0.002 and std < 0.0015 and mean == pytest.approx(0.5, abs=0.001)
+    assert d.is_stable()
+
+
+def test_settle_rejects_slope_and_noise():
+    # 還在落料：1 秒增加 20 g
+    assert not detector(np.linspace(0.5, 0.52, 40), span=0.99).is_stable()
+    # 狗碰到碗：晃動大
+    rng = np.random.default_rng(1)
+    assert not detector(0.5 + rng.normal(0, 0.01, 40), span=0.99).is_stable()
+
+
+def test_settle_needs_enough_data():
+    # 樣本太少，或只涵蓋視窗的一小段
+    assert detector([0.5] * 3, span=0.99).measure() is None
+    assert detector([0.5] * 40, span=0.5).measure() is None
+    # since 之前的樣本不算 (剛關門，只看之後的)
+    d = detector([0.5] * 40, span=0.99)
+    assert d.measure(since=clock.monotonic() - 0.3) is None
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# HX711Sampler 環狀緩衝區：繞圈後的順序、since() 的時間過濾、中位數、讀到寫到一半的格子
+import threading
+
+import numpy as np
+import pytest
+
+import clock
+from weight_sampler import HX711Sampler
+
+
+class FakeHX:
+    """依序回傳 0, 1, 2, ...；每筆把假時鐘往前推 10 ms，讀完就停掉取樣執行緒。"""
+
+    def __init__(self, n, now):
+        self.values = iter(range(n))
+        self.now = now
+        self.sampler = None
+
+    def read_long(self):
+        try:
+            v = next(self.values)
+        except StopIteration:
+            self.sampler.stop()
+            raise
+        self.now[0] += 0.01
+        return v
+
+
+@pytest.fixture
+def fill(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(clock, "monotonic", lambda: now[0])
+
+    def fill(n, capacity):
+        hx = FakeHX(n, now)
+        sampler = HX711Sampler(hx, capacity=capacity)
+        hx.sampler = sampler
+        sampler.start()
+        sampler._thread.join(timeout=5)
+        assert sampler.count == n
+        return sampler
+    return fill
+
+
+def test_partial_buffer(fill):
+    sampler = fill(5, capacity=8)
+    t, v = sampler.last(8)
+    assert v.tolist() == [0, 1, 2, 3, 4]
+    assert sampler.latest()[1] == 4
+
+
+def test_wraparound_keeps_newest_in_order(fill):
+    sampler = fill(20, capacity=8)
+    # 最多 capacity - 1 筆 (下一筆要寫的格子不讀)
+    t, v = sampler.last(100)
+    assert v.tolist() == list(range(13, 20))
+    assert np.all(np.diff(t) > 0)
+    assert sampler.last(3)[1].tolist() == [17, 18, 19]
+
+
+def test_since_is_strictly_after(fill):
+    sampler = fill(20, capacity=8)
+    t, v = sampler.last(8)
+    t15 = t[v.tolist().index(15)]
+    assert sampler.since(t15)[1].tolist() == [16, 17, 18, 19]
+    # 比緩衝區還舊的時間點：只拿得到緩衝區裡的
+    assert sampler.since(0.0)[1].tolist() == list(range(13, 20))
+
+
+def test_median(fill):
+    sampler = fill(20, capacity=8)
+    assert sampler.median(4) == 17.5
+    assert sampler.median(3) == 18.0
+
+
+class PausingArray(np.ndarray):
+    """寫入端存到第 pause_at 筆的時間戳記後停住 (還沒存原始值、也還沒推進 count)。"""
+    pause_at = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.writes += 1
+        if self.writes == self.pause_at:
+            self.paused.set()
+            self.resume.wait(5)
+
+
+def test_reader_skips_half_written_slot(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(clock, "monotonic", lambda: now[0])
+    capacity = 8
+    hx = FakeHX(capacity + 1, now)
+    sampler = HX711Sampler(hx, capacity=capacity)
+    hx.sampler = sampler
+    t = sampler._t.view(PausingArray)
+    t.writes, t.pause_at = 0, capacity + 1       # 第 9 筆蓋掉第 1 筆 (值 0) 的格子
+    t.paused, t.resume = threading.Event(), threading.Event()
+    sampler._t = t
+    sampler.start()
+    try:
+        assert t.paused.wait(5)
+        # 第 n 筆 (值 n) 的時間戳記是 100 + 0.01 * (n + 1)；時間與值要成對
+        for times, values in (sampler.last(capacity), sampler.since(0.0)):
+            assert len(values) == capacity - 1
+            assert np.allclose(times, 100.0 + 0.01 * (values + 1))
+    finally:
+        t.resume.set()
+    sampler._thread.join(timeout=5)
+    assert sampler.last(capacity)[1].tolist() == list(range(2, 9))
+
+
+def test_empty():
+    sampler = HX711Sampler(None, capacity=8)
+    assert sampler.latest() == (None, None)
+    assert sampler.median(5) is None
+    assert len(sampler.since(0.0)[1]) == 0
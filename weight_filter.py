@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import bisect
+import collections
+import threading
+import clock
+
+
+class SlidingWindow:
+    """
+    固定長度的滑動視窗，同時維護一份排序好的副本：
+    新增/移除用二分搜尋定位 (O(log n) 比較，搬移交給 list 的 C 實作)，
+    中位數、截尾平均不必每次重新排序。總和/平方和則是 O(1) 累加。
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._fifo = collections.deque()
+        self._sorted = []
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def __len__(self):
+        return len(self._fifo)
+
+    def add(self, x):
+        self._fifo.append(x)
+        bisect.insort(self._sorted, x)
+        self._sum += x
+        self._sumsq += x * x
+        if len(self._fifo) > self.size:
+            old = self._fifo.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+            self._sum -= old
+            self._sumsq -= old * old
+
+    def clear(self):
+        self._fifo.clear()
+        self._sorted = []
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def median(self):
+        n = len(self._sorted)
+        if n == 0: return None
+        mid = n // 2
+        if n & 1: return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2.0
+
+    def trimmed_mean(self, trim=0.2):
+        n = len(self._sorted)
+        if n == 0: return None
+        k = int(n * trim)
+        kept = self._sorted[k:n - k] if n - 2 * k > 0 else self._sorted
+        return sum(kept) / len(kept)
+
+    def mean(self):
+        n = len(self._fifo)
+        return self._sum / n if n else None
+
+    def variance(self):
+        n = len(self._fifo)
+        if n < 2: return 0.0
+        m = self._sum / n
+        return max(0.0, (self._sumsq - n * m * m) / (n - 1))
+
+
+class Kalman1D:
+    """
+    一維 Kalman 濾波 (等速為零的重量模型)。
+    預設值以 kg 為單位：量測雜訊約 2 g (荷重元 + 震動)，每筆樣本允許 0.2 g 的漂移。
+    創新值超過 reset_sigma 個標準差時視為真的重量變化 (倒料、狗碰到碗)，直接跳到新值。
+    """
+
+    def __init__(self, measurement_std=0.002, process_std=0.0002, reset_sigma=5.0):
+        self.R = measurement_std ** 2
+        self.Q = process_std ** 2
+        self.reset_sigma = reset_sigma
+        self.x = None
+        self.P = self.R
+
+    def reset(self):
+        self.x = None
+        self.P = self.R
+
+    def update(self, z):
+        if self.x is None:
+            self.x = z
+            self.P = self.R
+            return self.x
+        self.P += self.Q
+        innov = z - self.x
+        S = self.P + self.R
+        if innov * innov > (self.reset_sigma ** 2) * S:
+            self.x = z
+            self.P = self.R
+            return self.x
+        K = self.P / S
+        self.x += K * innov
+        self.P *= (1.0 - K)
+        return self.x
+
+
+class WeightEstimator:
+    """
+    重量估計器：由 HX711Sampler 每筆樣本餵入，其他地方只讀 estimate()。
+    mode 可選 "median" / "trimmed" / "kalman"；回傳 (重量, 變異數)。
+    """
+
+    MODES = ("median", "trimmed", "kalman")
+
+    def __init__(self, window=15, mode="median", trim=0.2, kalman=None):
+        if mode not in self.MODES:
+            raise ValueError(f"未知的濾波模式: {mode}")
+        self.mode = mode
+        self.trim = trim
+        self.window = SlidingWindow(window)
+        self.kalman = kalman if kalman is not None else Kalman1D()
+        self.last_t = None
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, t, value):
+        with self._lock:
+            self.window.add(value)
+            self.kalman.update(value)
+            self.last_t = t
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.window.clear()
+            self.kalman.reset()
+
+    def estimate(self):
+        with self._lock:
+            if len(self.window) == 0: return None, None
+            if self.mode == "median":
+                return self.window.median(), self.window.variance()
+            if self.mode == "trimmed":
+                return self.window.trimmed_mean(self.trim), self.window.variance()
+            return self.kalman.x, self.kalman.P
+
+
+class SettleDetector:
+    """
+    判斷秤是否已穩定：看最近 window_s 秒的樣本，做線性回歸，
+    斜率 (kg/秒) 與去趨勢後的標準差 (kg) 都低於門檻才算穩定。
+    直接讀 HX711Sampler 的緩衝區；scale 為每公斤的原始讀數 (校正因子)。
+    """
+
+    def __init__(self, sampler, scale, window_s=1.0, max_slope=0.002,
+                 max_std=0.0015, min_samples=5):
+        self.sampler = sampler
+        self.scale = float(scale)
+        self.window_s = window_s
+        self.max_slope = max_slope
+        self.max_std = max_std
+        self.min_samples = min_samples
+
+    def measure(self, since=None):
+        """回傳 (斜率 kg/s, 標準差 kg, 平均 kg)；資料不足則回傳 None。"""
+        t0 = clock.monotonic() - self.window_s
+        if since is not None: t0 = max(t0, since)
+        t, v = self.sampler.since(t0)
+        if len(v) < self.min_samples: return None
+        # 視窗要有八成以上被樣本涵蓋，避免剛開始只看到一小段就下結論
+        if t[-1] - t[0] < 0.8 * self.window_s: return None
+        v = v / self.scale
+        tc = t - t.mean()
+        vc = v - v.mean()
+        denom = float((tc * tc).sum())
+        slope = float((tc * vc).sum()) / denom if denom > 0 else 0.0
+        resid = vc - slope * tc
+        return slope, float(resid.std()), float(v.mean())
+
+    def is_stable(self, since=None):
+        m = self.measure(since)
+        if m is None: return False
+        slope, std, _ = m
+        return abs(slope) <= self.max_slope and std <= self.max_std
+
+    def wait(self, timeout, since=None, abort=None, poll=0.05):
+        """
+        等到穩定或逾時 (原本固定等待的秒數當上限)。
+        回傳 (是否穩定, 實際等待秒數)；abort() 為真時提前結束。
+        """
+        start = clock.monotonic()
+        if since is None: since = start
+        while True:
+            elapsed = clock.monotonic() - start
+            if self.is_stable(since): return True, elapsed
+            if elapsed >= timeout: return False, elapsed
+            if abort is not None and abort(): return False, elapsed
+            clock.sleep(poll)
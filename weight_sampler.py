@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import numpy as np
+
+import clock
+
+
+class HX711Sampler:
+    """
+    HX711 背景取樣執行緒：以晶片本身的速率不停讀取，存進固定大小的環狀緩衝區
+    (numpy，附時間戳記)。其他執行緒只讀緩衝區，不碰 GPIO、也不會卡在 ADC 上。
+
+    只有取樣執行緒會寫入 (單一寫入者)，讀取端不用鎖：先記下 count 再複製資料，
+    複製完若發現期間被覆寫就重讀一次。
+    """
+
+    def __init__(self, hx, capacity=1024, observe=None):
+        self.hx = hx
+        self.observe = observe          # observe(秒數)：每次 read_long 的耗時 (量測用，可為 None)
+        self.capacity = capacity
+        self._t = np.zeros(capacity, np.float64)
+        self._v = np.zeros(capacity, np.float64)
+        self._count = 0          # 累計寫入筆數，只增不減
+        self._new_sample = threading.Event()
+        self._listeners = []
+        self._running = False
+        self._thread = None
+        self.errors = 0
+
+    # ---------- 取樣執行緒 ----------
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def add_listener(self, fn):
+        # fn(t, raw) 會在取樣執行緒上被呼叫，必須很快返回
+        self._listeners.append(fn)
+
+    def _run(self):
+        while self._running:
+            try:
+                t0 = time.perf_counter()
+                raw = self.hx.read_long()
+                if self.observe is not None: self.observe(time.perf_counter() - t0)
+            except Exception:
+                self.errors += 1
+                clock.sleep(0.05)
+                continue
+            i = self._count % self.capacity
+            self._t[i] = clock.monotonic()
+            self._v[i] = raw
+            # 資料寫完才推進 count，讀取端看得到的都是完整樣本
+            self._count += 1
+            self._new_sample.set()
+            for fn in self._listeners:
+                try:
+                    fn(self._t[i], raw)
+                except Exception:
+                    self.errors += 1
+
+    # ---------- 讀取端 ----------
+    @property
+    def count(self):
+        return self._count
+
+    def wait_samples(self, n, timeout=None):
+        # 等到 start 之後至少再有 n 筆新樣本 (開機歸零用)；逾時回傳 False
+        target = self._count + n
+        deadline = None if timeout is None else clock.monotonic() + timeout
+        while self._count < target:
+            remaining = None if deadline is None else deadline - clock.monotonic()
+            if remaining is not None and remaining <= 0: return False
+            self._new_sample.clear()
+            if self._count >= target: break
+            self._new_sample.wait(clock.real(remaining) if remaining is not None else 0.5)
+        return True
+
+    def last(self, n):
+        """最近 n 筆 (時間, 原始值)，由舊到新；不足 n 筆就回傳現有的 (最多 capacity - 1 筆)。"""
+        while True:
+            end = self._count
+            # 第 end 筆正在寫入的格子就是 end - capacity 那筆：最多只拿 capacity - 1 筆，
+            # 不會讀到寫到一半 (_t 已是新的、_v 還是舊的) 的格子
+            n_avail = min(n, end, self.capacity - 1)
+            if n_avail <= 0:
+                return np.empty(0), np.empty(0)
+            idx = np.arange(end - n_avail, end) % self.capacity
+            t, v = self._t[idx], self._v[idx]
+            # 複製期間寫入端若已開始覆寫最舊那筆的格子 (第 end - n_avail + capacity 筆) 就重來
+            if self._count - (end - n_avail) < self.capacity:
+                return t, v
+
+    def since(self, t0):
+        """時間戳記晚於 t0 (clock.monotonic) 的所有樣本。"""
+        t, v = self.last(self.capacity)
+        mask = t > t0
+        return t[mask], v[mask]
+
+    def window(self, seconds):
+        return self.since(clock.monotonic() - seconds)
+
+    def latest(self):
+        t, v = self.last(1)
+        if len(v) == 0: return None, None
+        return float(t[0]), float(v[0])
+
+    def median(self, n):
+        _, v = self.last(n)
+        return float(np.median(v)) if len(v) else None
+
+    def mean_over(self, seconds):
+        _, v = self.window(seconds)
+        return float(v.mean()) if len(v) else None